@@ -0,0 +1,72 @@
+#Benchmark for DOCX extraction
+#Compares the streaming DOCX reader with the python-docx object model on large documents
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+import docx
+from corpus import DEFAULT_KEYWORDS, make_words, write_docx
+from content_analyzer import ContentAnalyzer
+from file_scanner import FileScanner
+
+
+def python_docx_text(path):
+    """
+    The original FileScanner._read_docx, kept here as the baseline.
+    """
+    doc = docx.Document(path)
+    return '\n'.join([para.text for para in doc.paragraphs]).strip()
+
+
+def measure(func, repeat):
+    """
+    Returns the best time over `repeat` runs and the peak Python memory of one run, in MB.
+    tracemalloc does not see lxml's C allocations, so the python-docx figure is a lower bound.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the streaming DOCX reader with python-docx.")
+    parser.add_argument('--words', type=int, nargs='+', default=[10_000, 100_000, 500_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    scanner = FileScanner()
+    analyzer = ContentAnalyzer()
+    print(f"{'words':>8} {'MB':>6} {'docx s':>8} {'docx MB':>8} {'stream s':>9} {'stream MB':>10} "
+          f"{'speedup':>8} {'early exit s':>13}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for word_count in args.words:
+            path = os.path.join(temp_dir, f'doc_{word_count}.docx')
+            words = make_words(rng, word_count, DEFAULT_KEYWORDS, 0.0)
+            write_docx(path, words)
+            assert python_docx_text(path) in scanner._read_docx(path)  # Same body text (plus tables, headers, footers)
+            baseline, baseline_mb = measure(lambda: python_docx_text(path), args.repeat)
+            streamed, streamed_mb = measure(lambda: scanner._read_docx(path), args.repeat)
+            early_path = os.path.join(temp_dir, f'early_{word_count}.docx')  # A decisive keyword in the first paragraph
+            write_docx(early_path, ['confidential'] + words)
+            early, _ = measure(lambda: scanner.scan_file(early_path, analyzer), args.repeat)
+            print(f"{word_count:>8} {os.path.getsize(path) / 1e6:>6.1f} {baseline:>8.3f} {baseline_mb:>8.1f} "
+                  f"{streamed:>9.3f} {streamed_mb:>10.1f} {baseline / streamed:>7.1f}x {early:>13.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+#Benchmark for keyword matching
+#Compares the compiled KeywordMatcher against the original per-keyword substring loop
+import argparse
+import json
+import os
+import random
+import re
+import string
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from keyword_matcher import KeywordMatcher
+
+PATTERN_RULES = [  # The pattern rules of config/rules.json
+    {"name": "ssn number", "regex": r"\d(?<!\w\d)\d{2}-\d{2}-\d{4}\b"},
+    {"name": "credit card number", "regex": r"\d(?<!\w\d)(?:[ -]?\d){12,18}\b", "validator": "luhn"},
+]
+
+
+def naive_level(rules, content):
+    """
+    The original ContentAnalyzer.determine_sensitivity loop, kept here as the baseline.
+    """
+    content_lower = content.lower()
+    for level, keywords in rules.items():
+        for keyword in keywords:
+            if keyword in content_lower:
+                return level
+    return "unknown"
+
+
+def make_rules(keyword_count, rng):
+    """
+    Builds a rules dict with three levels and keyword_count random multi-word keywords.
+    Words are long enough that random documents practically never contain them.
+    """
+    levels = ["confidential", "pii", "public"]
+    rules = {level: [] for level in levels}
+    for index in range(keyword_count):
+        words = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(8, 12)))
+                 for _ in range(rng.randint(1, 3))]
+        rules[levels[index % len(levels)]].append(' '.join(words))
+    return rules
+
+
+def make_document(size, rng):
+    """
+    Builds a document of roughly `size` characters of random lowercase words. Without keyword
+    hits neither implementation can stop early, which is the worst case for both.
+    """
+    words = []
+    length = 0
+    while length < size:
+        word = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 10)))
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)
+
+
+def add_numbers(document, rng, every=50):
+    """
+    Sprinkles numbers (some shaped like SSNs and card numbers) into a document, one per `every` words.
+    """
+    words = document.split(' ')
+    for index in range(0, len(words), every):
+        words[index] = rng.choice(['2024', '123-45-6789', '4111 1111 1111 1111', '555-0100', '42'])
+    return ' '.join(words)
+
+
+def bench_patterns(sizes, repeat, rng):
+    """
+    Times keyword-only matching, keywords plus pattern rules, and the full AnalysisResult-style scan
+    (every match collected), and compares per-rule regexes with one alternation of all rules.
+    """
+    keywords = make_rules(30, rng)
+    plain = KeywordMatcher(keywords)
+    rules = dict(keywords, pii={'keywords': keywords['pii'], 'patterns': PATTERN_RULES})
+    matcher = KeywordMatcher(rules)
+    alternation = re.compile('|'.join(f"(?P<_rule{index}>{rule['regex']})" for index, rule in enumerate(PATTERN_RULES)))
+    separate = [re.compile(rule['regex']) for rule in PATTERN_RULES]
+    print(f"\n{'doc chars':>10} {'keywords s':>11} {'+patterns s':>12} {'all matches s':>14} "
+          f"{'alternation s':>14} {'per rule s':>11}")
+    for size in sizes:
+        document = add_numbers(make_document(size, rng), rng)
+        keyword_only = best_of(lambda: plain.best_level(document), repeat)
+        with_patterns = best_of(lambda: matcher.best_level(document), repeat)
+        all_matches = best_of(lambda: matcher.find_all(document), repeat)
+        combined = best_of(lambda: sum(1 for _ in alternation.finditer(document)), repeat)
+        per_rule = best_of(lambda: sum(1 for pattern in separate for _ in pattern.finditer(document)), repeat)
+        print(f"{size:>10} {keyword_only:>11.4f} {with_patterns:>12.4f} {all_matches:>14.4f} "
+              f"{combined:>14.4f} {per_rule:>11.4f}")
+
+
+def bench_rule_cache(keyword_counts, repeat, rng):
+    """
+    Times loading a rules file in a fresh interpreter, compiled from scratch and from the compiled rules cache.
+    A fresh process matters: within one process `re` caches the compiled trie pattern itself.
+    """
+    src = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+    print(f"\n{'keywords':>9} {'compile s':>10} {'cached s':>10}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for keyword_count in keyword_counts:
+            path = os.path.join(temp_dir, f'rules{keyword_count}.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(make_rules(keyword_count, rng), f)
+            times = []
+            for cache_dir in (False, os.path.join(temp_dir, 'cache')):
+                script = (f"import sys, time; sys.path.insert(0, {src!r}); from rules import load_rule_set; "
+                          f"start = time.perf_counter(); load_rule_set({path!r}, cache_dir={cache_dir!r}); "
+                          f"print(time.perf_counter() - start)")
+                runs = [float(subprocess.run([sys.executable, '-c', script], capture_output=True, text=True,
+                                             check=True).stdout) for _ in range(repeat + 1)]
+                times.append(min(runs[1:] if cache_dir else runs))  # The first cached run fills the cache
+            print(f"{keyword_count:>9} {times[0]:>10.4f} {times[1]:>10.4f}")
+
+
+def best_of(func, repeat):
+    """
+    Returns the fastest wall-clock time of `repeat` calls to func.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare KeywordMatcher with the naive keyword loop.")
+    parser.add_argument('--keywords', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'keywords':>9} {'doc chars':>10} {'naive s':>10} {'trie s':>10} {'matcher s':>10} {'compile s':>10} {'speedup':>8}")
+    for keyword_count in args.keywords:
+        rules = make_rules(keyword_count, rng)
+        start = time.perf_counter()
+        matcher = KeywordMatcher(rules)  # Picks the strategy from the keyword count
+        compile_time = time.perf_counter() - start
+        trie_matcher = KeywordMatcher(rules, trie_threshold=0)  # Always uses the compiled trie pattern
+        for size in args.sizes:
+            document = make_document(size, rng)
+            assert matcher.best_level(document.lower()) == naive_level(rules, document)
+            assert trie_matcher.best_level(document.lower()) == naive_level(rules, document)
+            naive = best_of(lambda: naive_level(rules, document), args.repeat)
+            trie = best_of(lambda: trie_matcher.best_level(document.lower()), args.repeat)
+            compiled = best_of(lambda: matcher.best_level(document.lower()), args.repeat)
+            print(f"{keyword_count:>9} {size:>10} {naive:>10.4f} {trie:>10.4f} {compiled:>10.4f} "
+                  f"{compile_time:>10.4f} {naive / compiled:>7.1f}x")
+    bench_patterns(args.sizes, args.repeat, rng)
+    bench_rule_cache(args.keywords, args.repeat, rng)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#Benchmark for read-ahead I/O
+#Scans a corpus through a latency-injecting filesystem with and without a Prefetcher
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from corpus import generate_corpus, parse_mix
+from prefetch import LatencyFilesystem, Prefetcher
+from scan_engine import ScanEngine
+
+
+def scan(paths, filesystem, thread_workers, process_workers, prefetch=None):
+    """
+    Returns the seconds taken to scan every path, and the records.
+    """
+    with ScanEngine(thread_workers=thread_workers, process_workers=process_workers, filesystem=filesystem,
+                    prefetch=prefetch) as engine:
+        start = time.perf_counter()
+        records = list(engine.scan_paths(paths))
+        return time.perf_counter() - start, records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare scans of a slow filesystem with and without read-ahead.")
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--mix', type=parse_mix, default={'txt': 0.5, 'pdf': 0.3, 'docx': 0.2})
+    parser.add_argument('--latency-ms', type=float, nargs='+', default=[0.0, 2.0, 10.0, 30.0],
+                        help="Round trip per open and per read request.")
+    parser.add_argument('--bandwidth-mb', type=float, help="Bytes per second per read, in MB. Defaults to unlimited.")
+    parser.add_argument('--depth', type=int, default=32, help="Files read ahead.")
+    parser.add_argument('--prefetch-mb', type=int, default=256, help="Memory cap of the read-ahead buffers.")
+    parser.add_argument('--thread-workers', type=int, default=4)
+    parser.add_argument('--process-workers', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    bandwidth = args.bandwidth_mb * 1e6 if args.bandwidth_mb else None
+    print(f"{'latency ms':>10} {'direct s':>9} {'prefetch s':>11} {'speedup':>8} {'prefetched':>11} {'declined':>9}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        manifest = generate_corpus(temp_dir, args.files, args.mix, 50, 2000, 0.001, seed=args.seed)
+        paths = [entry['path'] for entry in manifest]
+        for latency_ms in args.latency_ms:
+            filesystem = LatencyFilesystem(latency_ms / 1000, bandwidth)
+            direct, expected = scan(paths, filesystem, args.thread_workers, args.process_workers)
+            prefetch = Prefetcher(depth=args.depth, max_bytes=args.prefetch_mb * 1024 * 1024, filesystem=filesystem)
+            ahead, records = scan(paths, filesystem, args.thread_workers, args.process_workers, prefetch)
+            assert [record.sensitivity for record in records] == [record.sensitivity for record in expected]
+            stats = prefetch.stats()
+            print(f"{latency_ms:>10.1f} {direct:>9.2f} {ahead:>11.2f} {direct / ahead:>7.2f}x "
+                  f"{stats['loaded']:>11} {stats['declined']:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+#Scan throughput benchmark
+#Measures every FileScanner reader and the ContentAnalyzer on a synthetic corpus and saves the results as JSON
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from corpus import DEFAULT_MIX, generate_corpus, parse_mix
+
+READERS = {'txt': '_read_txt', 'pdf': '_read_pdf', 'docx': '_read_docx', 'png': '_read_image'}
+
+
+def percentile(values, fraction):
+    """
+    Returns the value at `fraction` (0-1) of the sorted values, using the nearest rank.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def peak_rss_mb():
+    """
+    Returns this process's peak resident set size in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024  # bytes on macOS, KiB elsewhere
+
+
+def summarize(name, latencies, total_bytes, errors, rss_before):
+    """
+    Builds the result entry for one benchmark.
+    """
+    elapsed = sum(latencies)
+    return {
+        'name': name,
+        'files': len(latencies),
+        'errors': errors,
+        'seconds': round(elapsed, 6),
+        'files_per_sec': round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        'mb_per_sec': round(total_bytes / 1e6 / elapsed, 3) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'rss_growth_mb': round(peak_rss_mb() - rss_before, 1),
+    }
+
+
+def bench_reader(kind, paths):
+    """
+    Times one FileScanner reader over the given files. Runs in a fresh process so peak RSS is per reader.
+    """
+    import logging
+    logging.disable(logging.CRITICAL)  # Missing Tesseract etc. shows up in the error count instead
+    from file_scanner import FileScanner
+    rss_before = peak_rss_mb()
+    scanner = FileScanner()
+    reader = getattr(scanner, READERS[kind])
+    latencies = []
+    total_bytes = 0
+    errors = 0
+    for path in paths:
+        total_bytes += os.path.getsize(path)
+        start = time.perf_counter()
+        try:
+            if not reader(path):
+                errors += 1  # Readers log and return an empty string on failure
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+    return summarize(READERS[kind], latencies, total_bytes, errors, rss_before)
+
+
+def bench_analyzer(texts, repeat):
+    """
+    Times ContentAnalyzer.analyze_file over pre-extracted texts.
+    """
+    from content_analyzer import ContentAnalyzer
+    rss_before = peak_rss_mb()
+    analyzer = ContentAnalyzer()
+    latencies = []
+    total_bytes = 0
+    for _ in range(repeat):
+        for text in texts:
+            total_bytes += len(text.encode('utf-8'))
+            start = time.perf_counter()
+            analyzer.analyze_file(text)
+            latencies.append(time.perf_counter() - start)
+    return summarize('ContentAnalyzer.analyze_file', latencies, total_bytes, 0, rss_before)
+
+
+def extract_texts(paths):
+    from file_scanner import FileScanner
+    import logging
+    logging.disable(logging.CRITICAL)
+    scanner = FileScanner()
+    return [text for text in (scanner.read_file(path) for path in paths) if text]
+
+
+def git_commit():
+    try:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_in_fresh_process(func, *args):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(func, *args).result()
+
+
+def print_table(results):
+    print(f"{'benchmark':<30} {'files':>6} {'err':>4} {'files/s':>9} {'MB/s':>8} {'p50 ms':>8} {'p99 ms':>9} {'peak MB':>8}")
+    for entry in results:
+        print(f"{entry['name']:<30} {entry['files']:>6} {entry['errors']:>4} {entry['files_per_sec']:>9.1f} "
+              f"{entry['mb_per_sec']:>8.2f} {entry['p50_ms']:>8.2f} {entry['p99_ms']:>9.2f} {entry['peak_rss_mb']:>8.1f}")
+
+
+def compare(results, baseline_path):
+    """
+    Prints the files/sec change of each benchmark against a previous results file.
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {entry['name']: entry for entry in json.load(f)['results']}
+    print(f"\nCompared with {baseline_path}:")
+    for entry in results:
+        old = baseline.get(entry['name'])
+        if old and old['files_per_sec']:
+            change = (entry['files_per_sec'] / old['files_per_sec'] - 1) * 100
+            print(f"  {entry['name']:<30} {old['files_per_sec']:>9.1f} -> {entry['files_per_sec']:>9.1f} files/s ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the FileScanner readers and the ContentAnalyzer.")
+    parser.add_argument('--corpus', help="Existing corpus directory (generated with corpus.py). Defaults to a temporary one.")
+    parser.add_argument('--files', type=int, default=100)
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX, help="e.g. txt=0.5,pdf=0.3,docx=0.2")
+    parser.add_argument('--min-words', type=int, default=50)
+    parser.add_argument('--max-words', type=int, default=2000)
+    parser.add_argument('--keyword-density', type=float, default=0.001)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--analyzer-repeat', type=int, default=5)
+    parser.add_argument('--output', default='bench_results.json', help="Where to write the JSON results.")
+    parser.add_argument('--compare', help="A previous results file to compare against.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        corpus_dir = args.corpus or temp_dir
+        corpus_file = os.path.join(corpus_dir, 'corpus.json')
+        if args.corpus and os.path.exists(corpus_file):
+            with open(corpus_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)['files']
+        else:
+            manifest = generate_corpus(corpus_dir, args.files, args.mix, args.min_words, args.max_words,
+                                       args.keyword_density, seed=args.seed)
+        results = []
+        for kind in sorted(READERS):
+            paths = [entry['path'] for entry in manifest if entry['type'] == kind]
+            if paths:
+                results.append(run_in_fresh_process(bench_reader, kind, paths))
+        texts = run_in_fresh_process(extract_texts, [entry['path'] for entry in manifest])
+        results.append(run_in_fresh_process(bench_analyzer, texts, args.analyzer_repeat))
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'corpus': {'files': len(manifest), 'bytes': sum(entry['bytes'] for entry in manifest),
+                   'mix': args.mix, 'keyword_density': args.keyword_density, 'seed': args.seed},
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print_table(results)
+    print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#Startup benchmark
+#Measures the import time of the scanner modules and the time to spawn a scan worker process
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+HEAVY_MODULES = ('pypdf', 'PIL', 'pytesseract', 'docx')  # Dependencies that should only load when needed
+
+IMPORT_SCRIPT = """
+import sys, time, json
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import scan_engine
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+SPAWN_SCRIPT = """
+import sys, time, json, multiprocessing
+sys.path.insert(0, {src!r})
+from concurrent.futures import ProcessPoolExecutor
+import scan_engine
+if __name__ == '__main__':
+    context = multiprocessing.get_context('spawn')  # Like Windows and frozen builds: nothing is inherited
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=scan_engine._init_worker,
+                             initargs=(scan_engine.ContentAnalyzer().rules_path, {{}})) as pool:
+        pool.submit(scan_engine._scan_in_worker, {path!r}).result()
+        elapsed = time.perf_counter() - start
+    print(json.dumps({{'seconds': elapsed}}))
+"""
+
+
+def run_script(source, runs):
+    """
+    Runs a snippet in fresh interpreters and returns the parsed JSON output of each run.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        script = os.path.join(temp_dir, 'bench.py')
+        with open(script, 'w', encoding='utf-8') as f:
+            f.write(source)
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, script], capture_output=True, text=True, check=True).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure scanner import time and worker spawn time.")
+    parser.add_argument('--src', default=SRC, help="The src directory to measure, e.g. from another checkout.")
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    imports = run_script(IMPORT_SCRIPT.format(src=args.src, heavy=HEAVY_MODULES), args.runs)
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+        f.write("A small public text file.")
+    try:
+        spawns = run_script(SPAWN_SCRIPT.format(src=args.src, path=f.name), args.runs)
+    finally:
+        os.remove(f.name)
+    print(f"import scan_engine:       median {statistics.median(r['seconds'] for r in imports) * 1000:8.1f} ms")
+    print(f"  heavy modules loaded:   {', '.join(imports[0]['loaded']) or 'none'}")
+    print(f"spawn worker + scan .txt: median {statistics.median(r['seconds'] for r in spawns) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#Synthetic corpus generator for benchmarks
+#Builds a reproducible tree of .txt/.pdf/.docx/.png files offline with the same builders as the tests
+import os
+import json
+import random
+import argparse
+
+DEFAULT_MIX = {'txt': 0.4, 'pdf': 0.25, 'docx': 0.25, 'png': 0.1}  # Share of each file type
+DEFAULT_KEYWORDS = ['confidential', 'internal use only', 'ssn', 'credit card', 'public', 'press release']
+FILLER_WORDS = ('the report lists quarterly figures for each region and team with notes on budget '
+                'planning schedule review meeting project status customer supplier invoice').split()
+
+
+def parse_mix(text):
+    """
+    Parses a mix such as 'txt=0.5,pdf=0.5' into a dict.
+    """
+    mix = {}
+    for part in text.split(','):
+        kind, share = part.split('=')
+        mix[kind.strip()] = float(share)
+    return mix
+
+
+def make_words(rng, count, keywords, keyword_density):
+    """
+    Returns `count` words of filler text where roughly `keyword_density` of them are rule keywords.
+    """
+    return [rng.choice(keywords) if keywords and rng.random() < keyword_density else rng.choice(FILLER_WORDS)
+            for _ in range(count)]
+
+
+def write_txt(path, words):
+    with open(path, 'w', encoding='utf-8') as f:
+        for start in range(0, len(words), 12):  # Twelve words per line
+            f.write(' '.join(words[start:start + 12]) + '\n')
+
+
+def write_docx(path, words):
+    import docx
+    document = docx.Document()
+    for start in range(0, len(words), 60):  # One paragraph per sixty words
+        document.add_paragraph(' '.join(words[start:start + 60]))
+    document.save(path)
+
+
+def write_pdf(path, words):
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.set_font('Arial', size=10)
+    words_per_page = 400
+    for start in range(0, max(len(words), 1), words_per_page):
+        pdf.add_page()
+        pdf.multi_cell(0, 5, ' '.join(words[start:start + words_per_page]))
+    pdf.output(path)
+
+
+def write_png(path, words):
+    from PIL import Image, ImageDraw
+    lines = [' '.join(words[start:start + 8]) for start in range(0, len(words), 8)][:40]
+    image = Image.new('RGB', (600, 20 + 15 * max(len(lines), 1)), color=(255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    for index, line in enumerate(lines):
+        draw.text((10, 10 + 15 * index), line, fill=(0, 0, 0))
+    image.save(path)
+
+
+WRITERS = {'txt': write_txt, 'docx': write_docx, 'pdf': write_pdf, 'png': write_png}
+
+
+def generate_corpus(out_dir, files=100, mix=None, min_words=50, max_words=2000, keyword_density=0.001,
+                    keywords=None, seed=1234, files_per_dir=50):
+    """
+    Generates a reproducible synthetic corpus.
+
+    Args:
+        out_dir (str): Directory the corpus is written to (created if missing).
+        files (int): Number of files to generate.
+        mix (dict, optional): Share of each file type, e.g. {'txt': 0.5, 'pdf': 0.5}. Defaults to DEFAULT_MIX.
+        min_words (int): Minimum number of words per file.
+        max_words (int): Maximum number of words per file.
+        keyword_density (float): Fraction of words replaced by rule keywords.
+        keywords (list, optional): Keywords to sprinkle in. Defaults to DEFAULT_KEYWORDS.
+        seed (int): Random seed; the same arguments always produce the same corpus.
+        files_per_dir (int): Files per subdirectory.
+
+    Returns:
+        list: One dict per file with its path, type, word count and size in bytes.
+    """
+    mix = mix or DEFAULT_MIX
+    keywords = DEFAULT_KEYWORDS if keywords is None else keywords
+    rng = random.Random(seed)
+    kinds = sorted(mix)
+    weights = [mix[kind] for kind in kinds]
+    manifest = []
+    for index in range(files):
+        kind = rng.choices(kinds, weights)[0]
+        word_count = rng.randint(min_words, max_words)
+        words = make_words(rng, word_count, keywords, keyword_density)
+        directory = os.path.join(out_dir, f'dir_{index // files_per_dir:04d}')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'file_{index:06d}.{kind}')
+        WRITERS[kind](path, words)
+        manifest.append({'path': path, 'type': kind, 'words': word_count, 'bytes': os.path.getsize(path)})
+    with open(os.path.join(out_dir, 'corpus.json'), 'w', encoding='utf-8') as f:
+        json.dump({'seed': seed, 'mix': mix, 'keyword_density': keyword_density, 'files': manifest}, f, indent=1)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic benchmark corpus.")
+    parser.add_argument('out_dir')
+    parser.add_argument('--files', type=int, default=100)
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX, help="e.g. txt=0.5,pdf=0.3,docx=0.2")
+    parser.add_argument('--min-words', type=int, default=50)
+    parser.add_argument('--max-words', type=int, default=2000)
+    parser.add_argument('--keyword-density', type=float, default=0.001)
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args()
+    manifest = generate_corpus(args.out_dir, args.files, args.mix, args.min_words, args.max_words,
+                               args.keyword_density, seed=args.seed)
+    total = sum(entry['bytes'] for entry in manifest)
+    print(f"Wrote {len(manifest)} files ({total / 1e6:.1f} MB) to {args.out_dir}")
+
+
+if __name__ == '__main__':
+    main()
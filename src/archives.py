@@ -0,0 +1,308 @@
+#Archive traversal
+#Unpacks the members of zip and tar archives into memory one at a time, with limits against nesting and zip bombs
+import importlib
+import os
+import zipfile
+from dataclasses import dataclass
+from typing import Callable, Iterator, NamedTuple, Optional
+
+try:
+    from .readers import ARCHIVE_EXTENSIONS, MemberFile, open_source, source_name, source_size
+except ImportError:  # Running with src/ on sys.path (CLI and tests)
+    from readers import ARCHIVE_EXTENSIONS, MemberFile, open_source, source_name, source_size
+
+SEPARATOR = '!'  # Between an archive's path and a member's path, e.g. archive.zip!inner/report.pdf
+_READ_CHUNK = 1024 * 1024  # Bytes decompressed at a time while checking the size limits
+
+
+@dataclass
+class ArchiveLimits:
+    """
+    Bounds on what archive traversal unpacks into memory.
+    """
+    max_depth: int = 3  # Archives nested inside archives are opened up to this many levels
+    max_member_bytes: int = 256 * 1024 * 1024  # Larger members (uncompressed) are skipped
+    max_total_bytes: int = 1024 * 1024 * 1024  # Uncompressed bytes unpacked from one archive, nested ones included
+    max_members: int = 100_000  # Files listed from one archive, nested ones included
+    max_ratio: float = 100.0  # Members expanding more than this many times their compressed size are treated as bombs
+    ratio_floor: int = 1024 * 1024  # Members up to this size are never treated as bombs (small files compress well)
+
+
+class ArchiveMember(NamedTuple):
+    """
+    A file inside an archive, unpacked into memory.
+    """
+    path: str  # The display path, e.g. archive.zip!inner/report.pdf
+    file: Optional[MemberFile]  # The member's bytes, or None when it was skipped
+    error: Optional[str] = None  # Why the member was skipped
+
+
+class ArchiveLimitError(Exception):
+    """
+    Raised when a member expands beyond the ArchiveLimits.
+    """
+
+
+class _Budget:
+    """
+    The bytes and members left for one top-level archive, shared with the archives nested in it.
+    """
+    def __init__(self, limits):
+        self.bytes = limits.max_total_bytes
+        self.members = limits.max_members
+
+
+_COMPRESSORS = ((b'\x1f\x8b', 'gzip'), (b'BZh', 'bz2'), (b'\xfd7zXZ\x00', 'lzma'))  # Single-file compression formats
+
+
+def is_archive(path) -> bool:
+    """
+    Returns True if a path has an archive extension.
+    """
+    return os.path.splitext(source_name(path))[1].lower() in ARCHIVE_EXTENSIONS
+
+
+def iter_members(source, limits: Optional[ArchiveLimits] = None,
+                 accept: Optional[Callable[[str], bool]] = None) -> Iterator[ArchiveMember]:
+    """
+    Yields the files inside a zip, tar (optionally compressed) or gzip/bzip2/xz file, one at a time.
+
+    Each member is decompressed into memory, never to disk, and released once the caller moves on.
+    Archives inside the archive are opened in place, up to limits.max_depth levels, and their members
+    are yielded with nested paths such as `outer.zip!inner.tar.gz!report.pdf`. Members that would break
+    a limit (size, total size, member count or compression ratio) are yielded with an error and no data.
+
+    Args:
+        source (str or MemberFile): The archive.
+        limits (ArchiveLimits, optional): The bounds. Defaults to ArchiveLimits().
+        accept (callable, optional): Called with each member's path; members it rejects are neither
+            unpacked nor yielded. Nested archives are always opened.
+
+    Yields:
+        ArchiveMember: Each file, in archive order.
+    """
+    limits = limits or ArchiveLimits()
+    yield from _iter_nested(source, limits, accept, _Budget(limits), 0)
+
+
+def _iter_nested(source, limits, accept, budget, depth) -> Iterator[ArchiveMember]:
+    name = source_name(source)
+    with open_source(source) as file:
+        for member in _iter_archive(file, name, limits, budget, accept):
+            if member.file is None or not is_archive(member.path):
+                yield member
+                continue
+            if depth + 1 >= limits.max_depth:
+                yield ArchiveMember(member.path, None, f"skipped: nested deeper than {limits.max_depth} archives")
+                continue
+            try:
+                yield from _iter_nested(member.file, limits, accept, budget, depth + 1)
+            except Exception as e:  # A corrupt inner archive does not stop the outer one
+                yield ArchiveMember(member.path, None, f"unreadable archive: {str(e)}")
+
+
+def _iter_archive(file, name, limits, budget, accept) -> Iterator[ArchiveMember]:
+    """
+    Picks the archive format from the content, so misnamed archives are still opened.
+    """
+    import tarfile  # Loaded with the first archive, keeping scanner startup fast
+    if zipfile.is_zipfile(file):
+        file.seek(0)
+        yield from _iter_zip(file, name, limits, budget, accept)
+        return
+    file.seek(0)
+    header = file.read(8)
+    file.seek(0)
+    is_tar = tarfile.is_tarfile(file)
+    file.seek(0)
+    if is_tar:
+        yield from _iter_tar(file, name, limits, budget, accept)
+        return
+    for signature, module in _COMPRESSORS:
+        if header.startswith(signature):
+            yield from _iter_compressed(file, name, module, limits, budget, accept)
+            return
+    raise ValueError(f"Not a supported archive: {name}")
+
+
+def _take_member(budget, limits, path) -> Optional[ArchiveMember]:
+    """
+    Counts a member against the budget, returning an error member once the count limit is reached.
+    """
+    budget.members -= 1
+    if budget.members < 0:
+        return ArchiveMember(path, None, f"skipped: more than {limits.max_members} archive members")
+    return None
+
+
+def _size_error(size, compressed_size, limits, budget) -> Optional[str]:
+    """
+    Checks a member's declared size before it is unpacked.
+    """
+    if size > limits.max_member_bytes:
+        return f"skipped: {size} bytes exceeds the {limits.max_member_bytes} byte member limit"
+    if size > budget.bytes:
+        return f"skipped: the {limits.max_total_bytes} byte archive limit was reached"
+    if compressed_size is not None and size > max(limits.ratio_floor, limits.max_ratio * compressed_size):
+        return f"skipped: expands {size / max(compressed_size, 1):.0f} times (possible zip bomb)"
+    return None
+
+
+def _read_limited(stream, limit) -> bytes:
+    """
+    Reads a decompressing stream, failing as soon as it yields more than `limit` bytes.
+    Declared sizes can lie, so this is what actually bounds memory.
+    """
+    chunks = []
+    size = 0
+    while True:
+        chunk = stream.read(min(_READ_CHUNK, limit + 1 - size))
+        if not chunk:
+            return b''.join(chunks)
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > limit:
+            raise ArchiveLimitError(f"skipped: expands beyond {limit} bytes (possible zip bomb)")
+
+
+class _LimitedStream:
+    """
+    A decompressing stream that fails as soon as it yields more than `limit` bytes, for parsers that
+    read a member incrementally instead of through _read_limited.
+    """
+    def __init__(self, stream, limit, budget):
+        self.stream = stream
+        self.limit = limit
+        self.budget = budget
+        self.size = 0
+
+    def read(self, size=-1) -> bytes:
+        left = self.limit + 1 - self.size
+        data = self.stream.read(left if size is None or size < 0 or size > left else size)
+        self.size += len(data)
+        self.budget.bytes -= len(data)
+        if self.size > self.limit:
+            raise ArchiveLimitError(f"skipped: expands beyond {self.limit} bytes (possible zip bomb)")
+        return data
+
+    def close(self):
+        self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CheckedZip:
+    """
+    The parts of a zip-based document (DOCX, XLSX, PPTX), decompressed within the ArchiveLimits, so a
+    zip bomb renamed to .xlsx is stopped like one inside an archive.
+    """
+    def __init__(self, archive: zipfile.ZipFile, limits: Optional[ArchiveLimits] = None):
+        self.archive = archive
+        self.limits = limits or ArchiveLimits()
+        self.budget = _Budget(self.limits)  # Shared by all the parts of the document
+
+    def open(self, name: str):
+        """
+        Opens a part for streaming.
+
+        Raises:
+            ArchiveLimitError: If the part's declared size breaks a limit. Parts that lie about their size
+                raise it while being read, once they expand beyond the limits.
+        """
+        info = self.archive.getinfo(name)
+        error = _size_error(info.file_size, info.compress_size, self.limits, self.budget)
+        if error is not None:
+            raise ArchiveLimitError(f"{name} {error}")
+        limit = min(self.limits.max_member_bytes, self.budget.bytes,
+                    max(self.limits.ratio_floor, int(self.limits.max_ratio * info.compress_size)))
+        return _LimitedStream(self.archive.open(info), limit, self.budget)
+
+
+def _unpacked(path, data, budget) -> ArchiveMember:
+    budget.bytes -= len(data)
+    return ArchiveMember(path, MemberFile(data, path))
+
+
+def _iter_zip(file, name, limits, budget, accept) -> Iterator[ArchiveMember]:
+    with zipfile.ZipFile(file) as archive:
+        for info in archive.infolist():
+            path = f"{name}{SEPARATOR}{info.filename}"
+            if info.is_dir() or (accept is not None and not is_archive(path) and not accept(path)):
+                continue
+            stop = _take_member(budget, limits, path)
+            if stop is not None:
+                yield stop
+                return
+            error = _size_error(info.file_size, info.compress_size, limits, budget)
+            if error is not None:
+                yield ArchiveMember(path, None, error)
+                continue
+            limit = min(limits.max_member_bytes, budget.bytes,
+                        max(limits.ratio_floor, int(limits.max_ratio * info.compress_size)))
+            try:
+                with archive.open(info) as stream:
+                    data = _read_limited(stream, limit)
+            except Exception as e:  # Encrypted, corrupt or over the limits
+                yield ArchiveMember(path, None, str(e))
+                continue
+            yield _unpacked(path, data, budget)
+
+
+def _iter_tar(file, name, limits, budget, accept) -> Iterator[ArchiveMember]:
+    import tarfile
+    compressed_size = source_size(file)
+    expanded = 0  # Tar members have no compressed size of their own, so the ratio is checked for the whole stream
+    with tarfile.open(fileobj=file, mode='r:*') as archive:
+        for info in archive:  # Headers are read as the iteration reaches them
+            if not info.isfile():
+                continue
+            path = f"{name}{SEPARATOR}{info.name}"
+            expanded += info.size
+            if expanded > max(limits.ratio_floor, limits.max_ratio * compressed_size):
+                yield ArchiveMember(path, None, f"skipped: archive expands more than {limits.max_ratio:.0f} times "
+                                                f"(possible tar bomb)")
+                return
+            if accept is not None and not is_archive(path) and not accept(path):
+                continue
+            stop = _take_member(budget, limits, path)
+            if stop is not None:
+                yield stop
+                return
+            error = _size_error(info.size, None, limits, budget)
+            if error is not None:
+                yield ArchiveMember(path, None, error)
+                continue
+            try:
+                stream = archive.extractfile(info)
+                data = _read_limited(stream, info.size)
+            except Exception as e:
+                yield ArchiveMember(path, None, str(e))
+                continue
+            yield _unpacked(path, data, budget)
+
+
+def _iter_compressed(file, name, module, limits, budget, accept) -> Iterator[ArchiveMember]:
+    """
+    A single compressed file (report.txt.gz) is an archive with one member named after it.
+    """
+    inner = os.path.splitext(os.path.basename(name.rsplit(SEPARATOR, 1)[-1]))[0]
+    path = f"{name}{SEPARATOR}{inner}"
+    if accept is not None and not is_archive(path) and not accept(path):
+        return
+    stop = _take_member(budget, limits, path)
+    if stop is not None:
+        yield stop
+        return
+    limit = min(limits.max_member_bytes, budget.bytes,
+                max(limits.ratio_floor, int(limits.max_ratio * source_size(file))))
+    try:
+        with importlib.import_module(module).open(file) as stream:
+            data = _read_limited(stream, limit)
+    except Exception as e:
+        yield ArchiveMember(path, None, str(e))
+        return
+    yield _unpacked(path, data, budget)
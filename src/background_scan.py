@@ -0,0 +1,154 @@
+#Background scanning for the GUI
+#Runs a scan on a worker thread and hands results over through a queue
+import time
+import queue
+import logging
+import threading
+from typing import List
+
+_DONE = object()  # Queue sentinel marking the end of the scan
+
+
+class BackgroundScan:
+    """
+    Runs ScanEngine.scan_directory on a worker thread.
+
+    Records are put on a bounded queue that the UI drains on a timer, so the UI thread never blocks
+    on file I/O or OCR and can insert results in batches. The scan can be paused, resumed and cancelled.
+    """
+    def __init__(self, engine, folder_path, queue_size: int = 10000):
+        """
+        Initializes the BackgroundScan class.
+
+        Args:
+            engine (ScanEngine): The engine used to scan the folder.
+            folder_path (str): The folder to scan.
+            queue_size (int): Maximum number of records waiting for the UI before the scan blocks.
+        """
+        self.engine = engine
+        self.folder_path = folder_path
+        self.scanned = 0  # Records produced so far
+        self.progress = 0.0  # Latest progress estimate, between 0 and 1
+        self.finished = False  # True once every record has been drained
+        self.cancelled = False
+        self.error = None  # Set if the scan stopped because of an exception
+        self.logger = logging.getLogger(__name__)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._cancel = threading.Event()
+        self._resume = threading.Event()
+        self._resume.set()  # Not paused
+        self._started_at = None
+        self._paused_at = None
+        self._paused_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, name='background-scan', daemon=True)
+
+    def start(self):
+        """
+        Starts scanning on the worker thread.
+        """
+        self._started_at = time.monotonic()
+        self._thread.start()
+
+    def _run(self):
+        try:
+            for record in self.engine.scan_directory(self.folder_path, estimate_progress=True):
+                self._resume.wait()  # Blocks while paused
+                if self._cancel.is_set():
+                    break
+                if not self._put(record):
+                    break
+                self.scanned += 1
+        except Exception as e:
+            self.error = str(e)
+            self.logger.error(f"Error scanning folder {self.folder_path}: {str(e)}")
+        finally:
+            self._put(_DONE, force=True)
+
+    def _put(self, item, force=False) -> bool:
+        """
+        Puts an item on the queue, blocking while it is full until the UI drains it.
+
+        Once the scan is cancelled (which the GUI also does when its window closes) nobody may drain any more:
+        a record is then given up, and a forced item (the end-of-scan sentinel) makes room by dropping the
+        oldest waiting record. Records of a scan that was not cancelled are never dropped.
+        """
+        while True:
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if not self._cancel.is_set():
+                    continue
+                if not force:
+                    return False
+                self._drop_oldest()
+
+    def _drop_oldest(self):
+        try:
+            self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def drain(self, max_items: int = 500) -> List:
+        """
+        Returns the records waiting in the queue without blocking.
+
+        Args:
+            max_items (int): Maximum number of records returned in one call.
+
+        Returns:
+            list: ScanRecord objects, in scan order.
+        """
+        records = []
+        while len(records) < max_items:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                self.finished = True
+                break
+            records.append(item)
+        if records and records[-1].progress is not None:
+            self.progress = records[-1].progress
+        return records
+
+    def pause(self):
+        if self._resume.is_set():
+            self._paused_at = time.monotonic()
+            self._resume.clear()
+
+    def resume(self):
+        if not self._resume.is_set():
+            self._paused_seconds += time.monotonic() - self._paused_at
+            self._resume.set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._resume.is_set()
+
+    def cancel(self):
+        """
+        Stops the scan. Files already in flight finish, but no new ones are started.
+        """
+        self.cancelled = True
+        self._cancel.set()
+        self.resume()  # Wake a paused worker so it can exit
+
+    def join(self, timeout=None):
+        """
+        Waits for the worker thread to exit.
+        """
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def files_per_second(self) -> float:
+        """
+        Returns the average scan rate, excluding time spent paused.
+        """
+        if self._started_at is None:
+            return 0.0
+        now = time.monotonic()
+        paused = self._paused_seconds + (now - self._paused_at if self.paused else 0.0)
+        elapsed = now - self._started_at - paused
+        return self.scanned / elapsed if elapsed > 0 else 0.0
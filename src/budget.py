@@ -0,0 +1,81 @@
+#Per-file resource budgets
+#Bounds the bytes, pages, pixels and time a single file may use, and the memory of worker processes
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+DEFAULT_MAX_IMAGE_PIXELS = 89_478_485  # Pillow's own decompression bomb threshold (about 0.25 GB of RGB)
+
+
+@dataclass
+class ScanBudget:
+    """
+    Resources one file may use before its scan is cut short.
+
+    A file that exceeds its budget is not an error: its record gets status "partial" (the text read so far
+    was analyzed) or "skipped" (nothing was read), with the reason.
+    """
+    max_file_bytes: Optional[int] = None  # Larger files are skipped; text files are read up to this many bytes
+    max_pages: Optional[int] = None  # PDF pages read per file, the rest are left out
+    max_image_pixels: Optional[int] = DEFAULT_MAX_IMAGE_PIXELS  # Larger images are downsampled, or skipped when too large to decode
+    timeout: Optional[float] = None  # Wall-clock seconds per file, Tesseract included
+    max_worker_rss: Optional[int] = None  # Bytes of resident memory after which a worker process is replaced
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised by the readers when a file goes over its ScanBudget.
+    """
+    def __init__(self, reason: str, partial: bool = True):
+        super().__init__(reason)
+        self.reason = reason
+        self.partial = partial  # False when the file was rejected before any of it was read
+
+
+class Deadline:
+    """
+    The time left for one file.
+    """
+    def __init__(self, seconds: Optional[float]):
+        self.seconds = seconds
+        self.expires = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self) -> Optional[float]:
+        """
+        Returns the seconds left (never below a millisecond, so it can be passed on as a timeout), or None without a limit.
+        """
+        if self.expires is None:
+            return None
+        return max(self.expires - time.monotonic(), 0.001)
+
+    def check(self):
+        """
+        Raises BudgetExceeded once the time is up.
+        """
+        if self.expires is not None and time.monotonic() >= self.expires:
+            raise BudgetExceeded(f"timed out after {self.seconds:g} seconds")
+
+
+NO_DEADLINE = Deadline(None)
+
+
+def current_rss() -> Optional[int]:
+    """
+    Returns the resident memory of this process in bytes, or None if it cannot be measured.
+
+    Reads /proc on Linux. Elsewhere it falls back to the peak RSS from getrusage, which never shrinks,
+    so a worker over the limit is still replaced.
+    """
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except (ImportError, OSError):
+        return None
+    return peak if sys.platform == 'darwin' else peak * 1024  # Bytes on macOS, kilobytes elsewhere
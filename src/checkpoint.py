@@ -0,0 +1,75 @@
+#Scan checkpoints
+#Remembers which files a long scan has finished so it can resume after a crash
+import os
+import logging
+
+DEFAULT_FLUSH_EVERY = 100  # Finished paths buffered before they are written to the checkpoint file
+
+
+class ScanCheckpoint:
+    """
+    An append-only file listing the paths a scan has finished, one per line.
+
+    Paths are buffered and appended in batches; call flush() after the corresponding output has been
+    flushed, so a crash can only cause files to be scanned (and reported) again, never skipped. A
+    partially written last line is ignored when the checkpoint is loaded.
+    """
+    def __init__(self, path, flush_every: int = DEFAULT_FLUSH_EVERY):
+        """
+        Initializes the ScanCheckpoint class, loading the paths finished by a previous run.
+
+        Args:
+            path (str): The checkpoint file. Created if it does not exist.
+            flush_every (int): How many finished paths are buffered before flush() writes them.
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self.done = set()  # Paths finished by this or a previous run
+        self.logger = logging.getLogger(__name__)
+        self._pending = []
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8', errors='surrogateescape') as f:
+                for line in f:
+                    if line.endswith('\n'):  # A line without newline was cut off by a crash
+                        self.done.add(line[:-1])
+        self._file = open(path, 'a', encoding='utf-8', errors='surrogateescape')
+
+    def __contains__(self, file_path):
+        return file_path in self.done
+
+    def __len__(self):
+        return len(self.done)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def mark(self, file_path) -> bool:
+        """
+        Records a finished file.
+
+        Returns:
+            bool: True when enough paths are buffered that the caller should flush its output and then the checkpoint.
+        """
+        self.done.add(file_path)
+        self._pending.append(file_path)
+        return len(self._pending) >= self.flush_every
+
+    def flush(self):
+        """
+        Appends the buffered paths to the checkpoint file.
+        """
+        if not self._pending:
+            return
+        self._file.write(''.join(f"{file_path}\n" for file_path in self._pending))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending.clear()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
@@ -1,5 +1,68 @@
-import json
-import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import Dict, List, NamedTuple, Optional
+
+try:
+    from .rules import RuleSet, get_manager, load_rule_set
+except ImportError:  # Running with src/ on sys.path (CLI and tests)
+    from rules import RuleSet, get_manager, load_rule_set
+
+DEFAULT_BATCH_SIZE = 256  # Documents sent to a worker process per task
+DEFAULT_MAX_MATCHES = 50  # Matches kept with their snippets in an AnalysisResult (counts and scores cover all)
+DEFAULT_SNIPPET_CHARS = 40  # Characters of context kept on each side of a match
+
+_batch_analyzer = None  # Per-process ContentAnalyzer, created by _init_batch_worker
+
+
+def _init_batch_worker(rules_path, source=None):
+    """
+    Loads the rules once in each worker process, so tasks only carry the documents.
+
+    Args:
+        rules_path (str): The rules file.
+        source (bytes, optional): The rules the parent is using, so workers score with the same version
+            even if the file changes meanwhile.
+    """
+    global _batch_analyzer
+    _batch_analyzer = ContentAnalyzer(rule_set=load_rule_set(rules_path, source))
+
+
+def _score_batch(texts, counts):
+    """
+    Process pool entry point: scores a batch of documents with the worker's analyzer.
+    """
+    score = _batch_analyzer.count_levels if counts else _batch_analyzer.determine_sensitivity
+    return [score(text) for text in texts]
+
+
+class MatchDetail(NamedTuple):
+    """
+    A keyword or pattern match with the text around it.
+    """
+    term: str  # The keyword, or the pattern rule name
+    level: str  # The level the term belongs to
+    start: int  # Offset of the match in the document
+    end: int  # Offset just past the match
+    weight: float  # The term's weight in its level's score
+    snippet: str  # The match with up to snippet_chars of context on each side, whitespace collapsed
+
+
+@dataclass
+class AnalysisResult:
+    """
+    Why a document got its sensitivity level.
+    """
+    level: str  # The first level in rule order that applies, or "unknown"
+    score: float  # The weighted score of that level
+    confidence: float  # That level's share of the total weighted score, from 0 to 1
+    counts: Dict[str, int]  # Matches per level
+    scores: Dict[str, float]  # Weighted score per level
+    terms: Dict[str, int]  # Every matched term with its number of occurrences
+    matches: List[MatchDetail]  # The first max_matches matches, in document order
+    total_matches: int  # Matches found, including those not kept in `matches`
+
 
 # Content analysis logic
 # Handles sensitivity scoring and rules
@@ -7,19 +70,207 @@ class ContentAnalyzer:
     """
     Class to analyze the content of files and determine their sensitivity score using rules from a JSON file.
     """
-    def __init__(self, rules_path=None):
-        if rules_path is None:
-            rules_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'rules.json')
-        with open(rules_path, 'r', encoding='utf-8') as f:
-            self.rules = json.load(f)
+    def __init__(self, rules_path=None, rule_set: Optional[RuleSet] = None):
+        """
+        Args:
+            rules_path (str, optional): The rules file. Defaults to config/rules.json. Analyzers of the same file
+                share one compiled copy of the rules (see rules.get_manager).
+            rule_set (RuleSet, optional): Use this version of the rules instead of the file's current one.
+        """
+        self.rule_set = rule_set or get_manager(rules_path).latest()
+        self.rules_path = self.rule_set.path  # Kept so worker processes can load the same rules
+        self.rules = self.rule_set.rules
+        self.rules_version = self.rule_set.version  # Identifies the rules that produced a result
+        self.matcher = self.rule_set.matcher
+
+    def reloaded(self):
+        """
+        Returns an analyzer for the newest version of the rules file, or this analyzer if the rules are unchanged.
+
+        Analyzers never change their rules, so work already handed this analyzer finishes on its version.
+        """
+        current = get_manager(self.rules_path).latest()
+        return self if current.version == self.rules_version else ContentAnalyzer(rule_set=current)
 
     def analyze_file(self, file_content):
         return self.determine_sensitivity(file_content)
 
+    def find_matches(self, content):
+        """
+        Returns every keyword occurrence in the content with its level and offset.
+
+        Args:
+            content (str): The text to analyze.
+
+        Returns:
+            list: KeywordMatch entries ordered by offset in the lowercased content.
+        """
+        return self.matcher.find_all(content.lower())
+
+    def stream(self, max_matches=DEFAULT_MAX_MATCHES, snippet_chars=DEFAULT_SNIPPET_CHARS):
+        """
+        Returns a ContentStream for analyzing a document delivered in chunks.
+        """
+        return ContentStream(self.matcher, max_matches, snippet_chars)
+
+    def analyze(self, content, max_matches=DEFAULT_MAX_MATCHES, snippet_chars=DEFAULT_SNIPPET_CHARS):
+        """
+        Analyzes the content and explains the result, in the same single pass as determine_sensitivity.
+
+        Args:
+            content (str): The text to analyze.
+            max_matches (int): Matches kept with offsets and snippets; counts and scores cover every match.
+            snippet_chars (int): Characters of context on each side of a match.
+
+        Returns:
+            AnalysisResult: The level with per-level counts and scores, matched terms and snippets.
+        """
+        stream = self.stream(max_matches, snippet_chars)
+        stream.feed(content)
+        stream.finish()
+        return stream.result()
+
     def determine_sensitivity(self, content):
-        content_lower = content.lower()
-        for level, keywords in self.rules.items():
-            for keyword in keywords:
-                if keyword in content_lower:
-                    return level
-        return "unknown"
\ No newline at end of file
+        return self.matcher.best_level(content.lower())
+
+    def count_levels(self, content):
+        """
+        Counts the keyword occurrences of each sensitivity level in the content.
+
+        Args:
+            content (str): The text to analyze.
+
+        Returns:
+            dict: Every level mapped to its number of keyword occurrences.
+        """
+        return self.matcher.count_levels(content.lower())
+
+    def analyze_many(self, texts, workers=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Scores many documents, e.g. to re-score an extracted-text corpus against new rules.
+
+        Args:
+            texts (iterable): The documents to score. Consumed lazily.
+            workers (int, optional): Number of worker processes. Defaults to scoring in this process.
+            batch_size (int): Documents per worker task.
+
+        Yields:
+            str: The sensitivity level of each document, in input order.
+        """
+        return self._score_many(texts, False, workers, batch_size)
+
+    def count_many(self, texts, workers=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Counts keyword occurrences per level for many documents.
+
+        Args:
+            texts (iterable): The documents to analyze. Consumed lazily.
+            workers (int, optional): Number of worker processes. Defaults to counting in this process.
+            batch_size (int): Documents per worker task.
+
+        Yields:
+            dict: Every level mapped to its number of keyword occurrences, for each document in input order.
+        """
+        return self._score_many(texts, True, workers, batch_size)
+
+    def _score_many(self, texts, counts, workers, batch_size):
+        score = self.count_levels if counts else self.determine_sensitivity
+        if not workers:
+            for text in texts:  # One compiled matcher for the whole batch
+                yield score(text)
+            return
+        texts = iter(texts)
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                 initargs=(self.rules_path, self.rule_set.source)) as pool:
+            try:
+                while True:
+                    batch = list(islice(texts, batch_size))
+                    if batch:
+                        pending.append(pool.submit(_score_batch, batch, counts))
+                    if pending and (not batch or len(pending) >= 2 * workers):  # Bounded read-ahead
+                        yield from pending.popleft().result()
+                    elif not batch:
+                        return
+            finally:
+                for future in pending:  # The consumer stopped early
+                    future.cancel()
+
+
+class ContentStream:
+    """
+    Incremental sensitivity analysis for documents that are read in chunks.
+
+    Each chunk is lowercased on its own, so the whole document is never held in memory twice. Matches
+    are collected as they are found (see result()); a snippet's context after the match stops at the
+    end of the chunk the match completed in.
+    """
+    def __init__(self, matcher, max_matches=DEFAULT_MAX_MATCHES, snippet_chars=DEFAULT_SNIPPET_CHARS):
+        self._stream = matcher.stream()
+        self.max_matches = max_matches
+        self.snippet_chars = snippet_chars
+        self._matches = []
+        self._terms = {}
+        self._total = 0
+        self._keep = matcher.overlap + snippet_chars  # Context kept from earlier chunks for snippets
+        self._context = ''
+        self._context_offset = 0  # Document offset of the first character of _context
+
+    def feed(self, text):
+        """
+        Analyzes the next chunk of the document and returns the keyword matches it completed.
+        """
+        lowered = text.lower()
+        found = self._stream.feed(lowered)
+        source = text if len(lowered) == len(text) else lowered  # Offsets are in the lowercased text
+        if found:
+            self._collect(found, source)
+        if len(source) >= self._keep:
+            self._context_offset += len(self._context) + len(source) - self._keep
+            self._context = source[len(source) - self._keep:]
+        else:
+            window = self._context + source
+            self._context = window[max(0, len(window) - self._keep):]
+            self._context_offset += len(window) - len(self._context)
+        return found
+
+    def finish(self):
+        """
+        Ends the document, collecting the matches the last chunk held back (see MatchStream.feed).
+        """
+        found = self._stream.finish()
+        if found:
+            self._collect(found, '')
+        return found
+
+    def _collect(self, found, source):
+        window = self._context + source
+        chars = self.snippet_chars
+        for match in found:
+            self._total += 1
+            self._terms[match.keyword] = self._terms.get(match.keyword, 0) + 1
+            if len(self._matches) < self.max_matches:
+                start = match.start - self._context_offset
+                end = match.end - self._context_offset
+                snippet = ' '.join(window[max(0, start - chars):end + chars].split())
+                self._matches.append(MatchDetail(match.keyword, match.level, match.start, match.end,
+                                                 match.weight, snippet))
+
+    def result(self):
+        """
+        Returns the AnalysisResult for the text fed so far.
+        """
+        stream = self._stream
+        level = stream.level
+        score = stream.scores.get(level, 0.0)
+        total = sum(stream.scores.values())
+        return AnalysisResult(level, score, score / total if total else 0.0, dict(stream.counts),
+                              dict(stream.scores), dict(self._terms), list(self._matches), self._total)
+
+    @property
+    def level(self):
+        return self._stream.level  # The sensitivity of the text fed so far
+
+    @property
+    def decided(self):
+        return self._stream.decided  # True once more text can no longer change the level
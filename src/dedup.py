@@ -0,0 +1,158 @@
+#Duplicate file detection
+#Finds files with identical bytes cheaply (size, then a partial hash, then a full hash) so only one copy is read
+import os
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+try:
+    from .walker import entry_stat
+except ImportError:  # Running with src/ on sys.path (CLI and tests)
+    from walker import entry_stat
+
+DEFAULT_PARTIAL_BYTES = 64 * 1024  # Bytes hashed from each end of a file before its full hash is needed
+_CHUNK_SIZE = 1024 * 1024  # Bytes read at a time for full hashes
+
+logger = logging.getLogger(__name__)
+
+
+class DuplicateGroup(NamedTuple):
+    """
+    Files with identical bytes.
+    """
+    size: int  # Bytes per copy
+    digest: str  # SHA-256 of the bytes
+    paths: List[str]  # Every copy in input order; the first is the one that gets scanned
+
+    @property
+    def wasted_bytes(self) -> int:
+        """
+        Bytes taken up by the copies beyond the first.
+        """
+        return self.size * (len(self.paths) - 1)
+
+
+def _partial_digest(file_path, size, partial_bytes) -> Tuple[str, bool]:
+    """
+    Hashes the first and last partial_bytes of a file.
+
+    Returns:
+        tuple: (hex digest, True when that covered the whole file, so the digest is its full SHA-256).
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        if size <= 2 * partial_bytes:
+            digest.update(f.read())
+            return digest.hexdigest(), True
+        digest.update(f.read(partial_bytes))
+        f.seek(size - partial_bytes)
+        digest.update(f.read(partial_bytes))
+    return digest.hexdigest(), False
+
+
+def _full_digest(file_path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def find_duplicates(items: Iterable, partial_bytes: int = DEFAULT_PARTIAL_BYTES, min_size: int = 1,
+                    metrics=None) -> List[DuplicateGroup]:
+    """
+    Groups files whose bytes are identical.
+
+    Files are first grouped by size, which costs one stat per file (reused from the walk for WalkEntry
+    items). Only files sharing a size are opened: their first and last partial_bytes are
+    hashed, and only files whose partial hashes also match are hashed in full. Hard links to the same inode
+    are hashed once. Files that cannot be read are left out, so they are scanned (and fail) on their own.
+
+    Args:
+        items (iterable): File paths or WalkEntry objects.
+        partial_bytes (int): Bytes hashed from each end of a file in the partial pass.
+        min_size (int): Smaller files are not considered (empty files have nothing to extract).
+        metrics (ScanMetrics, optional): Counts the bytes read for hashing as 'bytes_read'.
+
+    Returns:
+        list: The groups with at least two files, ordered by the position of their first file in the input.
+    """
+    by_size = defaultdict(list)
+    seen = set()
+    for index, item in enumerate(items):
+        if os.fspath(item) in seen:  # The same path listed twice is not a copy of itself
+            continue
+        seen.add(os.fspath(item))
+        try:
+            stat = entry_stat(item) or os.stat(item)
+        except OSError:
+            continue  # Gone since the walk: the scan reports it
+        if stat.st_size >= min_size:
+            by_size[stat.st_size].append((index, os.fspath(item), (stat.st_dev, stat.st_ino)))
+    digests = {}  # ('partial' or 'full', (device, inode)) -> digest, so hard links are read once
+    hashed = 0
+    groups = []
+    for size, files in by_size.items():
+        if len(files) < 2:
+            continue
+        by_partial = defaultdict(list)
+        for index, file_path, inode in files:
+            key = ('partial', inode)
+            try:
+                if key not in digests:
+                    digests[key] = _partial_digest(file_path, size, partial_bytes)
+                    hashed += min(size, 2 * partial_bytes)
+            except OSError as e:
+                logger.warning(f"Could not hash file {file_path}: {str(e)}")
+                continue
+            by_partial[digests[key]].append((index, file_path, inode))
+        for (partial, complete), candidates in by_partial.items():
+            if len(candidates) < 2:
+                continue
+            by_full = defaultdict(list)
+            for index, file_path, inode in candidates:
+                key = ('full', inode)
+                try:
+                    if complete:
+                        digests[key] = partial
+                    elif key not in digests:
+                        digests[key] = _full_digest(file_path)
+                        hashed += size
+                except OSError as e:
+                    logger.warning(f"Could not hash file {file_path}: {str(e)}")
+                    continue
+                by_full[digests[key]].append((index, file_path))
+            for digest, copies in by_full.items():
+                if len(copies) >= 2:
+                    groups.append((copies[0][0], DuplicateGroup(size, digest, [path for _, path in copies])))
+    if metrics is not None and hashed:
+        metrics.count('bytes_read', '', hashed)
+    groups.sort(key=lambda group: group[0])
+    return [group for _, group in groups]
+
+
+def copies_of(groups: Iterable[DuplicateGroup]) -> Tuple[Dict[str, str], Dict[str, int]]:
+    """
+    Maps the groups into what a scan needs to fan results out.
+
+    Returns:
+        tuple: ({path of each extra copy: path of the copy that is scanned},
+            {path of each scanned copy: number of extra copies}).
+    """
+    copies = {}
+    originals = {}
+    for group in groups:
+        original = group.paths[0]
+        originals[original] = len(group.paths) - 1
+        for path in group.paths[1:]:
+            copies[path] = original
+    return copies, originals
+
+
+def group_fields(group: DuplicateGroup) -> Dict[str, object]:
+    """
+    Converts a DuplicateGroup into the flat dict written to a duplicates report.
+    """
+    return {'size': group.size, 'sha256': group.digest, 'copies': len(group.paths),
+            'wasted_bytes': group.wasted_bytes, 'paths': group.paths}
@@ -0,0 +1,499 @@
+#Distributed scans
+#A coordinator shards a directory tree into a SQLite work queue that worker processes on several hosts drain
+import os
+import json
+import time
+import zlib
+import socket
+import sqlite3
+import logging
+import threading
+import contextlib
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    from .file_scanner import FileScanner
+    from .rules import RuleSet, load_rule_set
+    from .scan_engine import ScanEngine
+except ImportError:  # Running with src/ on sys.path (CLI and tests)
+    from file_scanner import FileScanner
+    from rules import RuleSet, load_rule_set
+    from scan_engine import ScanEngine
+
+SHARD_BY = ('hash', 'subtree')  # How plan() splits a tree into shards
+PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'  # Shard statuses
+DEFAULT_SHARDS = 64  # Shards created by hash sharding
+DEFAULT_LEASE = 60.0  # Seconds a worker owns a shard without renewing it before it counts as dead
+DEFAULT_MAX_ATTEMPTS = 3  # Claims of a shard before it is marked failed (it keeps killing its workers)
+DEFAULT_POLL_INTERVAL = 1.0  # Seconds between checks of the queue while waiting for other workers
+_BATCH_FILES = 50  # Results buffered by a worker before they are written to the queue
+_BATCH_SECONDS = 5.0  # ...or after this many seconds, whichever comes first
+_INSERT_EVERY = 1000  # Files inserted per statement while planning
+RESULT_FIELDS = ('sensitivity', 'score', 'terms', 'error', 'status', 'reason', 'cached', 'truncated', 'chars',
+                 'read_ms', 'match_ms', 'rules_version')  # Stored per file, next to the path
+
+
+class Shard(NamedTuple):
+    """
+    A unit of work claimed by a worker.
+    """
+    id: int
+    key: str  # The hash bucket or top-level directory the shard covers
+    attempts: int  # Times the shard has been claimed, this claim included
+
+
+def shard_key(relative_path: str, shard_by: str = 'hash', shards: int = DEFAULT_SHARDS) -> str:
+    """
+    Returns the shard a file belongs to.
+
+    Args:
+        relative_path (str): The path relative to its root, with '/' as separator.
+        shard_by (str): 'hash' spreads files evenly over `shards` buckets by a CRC of the path, which is the
+            same on every host; 'subtree' keeps each top-level directory (and the root's own files) together.
+        shards (int): Number of hash buckets.
+    """
+    if shard_by == 'subtree':
+        head, separator, _ = relative_path.partition('/')
+        return head if separator else '.'
+    return str(zlib.crc32(relative_path.encode('utf-8', 'surrogateescape')) % shards)
+
+
+def default_worker_id() -> str:
+    """
+    Returns an id that names this process in the queue: host name and process id.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def result_row(record) -> tuple:
+    """
+    Converts a ScanRecord into the values of RESULT_FIELDS.
+    """
+    analysis = record.analysis
+    return (
+        record.sensitivity,
+        round(analysis.score, 3) if analysis is not None else None,
+        ';'.join(f"{term}:{count}" for term, count in analysis.terms.items()) if analysis is not None else None,
+        record.error,
+        record.status,
+        record.reason,
+        int(record.cached),
+        int(record.truncated),
+        len(record.content) if record.content is not None else None,
+        round(record.read_seconds * 1000, 3) if record.read_seconds is not None else None,
+        round(record.match_seconds * 1000, 3) if record.match_seconds is not None else None,
+        record.rules_version,
+    )
+
+
+class ShardQueue:
+    """
+    The shared state of a distributed scan: roots, rules, shards, files and their results, in one SQLite file.
+
+    The coordinator plans the scan (plan), waits for it (wait) and reads the merged results (results).
+    Workers claim shards, write results in batches and renew their lease while they work; a shard whose
+    lease expires is handed to the next worker that asks, which only scans the files that have no result
+    yet. Every write checks that the worker still owns the shard, so a worker that was presumed dead and
+    comes back cannot overwrite its successor's claim.
+
+    The database uses SQLite's rollback journal rather than WAL, because WAL needs shared memory and so
+    only works for processes on one host. To spread workers over several hosts, put the queue on a
+    filesystem they all mount with working POSIX locks, and keep the lease well above the clock skew
+    between hosts (leases are wall-clock times).
+    """
+    def __init__(self, db_path, lease_seconds: float = DEFAULT_LEASE, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        """
+        Opens (or creates) the queue.
+
+        Args:
+            db_path (str): The queue database.
+            lease_seconds (float): How long a claim lasts without renewal.
+            max_attempts (int): Claims of one shard before it is given up as failed.
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()  # The worker's heartbeat thread shares the connection
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._connection = sqlite3.connect(db_path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=DELETE')
+        with self._transaction() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value BLOB)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS shards (id INTEGER PRIMARY KEY, key TEXT UNIQUE, status TEXT,'
+                ' worker TEXT, lease_expires REAL, attempts INTEGER DEFAULT 0, files INTEGER)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, root INTEGER, path TEXT, shard INTEGER)')
+            connection.execute('CREATE INDEX IF NOT EXISTS files_shard ON files (shard)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS results (file INTEGER PRIMARY KEY, worker TEXT, '
+                + ', '.join(RESULT_FIELDS) + ')')
+            connection.execute(  # Files inside archives, named by the archive's path plus `path`
+                'CREATE TABLE IF NOT EXISTS members (file INTEGER, position INTEGER, path TEXT, '
+                + ', '.join(RESULT_FIELDS) + ', PRIMARY KEY (file, position))')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """
+        Runs a block as one write transaction, taking SQLite's write lock up front so that reads and the
+        writes that depend on them cannot interleave with another process.
+        """
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._connection
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+            self._connection.execute('COMMIT')
+
+    def _meta(self, key, default=None):
+        with self._lock:
+            row = self._connection.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return default if row is None else row[0]
+
+    @property
+    def planned(self) -> bool:
+        return self._meta('roots') is not None
+
+    @property
+    def roots(self) -> List[str]:
+        """
+        The directories being scanned, as the coordinator sees them.
+        """
+        return json.loads(self._meta('roots', '[]'))
+
+    def rule_set(self) -> RuleSet:
+        """
+        Returns the rules the coordinator planned the scan with, so every worker scores with the same version.
+        """
+        return load_rule_set(self._meta('rules_path'), self._meta('rules_source'))
+
+    def plan(self, roots: Sequence[str], rules_path=None, shard_by: str = 'hash', shards: int = DEFAULT_SHARDS,
+             scanner: Optional[FileScanner] = None) -> bool:
+        """
+        Walks the roots and records every file to scan, grouped into shards.
+
+        A queue is planned once: when the coordinator restarts, the existing plan (and every result already
+        written) is kept.
+
+        Args:
+            roots (sequence): The directories to scan.
+            rules_path (str, optional): The rules file. Defaults to config/rules.json.
+            shard_by (str): 'hash' or 'subtree', see shard_key.
+            shards (int): Number of hash buckets.
+            scanner (FileScanner, optional): Its walker decides which files are scanned. Defaults to supported types.
+
+        Returns:
+            bool: False when the queue had already been planned.
+        """
+        if shard_by not in SHARD_BY:
+            raise ValueError(f"shard_by must be one of {SHARD_BY}, not {shard_by!r}")
+        roots = [os.path.abspath(root) for root in roots]
+        if self.planned:
+            if self.roots != roots:
+                raise ValueError(f"{self.db_path} already plans a scan of {self.roots}")
+            return False
+        rule_set = load_rule_set(rules_path)
+        scanner = scanner or FileScanner()
+        with self._transaction() as connection:  # All or nothing, so workers never see half a plan
+            shard_ids = {}
+            rows = []
+            for root_index, root in enumerate(roots):
+                for entry in scanner.iter_entries(root):
+                    relative = os.path.relpath(entry.path, root).replace(os.sep, '/')
+                    key = shard_key(relative, shard_by, shards)
+                    if key not in shard_ids:
+                        shard_ids[key] = connection.execute(
+                            'INSERT INTO shards (key, status, files) VALUES (?, ?, 0)', (key, PENDING)).lastrowid
+                    rows.append((root_index, relative, shard_ids[key]))
+                    if len(rows) >= _INSERT_EVERY:
+                        connection.executemany('INSERT INTO files (root, path, shard) VALUES (?, ?, ?)', rows)
+                        rows.clear()
+            connection.executemany('INSERT INTO files (root, path, shard) VALUES (?, ?, ?)', rows)
+            connection.execute('UPDATE shards SET files = (SELECT COUNT(*) FROM files WHERE shard = shards.id)')
+            connection.executemany('INSERT INTO meta (key, value) VALUES (?, ?)', [
+                ('roots', json.dumps(roots)), ('shard_by', shard_by),
+                ('rules_path', rule_set.path), ('rules_source', rule_set.source)])
+        self.logger.info(f"Planned {len(shard_ids)} shards in {self.db_path}")
+        return True
+
+    def claim(self, worker: str) -> Optional[Shard]:
+        """
+        Hands a worker the next pending shard, or a shard whose worker's lease has expired.
+
+        Returns:
+            Shard: The claimed shard, or None when no shard is available right now.
+        """
+        with self._transaction() as connection:
+            while True:
+                now = time.time()
+                row = connection.execute(
+                    'SELECT id, key, attempts, worker FROM shards WHERE status = ? OR (status = ? AND lease_expires < ?)'
+                    ' ORDER BY status = ?, id LIMIT 1', (PENDING, RUNNING, now, RUNNING)).fetchone()
+                if row is None:
+                    return None
+                shard_id, key, attempts, previous = row
+                if previous is not None:
+                    self.logger.warning(f"Reassigning shard {key}: worker {previous} stopped renewing its lease")
+                if attempts >= self.max_attempts:
+                    self.logger.error(f"Giving up on shard {key} after {attempts} attempts")
+                    connection.execute('UPDATE shards SET status = ?, worker = NULL WHERE id = ?', (FAILED, shard_id))
+                    continue
+                connection.execute('UPDATE shards SET status = ?, worker = ?, lease_expires = ?, attempts = ?'
+                                   ' WHERE id = ?', (RUNNING, worker, now + self.lease_seconds, attempts + 1, shard_id))
+                return Shard(shard_id, key, attempts + 1)
+
+    def _renew(self, connection, shard: Shard, worker: str) -> bool:
+        return connection.execute('UPDATE shards SET lease_expires = ? WHERE id = ? AND worker = ? AND status = ?',
+                                  (time.time() + self.lease_seconds, shard.id, worker, RUNNING)).rowcount > 0
+
+    def renew(self, shard: Shard, worker: str) -> bool:
+        """
+        Extends a worker's claim on a shard.
+
+        Returns:
+            bool: False when the shard was reassigned meanwhile, so the worker should abandon it.
+        """
+        with self._transaction() as connection:
+            return self._renew(connection, shard, worker)
+
+    def pending_files(self, shard: Shard, roots: Optional[Sequence[str]] = None) -> List[Tuple[int, str]]:
+        """
+        Returns the files of a shard that have no result yet.
+
+        Args:
+            shard (Shard): The claimed shard.
+            roots (sequence, optional): Where the roots are mounted on this host, in plan order. Defaults to
+                the coordinator's paths.
+
+        Returns:
+            list: (file id, absolute path) pairs.
+        """
+        roots = list(roots) if roots else self.roots
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT files.id, files.root, files.path FROM files LEFT JOIN results ON results.file = files.id'
+                ' WHERE files.shard = ? AND results.file IS NULL ORDER BY files.id', (shard.id,)).fetchall()
+        return [(file_id, os.path.join(roots[root], *path.split('/'))) for file_id, root, path in rows]
+
+    def store_results(self, shard: Shard, worker: str, rows: Sequence[tuple], complete: bool = False,
+                      members: Sequence[tuple] = ()) -> bool:
+        """
+        Writes a batch of results and renews the worker's lease, in one transaction.
+
+        Args:
+            shard (Shard): The claimed shard.
+            worker (str): The worker's id.
+            rows (sequence): (file id, *RESULT_FIELDS values) tuples.
+            complete (bool): Mark the shard done as well.
+            members (sequence): (archive file id, position, path after the archive's, *RESULT_FIELDS values)
+                tuples for the files inside archives in `rows`.
+
+        Returns:
+            bool: False (and nothing written) when the shard was reassigned meanwhile.
+        """
+        with self._transaction() as connection:
+            if not self._renew(connection, shard, worker):
+                return False
+            connection.executemany(
+                f"INSERT OR REPLACE INTO results (file, worker, {', '.join(RESULT_FIELDS)})"
+                f" VALUES (?, ?, {', '.join('?' * len(RESULT_FIELDS))})",
+                [(row[0], worker) + tuple(row[1:]) for row in rows])
+            connection.executemany(
+                f"INSERT OR REPLACE INTO members (file, position, path, {', '.join(RESULT_FIELDS)})"
+                f" VALUES (?, ?, ?, {', '.join('?' * len(RESULT_FIELDS))})", members)
+            if complete:
+                connection.execute('UPDATE shards SET status = ?, lease_expires = NULL WHERE id = ?', (DONE, shard.id))
+            return True
+
+    def progress(self) -> dict:
+        """
+        Returns the number of shards per status, and the files planned and finished.
+        """
+        with self._lock:
+            counts = dict(self._connection.execute('SELECT status, COUNT(*) FROM shards GROUP BY status'))
+            files = self._connection.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+            finished = self._connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        progress = {status: counts.get(status, 0) for status in (PENDING, RUNNING, DONE, FAILED)}
+        progress.update(files=files, finished=finished)
+        return progress
+
+    @property
+    def finished(self) -> bool:
+        """
+        True once every shard is done or failed.
+        """
+        progress = self.progress()
+        return progress[PENDING] == 0 and progress[RUNNING] == 0
+
+    def wait(self, poll_interval: float = DEFAULT_POLL_INTERVAL, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until every shard is done or failed.
+
+        Returns:
+            bool: False if the timeout ran out first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        reported = None
+        while True:
+            progress = self.progress()
+            if progress[PENDING] == 0 and progress[RUNNING] == 0:
+                return True
+            if progress['finished'] != reported:
+                reported = progress['finished']
+                self.logger.info(f"{reported} of {progress['files']} files scanned, {progress[RUNNING]} shards running")
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_interval)
+
+    def results(self) -> Iterator[dict]:
+        """
+        Yields the merged results, one dict per planned file in walk order, with 'path' and RESULT_FIELDS.
+        The files inside an archive come before the archive itself, as in a local scan.
+
+        Files of a failed shard that never got a result are reported with an error.
+        """
+        roots = self.roots
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT files.root, files.path, shards.status, results.file, "
+                f"{', '.join('results.' + name for name in RESULT_FIELDS)} FROM files"
+                f" JOIN shards ON shards.id = files.shard LEFT JOIN results ON results.file = files.id"
+                f" ORDER BY files.id").fetchall()
+            members = {}
+            for file_id, path, *values in self._connection.execute(
+                    f"SELECT file, path, {', '.join(RESULT_FIELDS)} FROM members ORDER BY file, position"):
+                members.setdefault(file_id, []).append((path, values))
+        for root, path, status, file_id, *values in rows:
+            path = os.path.join(roots[root], *path.split('/'))
+            for member_path, member_values in members.get(file_id, ()):
+                yield self._result_fields(path + member_path, member_values)
+            fields = self._result_fields(path, values)
+            if file_id is None:
+                fields['error'] = 'shard failed' if status == FAILED else 'not scanned'
+            yield fields
+
+    @staticmethod
+    def _result_fields(path, values) -> dict:
+        fields = {'path': path}
+        fields.update(zip(RESULT_FIELDS, values))
+        if fields['cached'] is not None:  # Stored as integers; None when the file has no result
+            fields['cached'] = bool(fields['cached'])
+            fields['truncated'] = bool(fields['truncated'])
+        return fields
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class ShardWorker:
+    """
+    Claims shards from a ShardQueue and scans them with a ScanEngine until the whole queue is finished.
+
+    A background thread renews the lease on the current shard, so a single slow file (a long OCR job) does
+    not make a live worker look dead. After its own shards run out the worker keeps polling while other
+    shards are still running, so it can take over the shards of workers that die.
+    """
+    def __init__(self, queue: ShardQueue, worker_id: Optional[str] = None, roots: Optional[Sequence[str]] = None,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, **engine_options):
+        """
+        Initializes the ShardWorker class.
+
+        Args:
+            queue (ShardQueue): The planned queue.
+            worker_id (str, optional): Names this worker in the queue. Defaults to host name and process id.
+            roots (sequence, optional): Where the scanned roots are mounted on this host, when it differs from
+                the coordinator.
+            poll_interval (float): Seconds between claims while no shard is available.
+            **engine_options: Passed to the ScanEngine (process_workers, cache, budget, ...). The rules always
+                come from the queue.
+        """
+        self.queue = queue
+        self.worker_id = worker_id or default_worker_id()
+        self.roots = roots
+        self.poll_interval = poll_interval
+        self.engine = ScanEngine(rule_set=queue.rule_set(), **engine_options)
+        self.files = 0  # Files scanned by this worker
+        self.logger = logging.getLogger(__name__)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def run(self, wait: bool = True) -> int:
+        """
+        Scans shards until none is left.
+
+        Args:
+            wait (bool): Keep polling while other workers still hold shards, to take over those that die.
+                When False, return as soon as no shard can be claimed.
+
+        Returns:
+            int: The number of files this worker scanned.
+        """
+        while True:
+            shard = self.queue.claim(self.worker_id)
+            if shard is not None:
+                self.scan_shard(shard)
+            elif not wait or self.queue.finished:
+                return self.files
+            else:
+                time.sleep(self.poll_interval)
+
+    def scan_shard(self, shard: Shard) -> bool:
+        """
+        Scans the unfinished files of a claimed shard and marks it done.
+
+        Returns:
+            bool: False if the shard was reassigned before this worker finished it.
+        """
+        files = self.queue.pending_files(shard, self.roots)
+        self.logger.info(f"Worker {self.worker_id} scanning shard {shard.key} ({len(files)} files)")
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(shard, stop), daemon=True)
+        heartbeat.start()
+        records = self.engine.scan_paths(path for _, path in files)
+        try:
+            batch = []
+            members = []
+            flushed = time.monotonic()
+            for (file_id, _), record in zip(files, records):
+                batch.append((file_id, *result_row(record)))
+                members.extend((file_id, position, member.path[len(record.path):], *result_row(member))
+                               for position, member in enumerate(record.members or ()))
+                self.files += 1
+                if len(batch) >= _BATCH_FILES or time.monotonic() - flushed >= _BATCH_SECONDS:
+                    if not self.queue.store_results(shard, self.worker_id, batch, members=members):
+                        self.logger.warning(f"Lost shard {shard.key} to another worker")
+                        return False
+                    batch.clear()
+                    members.clear()
+                    flushed = time.monotonic()
+            return self.queue.store_results(shard, self.worker_id, batch, complete=True, members=members)
+        finally:
+            records.close()
+            stop.set()
+            heartbeat.join()
+
+    def _heartbeat(self, shard, stop):
+        while not stop.wait(self.queue.lease_seconds / 3):
+            try:
+                if not self.queue.renew(shard, self.worker_id):
+                    return
+            except sqlite3.Error as e:  # A busy shared filesystem; the next beat tries again
+                self.logger.warning(f"Could not renew the lease on shard {shard.key}: {str(e)}")
+
+    def close(self):
+        self.engine.close()
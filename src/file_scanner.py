@@ -1,22 +1,158 @@
 #Contains logic for recursively scanning directory
 #Manages file operations
+import io
 import os
-import pytesseract
-from PIL import Image
-import docx
-import pypdf
+import re
+import math
+import codecs
+import zipfile
+from xml.etree import ElementTree
+import time
 import logging
-from typing import Optional # Type hint for optional parameters
+import threading
+from dataclasses import dataclass
+from typing import Iterator, Optional # Type hint for optional parameters
+
+try:
+    from .archives import SEPARATOR, ArchiveLimits, CheckedZip, iter_members
+    from .budget import NO_DEADLINE, BudgetExceeded, Deadline, ScanBudget
+    from .content_analyzer import AnalysisResult, ContentAnalyzer
+    from .metrics import NULL_METRICS, file_type
+    from .ocr import OcrEngine
+    from .readers import IMAGE_EXTENSIONS, REGISTRY, MemberFile, ReaderRegistry, open_source, source_name, source_size
+    from .walker import DirectoryWalker, entry_stat
+except ImportError:  # Running with src/ on sys.path (CLI and tests)
+    from archives import SEPARATOR, ArchiveLimits, CheckedZip, iter_members
+    from budget import NO_DEADLINE, BudgetExceeded, Deadline, ScanBudget
+    from content_analyzer import AnalysisResult, ContentAnalyzer
+    from metrics import NULL_METRICS, file_type
+    from ocr import OcrEngine
+    from readers import IMAGE_EXTENSIONS, REGISTRY, MemberFile, ReaderRegistry, open_source, source_name, source_size
+    from walker import DirectoryWalker, entry_stat
+
+
+@dataclass
+class ScanRecord:
+    """
+    The result of scanning a single file.
+    """
+    path: str  # The path to the file; archive members are named like archive.zip!inner/report.pdf
+    content: Optional[str]  # The extracted text, or None if the file could not be read (or is an archive)
+    sensitivity: Optional[str]  # The sensitivity level, or None if there was no content to analyze
+    error: Optional[str] = None  # Set when the file could not be scanned at all
+    progress: Optional[float] = None  # Estimated fraction of the scan completed, when requested
+    cached: bool = False  # True when the result came from the ScanCache instead of reading the file
+    truncated: bool = False  # True when content is only a prefix (size limits or an early decision)
+    read_seconds: Optional[float] = None  # Time spent opening the file and extracting its text
+    match_seconds: Optional[float] = None  # Time spent matching keywords
+    members: Optional[list] = None  # For an archive, the records of the files inside it
+    analysis: Optional[AnalysisResult] = None  # Match counts, scores and matched terms (None for cached records)
+    rules_version: Optional[str] = None  # The version of the rules that produced `sensitivity`
+    status: Optional[str] = None  # "partial" or "skipped" when the file went over its ScanBudget, "prefix" when cut at max_bytes
+    reason: Optional[str] = None  # Why the file was partially read or skipped
+    duplicate_of: Optional[str] = None  # Set when the result was copied from a file with identical bytes
+
+
+class _FileCounter:
+    """
+    Counts the files under a directory in a background thread to estimate scan progress.
+    """
+    def __init__(self, scanner, path):
+        self.count = 0  # Files discovered so far
+        self.finished = False  # True once the whole tree has been counted
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(scanner, path), daemon=True)
+        self._thread.start()
+
+    def _run(self, scanner, path):
+        for _ in scanner.iter_files(path):
+            if self._stop.is_set():
+                return
+            self.count += 1
+        self.finished = True
+
+    def estimate(self, processed) -> float:
+        """
+        Returns the estimated fraction of files processed (capped below 1 until counting finishes).
+        """
+        if self.finished:
+            return processed / self.count if self.count else 1.0
+        return min(processed / max(self.count, 1), 0.99)
+
+    def stop(self):
+        self._stop.set()
+
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # Bytes read from text files at a time
+DEFAULT_CONTENT_LIMIT = 1024 * 1024  # Characters of extracted text kept in a ScanRecord
+DEFAULT_MIN_PAGE_CHARS = 20  # A PDF page with less text than this is treated as a scan and OCR'd
+_IMAGE_DECODE_FACTOR = 4  # Non-JPEG images up to this many times the pixel budget are decoded, then reduced to fit
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'  # WordprocessingML namespace
+_DOCX_TEXT, _DOCX_TAB, _DOCX_PARAGRAPH = _W + 't', _W + 'tab', _W + 'p'
+_DOCX_BREAKS = (_W + 'br', _W + 'cr')
+_DOCX_CONTAINERS = (_W + 'body', _W + 'hdr', _W + 'ftr')  # Children are cleared once parsed, keeping memory flat
+_DOCX_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'  # Repeats its mc:Choice
+_DOCX_EXTRA_PARTS = re.compile(r'word/(header|footer)\d*\.xml$')  # Parsed after word/document.xml
+_DOCX_CHUNK_CHARS = 64 * 1024  # DOCX text is yielded in chunks of about this size, so a decision can stop parsing early
+
 
 class FileScanner:
-    def __init__(self):
+    def __init__(self, max_bytes: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 content_limit: int = DEFAULT_CONTENT_LIMIT, deep_ocr: bool = False,
+                 min_page_chars: int = DEFAULT_MIN_PAGE_CHARS, ocr: Optional[OcrEngine] = None,
+                 walker: Optional[DirectoryWalker] = None, metrics=None,
+                 registry: Optional[ReaderRegistry] = None, archive_limits: Optional[ArchiveLimits] = None,
+                 budget: Optional[ScanBudget] = None, filesystem=None):
         """
         Initializes the FileScanner class.
         This class is responsible for scanning directories and reading files.
+
+        Args:
+            max_bytes (int, optional): Stop reading a text file after this many bytes. Defaults to no limit.
+            chunk_size (int): Bytes read from a text file at a time when streaming it.
+            content_limit (int): Characters of text kept in ScanRecord.content; the rest is analyzed but not kept.
+            deep_ocr (bool): OCR the images of every PDF page, even pages with a usable text layer.
+            min_page_chars (int): PDF pages with less extracted text than this are OCR'd.
+            ocr (OcrEngine, optional): The OCR layer (result cache and preprocessing). Defaults to a new OcrEngine.
+            walker (DirectoryWalker, optional): Enumerates files for iter_scan. Defaults to a walker that only
+                yields supported file types and skips DEFAULT_SKIP_DIRS.
+            metrics (ScanMetrics, optional): Records per-stage timings and counters. Defaults to NULL_METRICS (disabled).
+            registry (ReaderRegistry, optional): The reader plugins by file type. Defaults to readers.REGISTRY.
+            archive_limits (ArchiveLimits, optional): Nesting, size and compression ratio bounds for archives,
+                also applied to the parts of DOCX, XLSX and PPTX files.
+            budget (ScanBudget, optional): Bytes, pages, pixels and time allowed per file. Defaults to ScanBudget(),
+                which only bounds image pixels.
+            filesystem (LocalFilesystem, optional): Read each file through this (e.g. a prefetch.LatencyFilesystem
+                standing in for a network share) and parse it from memory; text files are read only up to the
+                byte limit. Defaults to opening files directly.
         """
-        self.supported_images = ('.png', '.jpg', '.jpeg', '.tiff', '.bmp')  # Supported image file extensions
+        self.registry = registry or REGISTRY
+        self.supported_images = IMAGE_EXTENSIONS  # Supported image file extensions
+        self.supported_extensions = self.registry.extensions()  # Everything read_file handles
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.content_limit = content_limit
+        self.deep_ocr = deep_ocr
+        self.min_page_chars = min_page_chars
+        self.ocr = ocr or OcrEngine()
+        self.walker = walker or DirectoryWalker(extensions=self.supported_extensions)  # Unsupported files are never opened
+        self.metrics = metrics or NULL_METRICS
+        self.archive_limits = archive_limits or ArchiveLimits()
+        self.budget = budget or ScanBudget()
+        self.filesystem = filesystem
+        self._local = threading.local()  # The deadline of the file each thread is scanning
         self.logger = logging.getLogger(__name__)  # Logger for logging messages
 
+    @property
+    def options_key(self) -> str:
+        """
+        The options that change the text extracted from a file, so ScanCache entries are only reused by
+        scans that would extract the same text.
+        """
+        return (f"max_bytes={self.max_bytes} deep_ocr={int(self.deep_ocr)} min_page_chars={self.min_page_chars}"
+                f" max_image_pixels={self.budget.max_image_pixels}")
+
     '''
         def scan_directory(self, path):
             """
@@ -40,7 +176,357 @@ class FileScanner:
                         })
             return files  # Return the list of files found
         '''
-                    
+
+    def iter_entries(self, path) -> Iterator:
+        """
+        Lazily yields the files under a directory that pass the walker's filters.
+
+        Args:
+            path (str): The path to the directory to scan.
+
+        Yields:
+            WalkEntry: Each file, with its stat data cached from the directory listing.
+        """
+        return self.walker.walk(path)
+
+    def iter_files(self, path) -> Iterator[str]:
+        """
+        Lazily yields every file path under a directory that passes the walker's filters.
+
+        Args:
+            path (str): The path to the directory to scan.
+
+        Yields:
+            str: The path of each file, in walk order.
+        """
+        for entry in self.iter_entries(path):
+            yield entry.path
+
+    def scan_file(self, file_path, analyzer, cache=None) -> ScanRecord:
+        """
+        Reads and analyzes a single file.
+
+        Args:
+            file_path (str, WalkEntry or MemberFile): The file, or its bytes already in memory (e.g. read ahead
+                by a Prefetcher).
+            analyzer (ContentAnalyzer): The analyzer used to score the content.
+            cache (ScanCache, optional): Returns the cached result when the file is unchanged.
+
+        Returns:
+            ScanRecord: The record for the file (sensitivity is None when nothing could be read). An archive's
+                record lists its members' records and carries the highest of their levels.
+        """
+        metrics = self.metrics
+        started = time.perf_counter()
+        kind = file_type(source_name(file_path))
+        stat = None
+        if cache is not None:
+            record, stat = cache.get_record(source_name(file_path), analyzer, entry_stat(file_path), self.options_key)
+            if metrics.enabled:
+                metrics.add_time('cache', kind, time.perf_counter() - started)
+            if record is not None:
+                metrics.count('cache_hits', kind)
+                metrics.count('files', kind)
+                return record
+        if not isinstance(file_path, MemberFile):
+            file_path = os.fspath(file_path)
+        plugin = self.registry.for_path(file_path)
+        if (plugin is not None and self.filesystem is not None and not isinstance(file_path, MemberFile)
+                and self._over_file_budget(file_path) is None):  # Oversized files are skipped without being read
+            limit = self._text_byte_limit() if kind == 'txt' else None
+            try:
+                # Text files are read no further than the reader would; the extra byte shows more remained
+                data = self.filesystem.read(file_path, None if limit is None else limit + 1)
+                file_path = MemberFile(data, file_path)
+            except OSError as e:
+                self.logger.error(f"Error reading file {file_path}: {str(e)}")
+                metrics.count('errors', kind)
+                return ScanRecord(file_path, None, None, read_seconds=time.perf_counter() - started,
+                                  rules_version=analyzer.rules_version)
+        self._local.deadline = Deadline(self.budget.timeout)  # Archives share one deadline with their members
+        try:
+            if plugin is not None and plugin.archive:
+                record = self.scan_archive(file_path, analyzer)
+            else:
+                record = self._scan_text(file_path, analyzer, kind)
+        finally:
+            self._local.deadline = NO_DEADLINE
+        if cache is not None:
+            cache.put_record(record, record.rules_version, stat, self.options_key)
+        if metrics.enabled:
+            metrics.count('files', kind)
+            metrics.add_time('total', kind, time.perf_counter() - started)
+        return record
+
+    def _scan_text(self, file_path, analyzer, kind) -> ScanRecord:
+        """
+        Streams a file's text into the analyzer, timing the read and match stages.
+        """
+        metrics = self.metrics
+        reason = self._over_file_budget(file_path)
+        if reason is not None:
+            self.logger.warning(f"Skipped {source_name(file_path)}: {reason}")
+            metrics.count('skipped', kind)
+            return ScanRecord(source_name(file_path), None, None, rules_version=analyzer.rules_version,
+                              status='skipped', reason=reason)
+        deadline = self._deadline()
+        status = error = None
+        read_seconds = match_seconds = 0.0
+        stream = analyzer.stream()
+        kept = []  # Prefix of the text kept for the record
+        kept_chars = total_chars = 0
+        read_any = False
+        truncated = False
+        pieces = self.iter_text(file_path)
+        mark = time.perf_counter()
+        try:
+            for piece in pieces:  # Text arrives in chunks and is analyzed as it comes
+                read_any = True
+                fed = time.perf_counter()
+                stream.feed(piece)
+                matched = time.perf_counter()
+                read_seconds += fed - mark
+                match_seconds += matched - fed
+                mark = matched
+                total_chars += len(piece)
+                if kept_chars < self.content_limit:
+                    kept.append(piece[:self.content_limit - kept_chars])
+                    kept_chars += len(kept[-1])
+                if stream.decided:
+                    # The top level matched, so the rest of the file cannot change the result. The text is
+                    # only a prefix if something was left (readers make this check cheap, see iter_text).
+                    truncated = next(pieces, None) is not None
+                    break
+                deadline.check()  # Readers yield between pages and parts, so a slow file stops at the next one
+        except BudgetExceeded as e:
+            status, reason = ('partial' if read_any and e.partial else 'skipped'), e.reason
+            self.logger.warning(f"{status.capitalize()} scan of {source_name(file_path)}: {e.reason}")
+            metrics.count(status, kind)
+        except Exception as e:
+            self.logger.error(f"Error reading file {source_name(file_path)}: {str(e)}")  # Log the error
+            metrics.count('errors', kind)
+            if read_any:
+                error = str(e)  # The text read so far is not the file's, so it gets no level and is not cached
+        finally:
+            pieces.close()
+        stream.finish()
+        read_seconds += time.perf_counter() - mark
+        if metrics.enabled:
+            metrics.add_time('read', kind, read_seconds)
+            metrics.add_time('match', kind, match_seconds)
+        if error is not None:
+            return ScanRecord(source_name(file_path), None, None, read_seconds=read_seconds,
+                              rules_version=analyzer.rules_version, error=error)
+        if not read_any:
+            return ScanRecord(source_name(file_path), None, None, read_seconds=read_seconds,
+                              rules_version=analyzer.rules_version, status=status,
+                              reason=reason)  # Unsupported, unreadable or over budget
+        limit = self._byte_limit(file_path)
+        if status is None and limit is not None:
+            # max_bytes is a prefix the user asked for, so the result is complete for it; a budget is an overrun
+            status = 'prefix' if limit == self.max_bytes else 'partial'
+            reason = f"read the first {limit} bytes"
+        truncated = truncated or total_chars > kept_chars or status in ('partial', 'prefix')
+        content = ''.join(kept).strip()
+        return ScanRecord(source_name(file_path), content, stream.level if content else None, truncated=truncated,
+                          read_seconds=read_seconds, match_seconds=match_seconds,
+                          analysis=stream.result() if content else None, rules_version=analyzer.rules_version,
+                          status=status, reason=reason)
+
+    def scan_archive(self, file_path, analyzer) -> ScanRecord:
+        """
+        Scans every supported file inside an archive from memory, without extracting anything to disk.
+
+        Args:
+            file_path (str or MemberFile): The archive.
+            analyzer (ContentAnalyzer): The analyzer used to score each member.
+
+        Returns:
+            ScanRecord: The archive's record, with the highest level found among its members and one record per
+                member in `members` (nested archives flattened, paths like outer.zip!inner.zip!report.pdf).
+                Members skipped by the ArchiveLimits have their reason in `error`.
+        """
+        metrics = self.metrics
+        members = []
+        error = None
+        try:
+            for member in iter_members(file_path, self.archive_limits, accept=self._accepts_member):
+                kind = file_type(member.path)
+                if member.file is None:
+                    self.logger.warning(f"Archive member {member.path} {member.error}")
+                    metrics.count('errors', kind)
+                    members.append(ScanRecord(member.path, None, None, error=member.error,
+                                              rules_version=analyzer.rules_version))
+                    continue
+                started = time.perf_counter()
+                members.append(self._scan_text(member.file, analyzer, kind))
+                if metrics.enabled:
+                    metrics.count('files', kind)
+                    metrics.add_time('total', kind, time.perf_counter() - started)
+        except Exception as e:
+            self.logger.error(f"Error reading archive {source_name(file_path)}: {str(e)}")
+            metrics.count('errors', file_type(source_name(file_path)))
+            error = str(e)
+        rank = analyzer.matcher.level_rank
+        levels = [record.sensitivity for record in members if record.sensitivity is not None]
+        sensitivity = min(levels, key=lambda level: rank.get(level, len(rank))) if levels else None
+        return ScanRecord(source_name(file_path), None, sensitivity, error=error, members=members,
+                          rules_version=analyzer.rules_version)
+
+    def _accepts_member(self, path) -> bool:
+        """
+        Archive members are unpacked only if a reader handles them (extensionless ones are sniffed).
+        """
+        extension = os.path.splitext(path.rsplit(SEPARATOR, 1)[-1])[1]
+        return not extension or self.registry.get(extension) is not None
+
+    def _iter_archive_text(self, file_path) -> Iterator[str]:
+        """
+        Yields the text of every supported file inside an archive, for read_file and iter_text.
+        """
+        for index, member in enumerate(iter_members(file_path, self.archive_limits, accept=self._accepts_member)):
+            if member.file is None:
+                continue
+            if index:
+                yield '\n'
+            yield from self.iter_text(member.file)
+
+    def iter_text(self, file_path) -> Iterator[str]:
+        """
+        Yields the text of a file in pieces, so it can be analyzed without holding all of it.
+
+        The reader plugin is chosen by extension, or by sniffing the file's first bytes when the extension
+        is unknown. Text files are streamed in chunks, PDFs page by page and DOCX files part by part;
+        images are read in one piece.
+
+        Args:
+            file_path (str): The path to the file.
+
+        Yields:
+            str: Consecutive pieces of the file's text. Nothing is yielded for unsupported files. Readers
+                may yield an empty string before expensive work (e.g. the next PDF page), so a caller that
+                stops early can check whether more text remains without paying for it.
+        """
+        plugin = self.registry.for_path(file_path)
+        if plugin is not None:
+            yield from plugin.iter_text(self, file_path)
+
+    def _text_byte_limit(self) -> Optional[int]:
+        """
+        Returns the bytes read from a text file: the smaller of max_bytes and the budget's max_file_bytes.
+        """
+        limits = [limit for limit in (self.max_bytes, self.budget.max_file_bytes) if limit is not None]
+        return min(limits) if limits else None
+
+    def _file_size(self, file_path) -> Optional[int]:
+        try:
+            return source_size(file_path) if isinstance(file_path, io.BytesIO) else os.path.getsize(file_path)
+        except OSError:
+            return None
+
+    def _byte_limit(self, file_path) -> Optional[int]:
+        """
+        Returns the byte limit a text file was cut at, or None if it was read whole.
+        """
+        limit = self._text_byte_limit()
+        if limit is None or os.path.splitext(source_name(file_path))[1].lower() != '.txt':
+            return None
+        size = self._file_size(file_path)
+        return limit if size is not None and size > limit else None
+
+    def _over_file_budget(self, file_path) -> Optional[str]:
+        """
+        Returns why a file is too large to read at all, or None. Text files are read up to the limit instead.
+        """
+        limit = self.budget.max_file_bytes
+        if limit is None or os.path.splitext(source_name(file_path))[1].lower() == '.txt':
+            return None
+        size = self._file_size(file_path)
+        if size is None or size <= limit:
+            return None
+        return f"{size} bytes exceeds the {limit} byte file budget"
+
+    def _deadline(self) -> Deadline:
+        """
+        Returns the deadline of the file the calling thread is scanning (none outside scan_file).
+        """
+        return getattr(self._local, 'deadline', NO_DEADLINE)
+
+    def iter_scan(self, path, analyzer=None, engine=None, estimate_progress=False, cache=None,
+                  skip=None) -> Iterator[ScanRecord]:
+        """
+        Recursively scans a directory, yielding one record per file as soon as it is analyzed.
+
+        Nothing is collected up front, so memory stays flat and the first result is available
+        immediately regardless of the size of the tree.
+
+        Args:
+            path (str): The path to the directory to scan.
+            analyzer (ContentAnalyzer, optional): The analyzer to use. Defaults to one loaded from config/rules.json.
+            engine (ScanEngine, optional): Scans files in parallel instead of one at a time.
+            estimate_progress (bool): Count the files in a background thread and fill in ScanRecord.progress.
+            cache (ScanCache, optional): Skips unchanged files when scanning sequentially (engines use their own cache).
+            skip (container, optional): Paths to leave out, e.g. files already done before a resumed scan.
+
+        Yields:
+            ScanRecord: One record per file, in walk order. An archive yields a record for each file inside
+                it, followed by its own record.
+        """
+        entries = self.iter_entries(path)
+        if self.metrics.enabled:
+            entries = self._timed_walk(entries)
+        if skip:
+            entries = (entry for entry in entries if entry.path not in skip)
+        if engine is not None:
+            records = engine.scan_paths(entries)
+        else:
+            analyzer = analyzer or ContentAnalyzer()
+            records = (self.scan_file(entry, analyzer, cache) for entry in entries)
+        counter = _FileCounter(self, path) if estimate_progress else None
+        try:
+            for index, record in enumerate(records, 1):
+                if counter is not None:
+                    record.progress = counter.estimate(index)
+                for member in record.members or ():  # An archive's files come before the archive itself
+                    member.progress = record.progress
+                    yield member
+                yield record
+        finally:
+            if counter is not None:
+                counter.stop()
+            records.close()
+
+    def _timed_walk(self, entries) -> Iterator:
+        """
+        Passes walker entries through, adding the time spent finding each one to the 'walk' stage.
+        """
+        while True:
+            start = time.perf_counter()
+            entry = next(entries, None)
+            self.metrics.add_time('walk', '', time.perf_counter() - start)
+            if entry is None:
+                return
+            yield entry
+
+    def _ocr(self, image, key_bytes, kind) -> str:
+        """
+        Runs OCR through the OcrEngine, recording calls, cache hits and time when metrics are enabled.
+        Tesseract gets the time left in the file's budget and is killed when it runs out.
+        """
+        deadline = self._deadline()
+        deadline.check()
+        try:
+            if not self.metrics.enabled:
+                return self.ocr.image_to_string(image, key_bytes=key_bytes, timeout=deadline.remaining())
+            hits = self.ocr.cache_hits
+            with self.metrics.time('ocr', kind):
+                text = self.ocr.image_to_string(image, key_bytes=key_bytes, timeout=deadline.remaining())
+        except TimeoutError:
+            raise BudgetExceeded(f"timed out after {deadline.seconds:g} seconds (in Tesseract)")
+        self.metrics.count('ocr_calls', kind)
+        if self.ocr.cache_hits > hits:  # Exact per process; approximate when threads OCR concurrently
+            self.metrics.count('ocr_cache_hits', kind)
+        return text
 
     def read_file(self, file_path) -> Optional[str]:
         """
@@ -52,23 +538,24 @@ class FileScanner:
         Returns:
             str: The content of the file, or None if the file is empty or could not be read.
         """
-        extension = os.path.splitext(file_path)[1].lower()  # Get the file extension in lowercase
+        plugin = self.registry.for_path(file_path)  # By extension, then by content
+        if plugin is None:
+            self.logger.warning(f"Unsupported file type: {os.path.splitext(source_name(file_path))[1].lower()}")
+            return None
+        reason = self._over_file_budget(file_path)
+        if reason is not None:
+            self.logger.warning(f"Skipped {source_name(file_path)}: {reason}")
+            return None
         try:
-            if extension == '.txt':
-                return self._read_txt(file_path)  # Read text files
-            elif extension == '.pdf':
-                return self._read_pdf(file_path)  # Read PDF files
-            elif extension == ".docx": 
-                return self._read_docx(file_path) # Read DOCX files
-            elif extension in self.supported_images:
-                return self._read_image(file_path)  # Read image files
-            else:
-                self.logger.warning(f"Unsupported file type: {extension}")
-                return None
+            return plugin.read_text(self, file_path)
+        except BudgetExceeded as e:
+            self.logger.warning(f"Skipped {source_name(file_path)}: {e.reason}")
+            return None
         except Exception as e:
-            self.logger.error(f"Error reading file {file_path}: {str(e)}") # Log the error
+            self.logger.error(f"Error reading file {source_name(file_path)}: {str(e)}") # Log the error
+            self.metrics.count('errors', file_type(source_name(file_path)))
             return None
-        
+
     def _read_txt(self, file_path) -> str:
         """
         Reads the content of a text file.
@@ -79,8 +566,37 @@ class FileScanner:
         Returns:
             str: The content of the text file.
         """
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return file.read().strip()  # Read and return the content of the text file
+        return ''.join(self._iter_txt(file_path)).strip()  # Read and return the content of the text file
+
+    def _iter_txt(self, file_path) -> Iterator[str]:
+        """
+        Streams a UTF-8 text file in chunks of chunk_size bytes, stopping after max_bytes.
+
+        Multi-byte characters and CRLF pairs split across chunks are decoded correctly.
+
+        Args:
+            file_path (str): The path to the text file.
+
+        Yields:
+            str: Consecutive chunks of decoded text with universal newlines.
+        """
+        decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder('utf-8')(), translate=True)
+        remaining = self._text_byte_limit()
+        with open_source(file_path) as file:
+            while remaining is None or remaining > 0:
+                data = file.read(self.chunk_size if remaining is None else min(self.chunk_size, remaining))
+                if not data:
+                    break
+                self.metrics.count('bytes_read', 'txt', len(data))
+                if remaining is not None:
+                    remaining -= len(data)
+                text = decoder.decode(data)
+                if text:
+                    yield text
+            if remaining is None or remaining > 0:  # A prefix cut by max_bytes may end inside a character
+                text = decoder.decode(b'', final=True)
+                if text:
+                    yield text
         
     def _read_pdf(self, file_path) -> str:
         """
@@ -92,39 +608,63 @@ class FileScanner:
         Returns:
             str: The content of the PDF file.
         """
-        text = []
-        images = []
+        pieces = []
         try:
-            with open(file_path, 'rb') as file:
-                reader = pypdf.PdfReader(file)  # Create a PDF reader object
-                for page in reader.pages:  # Iterate through each page
-                    # Extract text from the page
-                    extracted_text = page.extract_text()
-                    if extracted_text:
-                        text.append(extracted_text)
-                    # Extract images from the page using pypdf's .images property if available
-                    if hasattr(page, "images"):
-                        for img in page.images:
-                            images.append(img)
-    #                else:
-    #                    # Fallback for older pypdf versions: extract from /XObject
-    #                    if "/XObject" in page.resources:
-    #                        xObject = page.resources["/XObject"]
-    #                        for obj_name in xObject:
-    #                            obj = xObject[obj_name]
-    #                            if obj.get("/Subtype") == "/Image":
-    #                                images.append(obj)
-            if images:
-                for img in images:
-                    try:
-                        text.append(pytesseract.image_to_string(img.image))  # Use Tesseract to extract text from the image (img.image object and property from pypdf)
-                    except Exception as e:
-                        self.logger.error(f"Error extracting text from image in PDF {file_path}: {str(e)}")
-            return '\n'.join(text).strip()  # Join and return the extracted text
+            for piece in self._iter_pdf(file_path):
+                if piece:
+                    pieces.append(piece)
+            return '\n'.join(pieces).strip()  # Join and return the extracted text
+        except BudgetExceeded as e:
+            self.logger.warning(f"Partial read of PDF file {source_name(file_path)}: {e.reason}")
+            return '\n'.join(pieces).strip()  # The pages read within the budget
         except Exception as e:
-            self.logger.error(f"Error reading PDF file {file_path}: {str(e)}")  # Log the error
+            self.logger.error(f"Error reading PDF file {source_name(file_path)}: {str(e)}")  # Log the error
             return ""
-        
+
+    def _iter_pdf(self, file_path) -> Iterator[str]:
+        """
+        Lazily yields the text of a PDF one page at a time.
+
+        A page's text layer is used when it holds at least min_page_chars characters; only pages
+        without one (scans) have their embedded images OCR'd, one image at a time, unless deep_ocr
+        is set. Nothing is collected across pages, so memory stays flat regardless of page count,
+        and a caller that stops iterating skips the remaining pages entirely.
+
+        Args:
+            file_path (str): The path to the PDF file.
+
+        Yields:
+            str: The text of each page (and of its OCR'd images). An empty string is yielded before
+                each page after the first, so callers can tell more pages remain without processing them.
+        """
+        import pypdf  # Loaded on the first PDF, keeping scanner startup fast
+        metrics = self.metrics
+        with open_source(file_path) as file:
+            metrics.count('bytes_read', 'pdf', source_size(file))
+            reader = pypdf.PdfReader(file)  # Create a PDF reader object
+            max_pages = self.budget.max_pages
+            for index, page in enumerate(reader.pages):  # Pages are parsed only when reached
+                if index:
+                    yield ''  # More pages follow
+                if max_pages is not None and index >= max_pages:
+                    raise BudgetExceeded(f"read {max_pages} of {len(reader.pages)} pages")
+                metrics.count('pages', 'pdf')
+                extracted_text = page.extract_text() or ''  # Extract text from the page
+                if extracted_text:
+                    yield extracted_text
+                if len(extracted_text.strip()) >= self.min_page_chars and not self.deep_ocr:
+                    continue  # The text layer is usable, skip OCR for this page
+                # Extract images from the page using pypdf's .images property if available
+                for img in getattr(page, "images", ()):
+                    metrics.count('images', 'pdf')
+                    try:
+                        yield self._ocr(img.image, img.data, 'pdf')  # OCR the image (cached by its bytes, so repeated logos are read once)
+                    except BudgetExceeded:
+                        raise
+                    except Exception as e:
+                        self.logger.error(f"Error extracting text from image in PDF {source_name(file_path)}: {str(e)}")
+                        metrics.count('errors', 'pdf')
+
     def _read_docx(self, file_path) -> str:
         """
         Reads the content of a DOCX file.
@@ -136,11 +676,81 @@ class FileScanner:
             str: The content of the DOCX file.
         """
         try:
-            doc = docx.Document(file_path)  # Open the DOCX file
-            return '\n'.join([para.text for para in doc.paragraphs]).strip()  # Join and return the text from paragraphs
+            return ''.join(self._iter_docx(file_path)).strip()  # Join and return the text of every part
         except Exception as e:
-            self.logger.error(f"Error reading DOCX file {file_path}: {str(e)}")  # Log the error
+            self.logger.error(f"Error reading DOCX file {source_name(file_path)}: {str(e)}")  # Log the error
+            self.metrics.count('errors', 'docx')
             return ""
+
+    def _iter_docx(self, file_path) -> Iterator[str]:
+        """
+        Streams the text of a DOCX file without building a document object model.
+
+        word/document.xml (body, tables and text boxes) is parsed incrementally, followed by the header
+        and footer parts. Parsed elements are discarded as soon as their text is taken, so memory stays
+        flat, and a caller that stops iterating skips the rest of the document.
+
+        Args:
+            file_path (str): The path to the DOCX file.
+
+        Yields:
+            str: Chunks of about 64K characters (or chunk_size, if smaller), one line per paragraph. An empty string is yielded
+                before each part after the first, so callers can tell more text remains without parsing it.
+        """
+        with open_source(file_path) as file, zipfile.ZipFile(file) as archive:
+            self.metrics.count('bytes_read', 'docx', source_size(file))
+            checked = CheckedZip(archive, self.archive_limits)
+            names = archive.namelist()
+            parts = ['word/document.xml'] + sorted(name for name in names if _DOCX_EXTRA_PARTS.match(name))
+            for index, part in enumerate(parts):
+                if index:
+                    yield ''  # More parts follow
+                with checked.open(part) as stream:
+                    yield from self._iter_docx_part(stream)
+
+    def _iter_docx_part(self, stream) -> Iterator[str]:
+        """
+        Yields the text of one WordprocessingML part in chunks.
+        """
+        chunk_chars = min(self.chunk_size, _DOCX_CHUNK_CHARS)
+        pieces = []
+        size = 0
+        stack = []  # Open elements, to find the container each finished element belongs to
+        fallbacks = 0  # Open mc:Fallback elements: Word writes text boxes twice, as mc:Choice and as mc:Fallback
+        for event, element in ElementTree.iterparse(stream, events=('start', 'end')):
+            if event == 'start':
+                stack.append(element)
+                fallbacks += element.tag == _DOCX_FALLBACK
+                continue
+            stack.pop()
+            tag = element.tag
+            if tag == _DOCX_FALLBACK:
+                fallbacks -= 1
+                element.clear()
+                piece = ''
+            elif fallbacks:
+                piece = ''
+            elif tag == _DOCX_TEXT:
+                piece = element.text or ''
+            elif tag == _DOCX_PARAGRAPH:
+                piece = '\n'
+            elif tag == _DOCX_TAB:
+                piece = '\t'
+            elif tag in _DOCX_BREAKS:
+                piece = '\n'
+            else:
+                piece = ''
+            if piece:
+                pieces.append(piece)
+                size += len(piece)
+            if stack and stack[-1].tag in _DOCX_CONTAINERS:
+                stack[-1].clear()  # The finished paragraph or table is no longer needed
+                if size >= chunk_chars:
+                    yield ''.join(pieces)
+                    pieces.clear()
+                    size = 0
+        if pieces:
+            yield ''.join(pieces)
         
 
 
@@ -155,9 +765,60 @@ class FileScanner:
             str: The text extracted from the image.
         """
         try:
-            image = Image.open(file_path)  # Open the image fil
-            text = pytesseract.image_to_string(image)  # Use Tesseract to extract text from the image
+            kind = file_type(source_name(file_path))
+            with open_source(file_path) as file:
+                self._open_image(file, decode=False)  # An image over the budget is rejected from its header alone
+                file.seek(0)
+                data = file.read()  # The file bytes double as the OCR cache key
+            self.metrics.count('bytes_read', kind, len(data))
+            self.metrics.count('images', kind)
+            text = self._ocr(lambda: self._open_image(data), data, kind)  # Use Tesseract to extract text from the image
             return text.strip()  # Return the extracted text
+        except BudgetExceeded:
+            raise
         except Exception as e:
-            self.logger.error(f"Error reading image file {file_path}: {str(e)}")  # Log the error
-            return ""
\ No newline at end of file
+            self.logger.error(f"Error reading image file {source_name(file_path)}: {str(e)}")  # Log the error
+            self.metrics.count('errors', file_type(source_name(file_path)))
+            return ""
+
+    def _open_image(self, data, decode: bool = True):
+        """
+        Decodes an image within the budget's pixel limit.
+
+        The size is read from the header first. A larger JPEG is decoded at a reduced scale (only the pixels
+        kept are ever decompressed). Other formats cannot be reduced while decoding, so one of up to
+        _IMAGE_DECODE_FACTOR times the limit is decoded whole and then reduced to fit; a larger one is skipped.
+
+        Args:
+            data (bytes or file): The image file's bytes, or the open file.
+            decode (bool): Only check the header, returning the image still undecoded.
+        """
+        from PIL import Image  # Loaded on the first image, keeping scanner startup fast
+        limit = self.budget.max_image_pixels
+        try:
+            image = Image.open(io.BytesIO(data) if isinstance(data, bytes) else data)  # Reads the header only
+        except Image.DecompressionBombError as e:
+            raise BudgetExceeded(f"image too large to decode ({str(e)})", partial=False)
+        width, height = image.size
+        if limit is None or width * height <= limit:
+            return image
+        scale = (limit / float(width * height)) ** 0.5 / 2  # draft() picks the smallest reduction at least this big
+        if image.format == 'JPEG':
+            image.draft('L', (max(1, int(width * scale)), max(1, int(height * scale))))
+            if image.size[0] * image.size[1] <= limit:
+                self.logger.info(f"Decoding a {width}x{height} image at {image.size[0]}x{image.size[1]} to stay within "
+                                 f"the {limit} pixel budget")
+                return image
+        elif width * height <= _IMAGE_DECODE_FACTOR * limit:
+            if not decode:
+                return image
+            factor = math.ceil((width * height / limit) ** 0.5)
+            while math.ceil(width / factor) * math.ceil(height / factor) > limit:
+                factor += 1
+            if image.mode not in ('L', 'LA', 'RGB', 'RGBA', 'I', 'F'):  # Modes reduce() supports
+                image = image.convert('L')
+            reduced = image.reduce(factor)
+            self.logger.info(f"Reduced a {width}x{height} image to {reduced.size[0]}x{reduced.size[1]} to stay within "
+                             f"the {limit} pixel budget")
+            return reduced
+        raise BudgetExceeded(f"image has {width * height} pixels, over the {limit} pixel budget", partial=False)
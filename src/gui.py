@@ -1,13 +1,20 @@
 import sys
 import os
+import multiprocessing
 
 # Add the parent directory to the path so we can import from src
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import customtkinter as ctk
 from tkinterdnd2 import TkinterDnD, DND_FILES
-from src.file_scanner import FileScanner
-from src.content_analyzer import ContentAnalyzer
+from src.scan_engine import ScanEngine
+from src.scan_cache import ScanCache
+from src.background_scan import BackgroundScan
+from src.metrics import ScanMetrics
+from src.sinks import SqliteSink
+
+POLL_INTERVAL_MS = 100  # How often scan results are moved from the worker queue into the UI
+MAX_RECORDS_PER_POLL = 1000  # Upper bound on records inserted per poll, keeps each UI update short
 
 class LabelAutomationApp:
     def __init__(self, root):
@@ -36,6 +43,22 @@ class LabelAutomationApp:
         self.progress.pack(pady=5)
         self.progress.set(0)
 
+        self.controls = ctk.CTkFrame(root, fg_color="transparent")
+        self.controls.pack(pady=5)
+        self.pause_btn = ctk.CTkButton(self.controls, text="Pause", command=self.toggle_pause, width=90, corner_radius=20, fg_color="#185adb", hover_color="#1e3a8a", text_color="#fff", state="disabled")
+        self.pause_btn.pack(side="left", padx=5)
+        self.cancel_btn = ctk.CTkButton(self.controls, text="Cancel", command=self.cancel_scan, width=90, corner_radius=20, fg_color="#185adb", hover_color="#1e3a8a", text_color="#fff", state="disabled")
+        self.cancel_btn.pack(side="left", padx=5)
+        self.status_label = ctk.CTkLabel(self.controls, text="", text_color="#fff", font=("Segoe UI", 11))
+        self.status_label.pack(side="left", padx=10)
+
+        self.engine = None  # Created on the first scan and reused, so worker pools stay warm
+        self.cache = None
+        self.metrics = None
+        self.scan = None  # The BackgroundScan in progress, if any
+        self.sink = None  # Keeps the results of the scan in progress in the results history database
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
     def select_folder(self):
         from tkinter import filedialog
         folder_selected = filedialog.askdirectory()
@@ -65,28 +88,83 @@ class LabelAutomationApp:
         self.dnd_label.configure(fg_color="#185adb")  # Restore original color
 
     def analyze_folder(self, folder_path):
-        scanner = FileScanner()
-        analyzer = ContentAnalyzer()
-        all_files = []
-        for root, _, files in os.walk(folder_path):
-            for file in files:
-                all_files.append(os.path.join(root, file))
-        total_files = len(all_files)
+        if self.scan is not None and not self.scan.finished:
+            from tkinter import messagebox
+            messagebox.showinfo("Scan in progress", "Please wait for the current scan to finish or cancel it.")
+            return
+        if self.engine is None:
+            self.cache = ScanCache()  # Unchanged files are answered from the cache
+            self.metrics = ScanMetrics()  # Per-stage timings, shown when the scan finishes
+            self.engine = ScanEngine(cache=self.cache, metrics=self.metrics)
+        self.metrics.reset()
         self.progress.set(0)
-
-        for idx, file_path in enumerate(all_files, 1):
-            content = scanner.read_file(file_path)
-            if content:
-                sensitivity = analyzer.analyze_file(content)
-                file_name = os.path.basename(file_path)
-                self.result_box.insert("end", f"{file_name} : {sensitivity}\n")
-            # Set progress as a float between 0 and 1
-            self.progress.set(idx / total_files if total_files else 1)
-            self.root.update_idletasks()
-
-        self.result_box.insert("end", "\nScan complete.")
+        self.sink = SqliteSink(roots=[folder_path])
+        self.scan = BackgroundScan(self.engine, folder_path)  # Scanning happens off the UI thread
+        self.scan.start()
+        self.pause_btn.configure(state="normal", text="Pause")
+        self.cancel_btn.configure(state="normal")
+        self.root.after(POLL_INTERVAL_MS, self.poll_scan)
+
+    def poll_scan(self):
+        """
+        Moves finished records from the background scan into the UI in one batch.
+        """
+        scan = self.scan
+        records = scan.drain(MAX_RECORDS_PER_POLL)
+        self.sink.write_many(records)
+        lines = [f"{os.path.basename(record.path)} : {record.sensitivity}\n" for record in records if record.content]
+        if lines:
+            self.result_box.insert("end", "".join(lines))  # One insert per batch instead of one per file
+        self.progress.set(scan.progress)
+        state = " (paused)" if scan.paused else ""
+        self.status_label.configure(text=f"{scan.scanned} files | {scan.files_per_second():.1f} files/s{state}")
+        if scan.finished:
+            self.finish_scan()
+        else:
+            self.root.after(POLL_INTERVAL_MS, self.poll_scan)
+
+    def finish_scan(self):
+        scan = self.scan
+        self.pause_btn.configure(state="disabled", text="Pause")
+        self.cancel_btn.configure(state="disabled")
+        self.sink.close()
+        if scan.error:
+            self.result_box.insert("end", f"\nScan failed: {scan.error}")
+        elif scan.cancelled:
+            self.result_box.insert("end", "\nScan cancelled.")
+        else:
+            self.progress.set(1)
+            self.result_box.insert("end", "\nScan complete.")
+        self.result_box.insert("end", "\n\n" + self.metrics.format_summary())
+
+    def toggle_pause(self):
+        if self.scan is None or self.scan.finished:
+            return
+        if self.scan.paused:
+            self.scan.resume()
+            self.pause_btn.configure(text="Pause")
+        else:
+            self.scan.pause()
+            self.pause_btn.configure(text="Resume")
+
+    def cancel_scan(self):
+        if self.scan is not None and not self.scan.finished:
+            self.scan.cancel()
+            self.cancel_btn.configure(state="disabled")
+
+    def on_close(self):
+        if self.scan is not None and not self.scan.finished:
+            self.scan.cancel()
+            self.scan.join(timeout=10)  # Let files in flight finish before the pools and cache close
+        if self.sink is not None:
+            self.sink.close()  # Keeps what was drained so far; a no-op after finish_scan
+        if self.engine is not None:
+            self.engine.close()
+            self.cache.close()
+        self.root.destroy()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Needed for the scan engine's worker processes in a frozen .exe
     root = TkinterDnD.Tk()
     app = LabelAutomationApp(root)
     root.mainloop()
\ No newline at end of file
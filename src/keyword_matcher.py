@@ -0,0 +1,495 @@
+#Compiled multi-keyword matcher
+#Finds every rule keyword and pattern in a single pass over the text
+import heapq
+import re
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+_END = ''  # Trie key marking the end of a keyword (never a real character)
+TRIE_THRESHOLD = 400  # Below this many keywords, per-keyword str.find is faster than the trie pattern
+DEFAULT_PATTERN_SPAN = 64  # Longest text a pattern rule is expected to match, unless the rule sets max_length
+
+
+class KeywordMatch(NamedTuple):
+    """
+    A single keyword hit reported by the KeywordMatcher.
+    """
+    keyword: str  # The rule keyword that matched (the rule name for pattern rules)
+    level: str  # The sensitivity level the keyword belongs to
+    start: int  # Offset of the match in the scanned text
+    weight: float = 1.0  # The keyword's weight in its level's score
+    length: Optional[int] = None  # Length of the matched text, when it differs from the keyword (pattern rules)
+
+    @property
+    def end(self) -> int:
+        return self.start + (len(self.keyword) if self.length is None else self.length)
+
+
+class PatternRule(NamedTuple):
+    """
+    A regular expression rule, e.g. for SSNs or credit card numbers.
+    """
+    name: str  # Reported as the KeywordMatch keyword
+    level: str
+    regex: str  # Matched against the lowercased text, case-insensitively
+    weight: float = 1.0
+    validator: Optional[str] = None  # A VALIDATORS name that must accept the matched text, e.g. "luhn"
+    max_length: int = DEFAULT_PATTERN_SPAN  # Longest text the regex can match, so streams keep enough overlap
+
+
+def luhn_valid(text: str) -> bool:
+    """
+    Returns True if the digits in the text pass the Luhn checksum used by payment card numbers.
+    """
+    digits = [int(char) for char in text if char.isdigit()]
+    if len(digits) < 2:
+        return False
+    total = 0
+    for index, digit in enumerate(reversed(digits)):
+        if index % 2:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return total % 10 == 0
+
+
+VALIDATORS = {'luhn': luhn_valid}  # Checks a pattern match must pass to count
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+class KeywordMatcher:
+    """
+    Compiles the keywords of every sensitivity level into one trie-shaped pattern.
+
+    Instead of one substring search per keyword, the text is scanned once: a regex built
+    from the keyword trie jumps to the next offset where some keyword starts. The regex stops at the
+    shortest keyword found there, and any longer keywords starting at the same offset must extend it,
+    so they are looked up by the lengths of the keywords known to extend it. The trie is only needed
+    to build the regex, so matchers loaded with from_compiled_state skip it.
+    Small rule sets skip the pattern and use one C-level substring search per keyword instead,
+    which is faster until there are a few hundred keywords (see benchmarks/bench_matcher.py).
+
+    A level's rules are either a list of keywords or a dict with weighted keywords, whole-word
+    keywords, regex patterns and a score threshold:
+
+        "pii": {
+            "threshold": 2,
+            "keywords": ["passport", {"term": "dob", "weight": 0.5, "word": true}],
+            "patterns": [{"name": "card", "regex": "\\d(?<!\\w\\d)(?:[ -]?\\d){12,18}\\b", "validator": "luhn"}]
+        }
+
+    Patterns run on the lowercased text. Starting them with a character class rather than \\b (check the
+    boundary with a lookbehind after the first character, as above) lets the regex engine skip ahead,
+    which makes them about twice as fast.
+
+    A level applies when its weighted score reaches its threshold (any match when it has none), and
+    the first applicable level in rule order wins. Counts, offsets and weights all come from the
+    same scan that decides the level, so explaining a result never needs a second pass.
+    """
+    def __init__(self, rules: Dict[str, object], trie_threshold: int = TRIE_THRESHOLD):
+        """
+        Builds the keyword table, the trie pattern and the compiled patterns.
+
+        Args:
+            rules (dict): Mapping of sensitivity level to its keyword list or rule dict, in precedence order.
+            trie_threshold (int): Minimum keyword count for which the compiled pattern is used.
+        """
+        self.levels = list(rules.keys())  # Levels in precedence order (first wins)
+        self.level_rank = {level: rank for rank, level in enumerate(self.levels)}
+        self.thresholds = {}  # Minimum weighted score per level; levels without one apply on any match
+        self.patterns = []  # PatternRule entries
+        trie = {}
+        self._empty_levels = []  # Levels with an empty keyword match every text, like `'' in text`
+        self._keywords = []  # (keyword, level, weight, whole word) in precedence order
+        self.max_length = 0
+        for level, spec in rules.items():
+            keywords, options = (spec, {}) if isinstance(spec, list) else (spec.get('keywords', []), spec)
+            if options.get('threshold') is not None:
+                self.thresholds[level] = float(options['threshold'])
+            for entry in keywords:
+                if isinstance(entry, dict):
+                    keyword = entry['term']
+                    weight = float(entry.get('weight', options.get('weight', 1.0)))
+                    word = bool(entry.get('word', options.get('word', False)))
+                else:
+                    keyword, weight, word = entry, float(options.get('weight', 1.0)), bool(options.get('word', False))
+                if not keyword:
+                    self._empty_levels.append((level, weight))
+                    continue
+                self._keywords.append((keyword, level, weight, word))
+                node = trie
+                for char in keyword:
+                    node = node.setdefault(char, {})
+                node.setdefault(_END, []).append((keyword, level, weight, word))
+                self.max_length = max(self.max_length, len(keyword))
+            for pattern in options.get('patterns', []):
+                validator = pattern.get('validator')
+                if validator is not None and validator not in VALIDATORS:
+                    raise ValueError(f"Unknown validator {validator!r} in the rules for {level!r}")
+                self.patterns.append(PatternRule(pattern['name'], level, pattern['regex'],
+                                                 float(pattern.get('weight', 1.0)), validator,
+                                                 int(pattern.get('max_length', DEFAULT_PATTERN_SPAN))))
+        self._pattern_source = None
+        self._longer = {}  # Keyword -> lengths of the longer keywords that start with it
+        if len(self._keywords) >= trie_threshold:
+            self._pattern_source = self._trie_pattern(trie)
+            self._longer = self._longer_keywords(trie)
+        self._compile()
+
+    def _compile(self):
+        """
+        Compiles the regexes and derives the settings that follow from the built rules.
+        """
+        self.overlap = max([self.max_length] + [rule.max_length for rule in self.patterns])  # Kept between stream chunks
+        self._by_keyword = {}  # Keyword text -> its (keyword, level, weight, whole word) entries, for trie pattern hits
+        for entry in self._keywords:
+            self._by_keyword.setdefault(entry[0], []).append(entry)
+        self._word_keywords = frozenset(keyword for keyword, _, _, word in self._keywords if word)
+        self._pattern = None
+        if self._pattern_source is not None:
+            self._pattern = re.compile(self._pattern_source, re.DOTALL)
+        # One compiled regex per pattern rule: a single alternation of all rules defeats the regex engine's
+        # first-character skipping and measured slower than scanning once per rule (benchmarks/bench_matcher.py)
+        self._compiled_patterns = [(rule, re.compile(rule.regex, re.IGNORECASE | re.DOTALL)) for rule in self.patterns]
+        # Plain keyword lists keep the fastest paths: no boundaries to check, no patterns, no thresholds
+        self.simple = not self.patterns and not self.thresholds and not any(word for *_, word in self._keywords)
+
+    def compiled_state(self) -> dict:
+        """
+        Returns the matcher as plain data (builtin types only, so marshal can store it) for from_compiled_state.
+
+        Besides the keyword lists, the state holds the trie pattern's source and the keyword prefix table, so
+        loading it skips building the trie; the pattern is compiled again with re.compile.
+        """
+        return {'levels': self.levels, 'thresholds': self.thresholds, 'patterns': [tuple(rule) for rule in self.patterns],
+                'empty_levels': self._empty_levels, 'keywords': self._keywords, 'max_length': self.max_length,
+                'pattern_source': self._pattern_source, 'longer': self._longer}
+
+    @classmethod
+    def from_compiled_state(cls, state: dict) -> 'KeywordMatcher':
+        """
+        Recreates a matcher from compiled_state() without building the trie.
+        """
+        matcher = cls.__new__(cls)
+        matcher.levels = list(state['levels'])
+        matcher.level_rank = {level: rank for rank, level in enumerate(matcher.levels)}
+        matcher.thresholds = dict(state['thresholds'])
+        matcher.patterns = [PatternRule(*rule) for rule in state['patterns']]
+        matcher._empty_levels = [tuple(entry) for entry in state['empty_levels']]
+        matcher._keywords = [tuple(entry) for entry in state['keywords']]
+        matcher.max_length = state['max_length']
+        matcher._pattern_source = state['pattern_source']
+        matcher._longer = state['longer']
+        matcher._compile()
+        return matcher
+
+    @staticmethod
+    def _longer_keywords(trie) -> Dict[str, tuple]:
+        """
+        Maps each keyword that is a prefix of other keywords to the lengths of those keywords, shortest first.
+        """
+        longer = {}
+        stack = [(trie, [])]  # (node, keywords ending above this node)
+        while stack:
+            node, above = stack.pop()
+            ends = node.get(_END)
+            if ends is not None:
+                for keyword in above:
+                    longer.setdefault(keyword, []).append(len(ends[0][0]))
+                above = above + [ends[0][0]]
+            for char, child in node.items():
+                if char != _END:
+                    stack.append((child, above))
+        return {keyword: tuple(sorted(set(lengths))) for keyword, lengths in longer.items()}
+
+    def _trie_pattern(self, node) -> str:
+        """
+        Converts a trie node into a regex that matches when any keyword below it starts here.
+
+        Args:
+            node (dict): The trie node.
+
+        Returns:
+            str: The regex source for this node.
+        """
+        if _END in node:
+            return ''  # The shortest keyword already matches, nothing more is required
+        branches = [re.escape(char) + self._trie_pattern(child) for char, child in sorted(node.items())]
+        if len(branches) == 1:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')'
+
+    def iter_matches(self, text: str) -> Iterator[KeywordMatch]:
+        """
+        Yields every keyword and pattern occurrence in the text, ordered by offset.
+
+        Args:
+            text (str): The text to scan (already lowercased by the caller).
+
+        Yields:
+            KeywordMatch: One entry per keyword occurrence.
+        """
+        for level, weight in self._empty_levels:
+            yield KeywordMatch('', level, 0, weight)
+        keywords = self._iter_small(text) if self._pattern is None else self._iter_trie(text)
+        if not self._compiled_patterns:
+            yield from keywords
+            return
+        yield from heapq.merge(keywords, *(self._iter_pattern(rule, pattern, text)
+                                           for rule, pattern in self._compiled_patterns),
+                               key=lambda match: match.start)
+
+    def _iter_trie(self, text: str) -> Iterator[KeywordMatch]:
+        """
+        Finds keyword matches with the compiled trie pattern (used for large rule sets).
+        """
+        text_length = len(text)
+        search = self._pattern.search
+        by_keyword = self._by_keyword
+        longer = self._longer
+        found = search(text)
+        while found is not None:
+            start = found.start()
+            shortest = found.group()  # Every keyword starting here is this one or an extension of it
+            for keyword, level, weight, word in by_keyword[shortest]:
+                if not word or self._whole_word(text, start, found.end()):
+                    yield KeywordMatch(keyword, level, start, weight)
+            for length in longer.get(shortest, ()):
+                if start + length > text_length:
+                    break
+                for keyword, level, weight, word in by_keyword.get(text[start:start + length], ()):
+                    if not word or self._whole_word(text, start, start + length):
+                        yield KeywordMatch(keyword, level, start, weight)
+            # Resume one character later so keywords overlapping this hit are still found
+            found = search(text, start + 1)
+
+    def _iter_small(self, text: str) -> Iterator[KeywordMatch]:
+        """
+        Finds matches with one substring search per keyword (used for small rule sets).
+
+        Args:
+            text (str): The text to scan.
+
+        Yields:
+            KeywordMatch: One entry per keyword occurrence, ordered by offset.
+        """
+        matches = []
+        for keyword, level, weight, word in self._keywords:
+            start = text.find(keyword)
+            while start != -1:
+                if not word or self._whole_word(text, start, start + len(keyword)):
+                    matches.append(KeywordMatch(keyword, level, start, weight))
+                start = text.find(keyword, start + 1)
+        matches.sort(key=lambda match: match.start)
+        yield from matches
+
+    @staticmethod
+    def _iter_pattern(rule: PatternRule, pattern, text: str) -> Iterator[KeywordMatch]:
+        """
+        Finds the matches of one pattern rule, dropping those its validator rejects.
+        """
+        validator = VALIDATORS[rule.validator] if rule.validator is not None else None
+        for found in pattern.finditer(text):
+            if validator is None or validator(found.group()):
+                yield KeywordMatch(rule.name, rule.level, found.start(), rule.weight, found.end() - found.start())
+
+    @staticmethod
+    def _whole_word(text: str, start: int, end: int) -> bool:
+        """
+        Returns True if text[start:end] is not part of a longer word. The end of the text counts as a boundary.
+        """
+        return ((start == 0 or not _is_word_char(text[start - 1])) and
+                (end >= len(text) or not _is_word_char(text[end])))
+
+    def stream(self) -> 'MatchStream':
+        """
+        Returns a MatchStream that scans text fed to it in chunks.
+        """
+        return MatchStream(self)
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """
+        Returns every keyword occurrence in the text.
+
+        Args:
+            text (str): The text to scan (already lowercased by the caller).
+
+        Returns:
+            list: KeywordMatch entries ordered by offset.
+        """
+        return list(self.iter_matches(text))
+
+    def count_levels(self, text: str) -> Dict[str, int]:
+        """
+        Counts the keyword occurrences of each level in the text, like find_all without building matches.
+
+        Args:
+            text (str): The text to scan (already lowercased by the caller).
+
+        Returns:
+            dict: Every level mapped to its number of occurrences (0 when nothing matched).
+        """
+        counts = dict.fromkeys(self.levels, 0)
+        for level, _ in self._empty_levels:
+            counts[level] += 1
+        if self._pattern is not None or not self.simple:
+            for match in self.iter_matches(text):
+                if match.keyword:
+                    counts[match.level] += 1
+            return counts
+        for keyword, level, _, _ in self._keywords:
+            start = text.find(keyword)
+            while start != -1:  # Overlapping occurrences count, as in find_all
+                counts[level] += 1
+                start = text.find(keyword, start + 1)
+        return counts
+
+    def applies(self, level: str, count: int, score: float) -> bool:
+        """
+        Returns True if a level with this many matches and this weighted score applies to a text.
+        """
+        threshold = self.thresholds.get(level)
+        return count > 0 if threshold is None else score >= threshold
+
+    def decide(self, counts: Dict[str, int], scores: Dict[str, float]) -> str:
+        """
+        Returns the first level in rule order that applies, or "unknown".
+        """
+        for level in self.levels:
+            if self.applies(level, counts.get(level, 0), scores.get(level, 0.0)):
+                return level
+        return "unknown"
+
+    def best_level(self, text: str) -> str:
+        """
+        Returns the highest-precedence level that applies to the text.
+
+        Scanning stops as soon as the top level applies.
+
+        Args:
+            text (str): The text to scan (already lowercased by the caller).
+
+        Returns:
+            str: The matching level, or "unknown" if no level applies.
+        """
+        if not self.simple:
+            stream = MatchStream(self)
+            stream.feed(text, final=True)
+            return stream.level
+        best_rank = min((self.level_rank[level] for level, _ in self._empty_levels), default=len(self.levels))
+        if self._pattern is None:
+            for keyword, level, _, _ in self._keywords:  # Stored in precedence order, so the first hit wins
+                if self.level_rank[level] >= best_rank:
+                    break
+                if keyword in text:
+                    return level
+            return self.levels[best_rank] if best_rank < len(self.levels) else "unknown"
+        for match in self.iter_matches(text):
+            rank = self.level_rank[match.level]
+            if rank < best_rank:
+                best_rank = rank
+                if rank == 0:
+                    break
+        return self.levels[best_rank] if best_rank < len(self.levels) else "unknown"
+
+
+class MatchStream:
+    """
+    Scans a text delivered in chunks, reporting every keyword exactly once.
+
+    The last `overlap` characters of each chunk (the longest keyword or pattern span) are kept and
+    prepended to the next one, so matches that cross a chunk boundary are still found and whole-word
+    checks can see the character before a match. Offsets are relative to the whole stream. A whole-word
+    keyword at the very end of a chunk is only reported once the next chunk shows the word ends there.
+    Per-level match counts and weighted scores are kept as matches arrive. Call finish() after the last
+    chunk (or feed it with final=True) so pattern matches at the very end are reported.
+    """
+    def __init__(self, matcher: KeywordMatcher):
+        self.matcher = matcher
+        self._tail = ''  # End of the previous chunk, long enough to hold the start of any match
+        self._tail_offset = 0  # Stream offset of the first character of _tail
+        self._pattern_ends = {}  # Stream offset where each pattern rule's last reported match ended
+        self.counts = dict.fromkeys(matcher.levels, 0)  # Matches per level so far
+        self.scores = dict.fromkeys(matcher.levels, 0.0)  # Weighted score per level so far
+        for level, weight in matcher._empty_levels:
+            self.counts[level] += 1
+            self.scores[level] += weight
+        self.best_rank = len(matcher.levels)
+        for level in matcher.levels:
+            self._update_rank(level)
+
+    def _update_rank(self, level):
+        rank = self.matcher.level_rank[level]
+        if rank < self.best_rank and self.matcher.applies(level, self.counts[level], self.scores[level]):
+            self.best_rank = rank
+
+    @property
+    def level(self) -> str:
+        """
+        The highest-precedence level that applies so far, or "unknown".
+        """
+        return self.matcher.levels[self.best_rank] if self.best_rank < len(self.matcher.levels) else "unknown"
+
+    @property
+    def decided(self) -> bool:
+        """
+        True once the top level applies (scores only grow), so later text cannot change the level.
+        """
+        return self.best_rank == 0
+
+    def feed(self, text: str, final: bool = False) -> List[KeywordMatch]:
+        """
+        Scans the next chunk of the stream.
+
+        A pattern match starting in the kept tail might continue in the next chunk (a card number cut by the
+        boundary can match a shorter valid prefix), and so might the word after a whole-word keyword ending
+        the chunk, so these are held back and found again with the next chunk or when the stream is finished.
+
+        Args:
+            text (str): The next chunk (already lowercased by the caller).
+            final (bool): No more text follows, so nothing needs to be kept for the next chunk.
+
+        Returns:
+            list: The keyword matches completed by this chunk, with stream offsets.
+        """
+        buffer = self._tail + text
+        new_start = len(self._tail)
+        keep = 0 if final else min(self.matcher.overlap, len(buffer))
+        cut = len(buffer) - keep  # Where the tail kept for the next chunk starts
+        pattern_ends = self._pattern_ends
+        word_keywords = self.matcher._word_keywords
+        found = []
+        counts, scores = self.counts, self.scores
+        for match in self.matcher.iter_matches(buffer):
+            if not match.keyword:
+                continue
+            if match.length is None:
+                if match.keyword in word_keywords:
+                    # Held back when ending the buffer, so ending exactly at new_start means it was held last time
+                    if match.end < new_start or (match.end == len(buffer) and not final):
+                        continue
+                elif match.end <= new_start:  # Ended inside the kept tail: already reported with the previous chunk
+                    continue
+            elif match.start >= cut:  # Might still grow: found again, whole, with the next chunk
+                continue
+            else:
+                start = match.start + self._tail_offset
+                if start < pattern_ends.get(match.keyword, 0):  # The rest of a match reported with an earlier chunk
+                    continue
+                pattern_ends[match.keyword] = start + match.length
+            found.append(match._replace(start=match.start + self._tail_offset))
+            counts[match.level] += 1
+            scores[match.level] += match.weight
+            self._update_rank(match.level)
+        self._tail = buffer[cut:]
+        self._tail_offset += cut
+        return found
+
+    def finish(self) -> List[KeywordMatch]:
+        """
+        Ends the stream, reporting the pattern matches held back at the end of the last chunk.
+        """
+        return self.feed('', final=True)
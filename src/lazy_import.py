@@ -0,0 +1,27 @@
+#Lazy module imports
+#Defers loading heavy optional dependencies until they are first used
+import importlib
+
+
+class LazyModule:
+    """
+    Stands in for a module and imports it on first attribute access.
+
+    `pytesseract = LazyModule('pytesseract')` at module level reads like a normal import, keeps
+    `module.pytesseract.image_to_string` patchable in tests, and costs nothing until it is used.
+    """
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        if self._module is None:
+            self.__dict__['_module'] = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<LazyModule {self._name!r} ({state})>"
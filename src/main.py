@@ -2,33 +2,386 @@
 #Orchestrates the execution of the program
 #Handles CLA
 import os
-from file_scanner import FileScanner
-from content_analyzer import ContentAnalyzer
+import sys
+import csv
+import json
+import time
+import argparse
+from typing import Optional
+from scan_engine import ScanEngine
+from scan_cache import ScanCache, default_cache_path
+from budget import ScanBudget
+from metrics import NULL_METRICS, ScanMetrics, profile_scan
+from checkpoint import ScanCheckpoint
+from manifest import DELETED, ScanManifest, default_manifest_path, delta_scan, watch
+from dedup import group_fields
+from sinks import open_sink
+from prefetch import DEFAULT_MAX_BYTES, Prefetcher
+from distributed import DEFAULT_LEASE, DEFAULT_SHARDS, SHARD_BY, ShardQueue, ShardWorker
 
-def main():
-    path = input("Enter the path to the directory to scan: ").strip()
-    if not os.path.isdir(path):
-        print(f"Error: '{path}' is not a valid directory.")
+OUTPUT_FIELDS = ('path', 'sensitivity', 'score', 'terms', 'error', 'status', 'reason', 'cached', 'truncated', 'chars',
+                 'read_ms', 'match_ms', 'rules_version', 'duplicate_of')  # JSONL/CSV columns
+CHANGE_FIELDS = ('path', 'status', 'old_sensitivity', 'sensitivity', 'level_changed', 'error', 'read_ms', 'match_ms',
+                 'rules_version')  # Columns in delta/watch mode
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Scan directories and label each file's sensitivity.")
+    parser.add_argument('roots', nargs='*', help="Directories to scan. Prompts for one when omitted.")
+    parser.add_argument('--rules', help="Rules file. Defaults to config/rules.json.")
+    parser.add_argument('--format', choices=('text', 'jsonl', 'csv'), default='text', help="Output format.")
+    parser.add_argument('--output', '-o', help="Write results to this file instead of stdout.")
+    parser.add_argument('--process-workers', type=int, help="OCR/PDF worker processes (0 = none). Defaults to the CPU count.")
+    parser.add_argument('--thread-workers', type=int, help="Text/DOCX worker threads. Defaults to 4.")
+    parser.add_argument('--cache', default=default_cache_path(), help="Result cache location.")
+    parser.add_argument('--no-cache', action='store_true', help="Read every file, ignoring the result cache.")
+    parser.add_argument('--checkpoint', help="Resume from (and record progress in) this file. Removed when the scan completes.")
+    parser.add_argument('--delta', action='store_true', help="Only scan files that changed since the last --delta run and report the changes.")
+    parser.add_argument('--watch', action='store_true', help="After a delta scan, keep following changes with inotify (Linux) until interrupted.")
+    parser.add_argument('--manifest', default=default_manifest_path(), help="Where --delta and --watch keep the state of the last scan.")
+    parser.add_argument('--coordinator', metavar='QUEUE', help="Plan a distributed scan of the roots in this queue database, wait for --worker processes to finish it and write the merged results.")
+    parser.add_argument('--worker', metavar='QUEUE', help="Scan shards from this queue database until it is finished. Roots, if given, are where the coordinator's roots are mounted on this host.")
+    parser.add_argument('--shards', type=int, default=DEFAULT_SHARDS, help="Number of hash shards for --coordinator.")
+    parser.add_argument('--shard-by', choices=SHARD_BY, default='hash', help="Shard by path hash or by top-level directory.")
+    parser.add_argument('--lease', type=float, default=DEFAULT_LEASE, help="Seconds without a heartbeat before a worker's shard is reassigned.")
+    parser.add_argument('--max-bytes', type=int, help="Stop reading a text file after this many bytes.")
+    parser.add_argument('--deep-ocr', action='store_true', help="OCR every PDF page, not only scanned ones.")
+    parser.add_argument('--max-file-bytes', type=int, help="Skip larger files (text files are read up to this size).")
+    parser.add_argument('--max-pages', type=int, help="Read at most this many pages of a PDF.")
+    parser.add_argument('--max-image-pixels', type=int, help="Downsample or skip larger images. Defaults to Pillow's bomb limit.")
+    parser.add_argument('--file-timeout', type=float, help="Seconds allowed per file, OCR included.")
+    parser.add_argument('--max-worker-rss-mb', type=int, help="Replace worker processes whose memory grows past this.")
+    parser.add_argument('--prefetch', type=int, default=0, metavar='N', help="Read the next N files into memory ahead of the workers, for slow (network) storage. 0 = off.")
+    parser.add_argument('--prefetch-mb', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), help="Memory cap of the --prefetch buffers; larger files are read directly.")
+    parser.add_argument('--dedup', action='store_true', help="Read only one copy of identical files and copy its result to the others.")
+    parser.add_argument('--duplicates', metavar='FILE', help="Write the groups of identical files to this JSONL file (implies --dedup).")
+    parser.add_argument('--sink', action='append', default=[], metavar='FILE', help="Also store results in this file: .sqlite/.db (kept across runs, queryable with sinks.ResultHistory), .csv or .parquet. Repeatable.")
+    parser.add_argument('--content', action='store_true', help="Include the extracted text in JSONL/CSV output.")
+    parser.add_argument('--metrics', action='store_true', help="Print per-stage timings to stderr when done.")
+    parser.add_argument('--profile', help="Write a cProfile dump of the scan to this file.")
+    return parser
+
+
+def build_budget(args) -> ScanBudget:
+    """
+    Builds the per-file ScanBudget from the command line options.
+    """
+    budget = ScanBudget(max_file_bytes=args.max_file_bytes, max_pages=args.max_pages, timeout=args.file_timeout,
+                        max_worker_rss=args.max_worker_rss_mb * 1024 * 1024 if args.max_worker_rss_mb else None)
+    if args.max_image_pixels is not None:
+        budget.max_image_pixels = args.max_image_pixels
+    return budget
+
+
+def build_prefetch(args) -> Optional[Prefetcher]:
+    """
+    Builds the Prefetcher from the command line options, or returns None when read-ahead is off.
+    """
+    if args.prefetch <= 0:
+        return None
+    return Prefetcher(depth=args.prefetch, max_bytes=args.prefetch_mb * 1024 * 1024)
+
+
+def record_fields(record, include_content=False) -> dict:
+    """
+    Converts a ScanRecord into the flat dict written as a JSONL line or CSV row.
+    """
+    analysis = record.analysis
+    fields = {
+        'path': record.path,
+        'sensitivity': record.sensitivity,
+        'score': round(analysis.score, 3) if analysis is not None else None,
+        'terms': ';'.join(f"{term}:{count}" for term, count in analysis.terms.items()) if analysis is not None else None,
+        'error': record.error,
+        'status': record.status,
+        'reason': record.reason,
+        'cached': record.cached,
+        'truncated': record.truncated,
+        'chars': len(record.content) if record.content is not None else None,
+        'read_ms': round(record.read_seconds * 1000, 3) if record.read_seconds is not None else None,
+        'match_ms': round(record.match_seconds * 1000, 3) if record.match_seconds is not None else None,
+        'rules_version': record.rules_version,
+        'duplicate_of': record.duplicate_of,
+    }
+    if include_content:
+        fields['content'] = record.content
+    return fields
+
+
+def change_fields(change, include_content=False) -> dict:
+    """
+    Converts a FileChange into the flat dict written in delta and watch mode.
+    """
+    fields = record_fields(change.record, include_content) if change.record is not None else {'path': change.path}
+    fields.update(status=change.status, old_sensitivity=change.old_level, sensitivity=change.new_level,
+                  level_changed=change.level_changed)
+    return {name: fields.get(name) for name in CHANGE_FIELDS + (('content',) if include_content else ())}
+
+
+class RecordWriter:
+    """
+    Streams records to a text stream in the chosen format, one line per file.
+    """
+    def __init__(self, stream, output_format, include_content=False, write_header=True, columns=OUTPUT_FIELDS):
+        self.stream = stream
+        self.format = output_format
+        self.include_content = include_content
+        self._csv = None
+        if output_format == 'csv':
+            columns = columns + (('content',) if include_content else ())
+            self._csv = csv.DictWriter(stream, fieldnames=columns, lineterminator='\n')
+            if write_header:
+                self._csv.writeheader()
+
+    def write(self, record):
+        if self.format == 'text':
+            if record.content:
+                self.stream.write(f"File: {record.path} | Sensitivity: {record.sensitivity}\n")
+            return
+        self._write_fields(record_fields(record, self.include_content))
+
+    def write_change(self, change):
+        if self.format == 'text':
+            self.stream.write(f"{change.status.capitalize()}: {change.path} | Sensitivity: {change.old_level} -> {change.new_level}\n")
+            return
+        self._write_fields(change_fields(change, self.include_content))
+
+    def write_fields(self, fields):
+        """
+        Writes a result that is already flat, e.g. one merged from a distributed scan.
+        """
+        if self.format == 'text':
+            if fields.get('chars'):
+                self.stream.write(f"File: {fields['path']} | Sensitivity: {fields['sensitivity']}\n")
+            return
+        self._write_fields({name: fields.get(name) for name in OUTPUT_FIELDS})
+
+    def _write_fields(self, fields):
+        if self._csv is not None:
+            self._csv.writerow(fields)
+        else:
+            self.stream.write(json.dumps(fields, ensure_ascii=False) + '\n')
+
+    def flush(self):
+        self.stream.flush()
+
+
+def run(args) -> int:
+    """
+    Runs a scan as described by parsed command line arguments.
+
+    Returns:
+        int: The process exit code.
+    """
+    for root in args.roots:
+        if not os.path.isdir(root):
+            print(f"Error: '{root}' is not a valid directory.", file=sys.stderr)
+            return 2
+    if args.worker:
+        return run_worker(args)
+    if args.coordinator:
+        return run_coordinator(args)
+    if args.delta or args.watch:
+        return run_delta(args)
+    checkpoint = ScanCheckpoint(args.checkpoint) if args.checkpoint else None
+    resuming = checkpoint is not None and len(checkpoint) > 0
+    if args.output:
+        append = resuming and os.path.exists(args.output)  # Keep the results written before the crash
+        stream = open(args.output, 'a' if append else 'w', encoding='utf-8', newline='')
+    else:
+        append = False
+        stream = sys.stdout
+    writer = RecordWriter(stream, args.format, args.content, write_header=not append)
+    metrics = ScanMetrics() if args.metrics else NULL_METRICS
+    cache = None if args.no_cache else ScanCache(args.cache)
+    duplicate_groups = []
+    completed = False
+    sinks = []
+    try:
+        sinks = [open_sink(path, args.roots) for path in args.sink]
+        with profile_scan(args.profile), ScanEngine(args.rules, process_workers=args.process_workers,
+                                                    thread_workers=args.thread_workers, cache=cache,
+                                                    max_bytes=args.max_bytes, deep_ocr=args.deep_ocr,
+                                                    metrics=metrics, budget=build_budget(args),
+                                                    prefetch=build_prefetch(args),
+                                                    dedup=args.dedup or bool(args.duplicates)) as engine:
+            for root in args.roots:
+                for record in engine.scan_directory(root, skip=checkpoint):  # Results are written as soon as each file is analyzed
+                    if checkpoint is not None and record.path in checkpoint:
+                        continue  # A member of an archive cut short by the crash, already written before it
+                    writer.write(record)
+                    for sink in sinks:
+                        sink.write(record)
+                    if checkpoint is None:
+                        writer.flush()
+                    elif checkpoint.mark(record.path):
+                        writer.flush()  # Output first, so a crash never loses results the checkpoint counts as done
+                        for sink in sinks:
+                            sink.flush()
+                        checkpoint.flush()
+                duplicate_groups.extend(engine.duplicate_groups)
+        completed = True
+        if args.duplicates:
+            write_duplicates(args.duplicates, duplicate_groups)
+    finally:
+        writer.flush()
+        for sink in sinks:
+            sink.close()
+        if checkpoint is not None:
+            checkpoint.close()
+            if completed:
+                os.remove(checkpoint.path)  # The next run starts from scratch
+        if cache is not None:
+            cache.close()
+        if stream is not sys.stdout:
+            stream.close()
+    if args.metrics:
+        print(metrics.format_summary(), file=sys.stderr)
+    return 0
+
+
+def write_duplicates(path, groups):
+    """
+    Writes one JSON line per group of identical files, largest waste first, for cleanup.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        for group in sorted(groups, key=lambda group: group.wasted_bytes, reverse=True):
+            f.write(json.dumps(group_fields(group), ensure_ascii=False) + '\n')
+
+
+def run_delta(args) -> int:
+    """
+    Runs a delta scan (and optionally a watch) of every root, writing one line per changed file.
+
+    Returns:
+        int: The process exit code.
+    """
+    if args.watch and len(args.roots) != 1:
+        print("Error: --watch takes exactly one directory.", file=sys.stderr)
+        return 2
+    stream = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    writer = RecordWriter(stream, args.format, args.content, columns=CHANGE_FIELDS)
+    metrics = ScanMetrics() if args.metrics else NULL_METRICS
+    cache = None if args.no_cache else ScanCache(args.cache)
+    sinks = []
+    try:
+        sinks = [open_sink(path, args.roots, delta=True) for path in args.sink]
+        with ScanManifest(args.manifest) as manifest, ScanEngine(
+                args.rules, process_workers=args.process_workers, thread_workers=args.thread_workers, cache=cache,
+                max_bytes=args.max_bytes, deep_ocr=args.deep_ocr, metrics=metrics, budget=build_budget(args),
+                prefetch=build_prefetch(args)) as engine:
+            for root in args.roots:
+                changes = watch(engine, root, manifest) if args.watch else delta_scan(engine, root, manifest)
+                for change in changes:
+                    writer.write_change(change)
+                    writer.flush()
+                    for sink in sinks:
+                        if change.record is not None:
+                            sink.write(change.record)
+                        elif change.status == DELETED:
+                            sink.write_deletion(change.path)
+                        if args.watch:
+                            sink.flush()  # Changes trickle in, so do not hold them back for a full batch
+    except KeyboardInterrupt:  # The way to end --watch
+        pass
+    except NotImplementedError as e:  # --watch on a system without inotify
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        writer.flush()
+        for sink in sinks:
+            sink.close()
+        if cache is not None:
+            cache.close()
+        if stream is not sys.stdout:
+            stream.close()
+    if args.metrics:
+        print(metrics.format_summary(), file=sys.stderr)
+    return 0
+
+
+def run_coordinator(args) -> int:
+    """
+    Plans a distributed scan (or resumes the one already planned in the queue), waits for the workers and
+    writes the merged results.
+
+    Returns:
+        int: The process exit code.
+    """
+    with ShardQueue(args.coordinator, lease_seconds=args.lease) as queue:
+        queue.plan(args.roots, args.rules, shard_by=args.shard_by, shards=args.shards)
+        queue.wait()
+        stream = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+        writer = RecordWriter(stream, args.format)
+        try:
+            for fields in queue.results():
+                writer.write_fields(fields)
+        finally:
+            writer.flush()
+            if stream is not sys.stdout:
+                stream.close()
+    return 0
+
+
+def run_worker(args) -> int:
+    """
+    Scans shards of a distributed scan until its queue is finished.
+
+    Returns:
+        int: The process exit code.
+    """
+    cache = None if args.no_cache else ScanCache(args.cache)
+    try:
+        with ShardQueue(args.worker, lease_seconds=args.lease) as queue:
+            while not queue.planned:  # Workers may start before the coordinator
+                time.sleep(1)
+            if args.roots and len(args.roots) != len(queue.roots):
+                print(f"Error: the scan has {len(queue.roots)} roots, not {len(args.roots)}.", file=sys.stderr)
+                return 2
+            with ShardWorker(queue, roots=args.roots or None, process_workers=args.process_workers,
+                             thread_workers=args.thread_workers, cache=cache, max_bytes=args.max_bytes,
+                             deep_ocr=args.deep_ocr, budget=build_budget(args),
+                             prefetch=build_prefetch(args)) as worker:
+                worker.run()
+    finally:
+        if cache is not None:
+            cache.close()
+    return 0
+
+
+IGNORED_OPTIONS = (  # (mode, options the mode does not use), checked in the order run() picks the mode
+    ('--worker', ('--rules', '--format', '--output', '--sink', '--metrics', '--content', '--checkpoint', '--dedup',
+                  '--duplicates', '--profile', '--delta', '--watch', '--coordinator')),
+    ('--coordinator', ('--sink', '--metrics', '--content', '--checkpoint', '--dedup', '--duplicates', '--profile',
+                       '--delta', '--watch')),
+    ('--delta', ('--checkpoint', '--dedup', '--duplicates', '--profile')),
+    ('--watch', ('--checkpoint', '--dedup', '--duplicates', '--profile')),
+)
+
+
+def check_options(parser, args):
+    """
+    Rejects options that the chosen mode would silently ignore.
+    """
+    for mode, options in IGNORED_OPTIONS:
+        if not getattr(args, mode[2:]):
+            continue
+        dests = {option: option[2:].replace('-', '_') for option in options}
+        ignored = [option for option, dest in dests.items() if getattr(args, dest) != parser.get_default(dest)]
+        if ignored:
+            parser.error(f"{', '.join(ignored)} cannot be used with {mode}")
         return
 
-    scanner = FileScanner()
-    analyzer = ContentAnalyzer()
-    results = []
-
-    for root, _, filenames in os.walk(path):
-        for filename in filenames:
-            file_path = os.path.join(root, filename)
-            content = scanner.read_file(file_path)
-            if content:
-                sensitivity = analyzer.analyze_file(content)
-                results.append({
-                    'file': file_path,
-                    'sensitivity': sensitivity
-                })
-
-    print("\nScan Results:")
-    for result in results:
-        print(f"File: {result['file']} | Sensitivity: {result['sensitivity']}")
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    check_options(parser, args)
+    if not args.roots and not args.worker:  # Interactive use
+        args.roots = [input("Enter the path to the directory to scan: ").strip()]
+        if args.format == 'text' and not args.output:
+            print("\nScan Results:")
+    return run(args)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,278 @@
+#Scan manifest and incremental rescans
+#Remembers what the last scan saw so later scans only read new, modified and deleted files
+import os
+import sqlite3
+import logging
+import threading
+from collections import deque
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional
+
+try:
+    from .walker import entry_stat
+except ImportError:  # Running with src/ on sys.path (CLI and tests)
+    from walker import entry_stat
+
+NEW, MODIFIED, DELETED = 'new', 'modified', 'deleted'  # FileChange statuses
+_COMMIT_EVERY = 500  # Changes are committed in batches, so an interrupted delta scan keeps most of its progress
+
+
+def default_manifest_path() -> str:
+    """
+    Returns the default location of the manifest database in the user's home directory.
+    """
+    return os.path.join(os.path.expanduser('~'), '.label_automation', 'manifest.sqlite')
+
+
+class ManifestEntry(NamedTuple):
+    """
+    What the last scan recorded about a file.
+    """
+    size: int
+    mtime_ns: int
+    inode: int
+    level: Optional[str]  # None when the file had no text to analyze
+    prefix: Optional[int] = None  # The max_bytes the file was cut at, or None when it was read whole
+
+
+class FileChange(NamedTuple):
+    """
+    A file that was added, modified or deleted since the last scan.
+    """
+    path: str
+    status: str  # NEW, MODIFIED or DELETED
+    old_level: Optional[str]  # The level in the manifest (None for new files)
+    new_level: Optional[str]  # The level now (None for deleted files)
+    record: Optional[object] = None  # The ScanRecord of the rescan (None for deleted files)
+
+    @property
+    def level_changed(self) -> bool:
+        return self.old_level != self.new_level
+
+
+class ScanManifest:
+    """
+    SQLite table of the files seen by the last scan of each root, with their metadata and level.
+
+    Unlike the ScanCache, which keeps extracted text for any path, the manifest describes whole trees,
+    so a rescan can tell which files were deleted and report which files changed level.
+    """
+    def __init__(self, db_path=None):
+        """
+        Opens (or creates) the manifest database.
+
+        Args:
+            db_path (str, optional): The database file. Defaults to default_manifest_path().
+        """
+        self.db_path = db_path or default_manifest_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._pending_writes = 0
+        self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS manifest ('
+            ' root TEXT, path TEXT, size INTEGER, mtime_ns INTEGER, inode INTEGER, level TEXT, prefix INTEGER,'
+            ' PRIMARY KEY (root, path))')
+        if 'prefix' not in [row[1] for row in self._connection.execute('PRAGMA table_info(manifest)')]:
+            self._connection.execute('ALTER TABLE manifest ADD COLUMN prefix INTEGER')  # Written before prefixes were kept
+        self._connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def entries(self, root) -> Dict[str, ManifestEntry]:
+        """
+        Returns every file recorded for a root.
+
+        Args:
+            root (str): The scanned directory, as an absolute path.
+
+        Returns:
+            dict: Path to ManifestEntry.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT path, size, mtime_ns, inode, level, prefix FROM manifest WHERE root = ?', (root,)).fetchall()
+        return {path: ManifestEntry(*entry) for path, *entry in rows}
+
+    def update(self, root, file_path, stat, level, prefix=None):
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO manifest (root, path, size, mtime_ns, inode, level, prefix)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (root, file_path, stat.st_size, stat.st_mtime_ns, stat.st_ino, level, prefix))
+            self._note_write()
+
+    def remove(self, root, file_path):
+        with self._lock:
+            self._connection.execute('DELETE FROM manifest WHERE root = ? AND path = ?', (root, file_path))
+            self._note_write()
+
+    def _note_write(self):
+        """
+        Counts a write and commits once a batch is complete. Must be called with the lock held.
+        """
+        self._pending_writes += 1
+        if self._pending_writes >= _COMMIT_EVERY:
+            self._connection.commit()
+            self._pending_writes = 0
+
+    def commit(self):
+        with self._lock:
+            self._connection.commit()
+            self._pending_writes = 0
+
+    def close(self):
+        """
+        Commits pending changes and closes the database.
+        """
+        with self._lock:
+            if self._connection is None:
+                return
+            self._connection.commit()
+            self._connection.close()
+            self._connection = None
+
+
+def _unchanged(entry: Optional[ManifestEntry], stat, max_bytes) -> bool:
+    """
+    Returns True if the file is as recorded, and a recorded prefix was cut at the max_bytes in use now.
+    """
+    return (entry is not None and (entry.size, entry.mtime_ns, entry.inode) == (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+            and (entry.prefix is None or entry.prefix == max_bytes))
+
+
+def apply_changes(engine, manifest: ScanManifest, root, known: Dict[str, ManifestEntry],
+                  candidates: Iterable) -> Iterator[FileChange]:
+    """
+    Rescans the candidates that differ from the manifest and records the results.
+
+    Args:
+        engine (ScanEngine): Scans the changed files.
+        manifest (ScanManifest): Updated with every change.
+        root (str): The manifest root the candidates belong to.
+        known (dict): The manifest entries of the root, kept in sync with the database.
+        candidates (iterable): Paths or WalkEntry objects that may have changed. Consumed lazily.
+
+    Yields:
+        FileChange: One per new, modified or deleted candidate, in input order (deletions of missing
+            candidates are reported as they are found).
+    """
+    queued = deque()  # (path, status, old level, stat) of each file handed to the engine, in order
+    deletions = deque()
+    max_bytes = engine.scanner.max_bytes
+
+    def changed_files():
+        for item in candidates:
+            file_path = os.fspath(item)
+            old = known.get(file_path)
+            try:
+                stat = entry_stat(item) or os.stat(file_path)
+            except OSError:
+                if old is not None:
+                    deletions.append(file_path)
+                continue
+            if _unchanged(old, stat, max_bytes):
+                continue
+            queued.append((file_path, MODIFIED if old is not None else NEW, old.level if old else None, stat))
+            yield file_path
+
+    def flush_deletions():
+        while deletions:
+            file_path = deletions.popleft()
+            old = known.pop(file_path)
+            manifest.remove(root, file_path)
+            yield FileChange(file_path, DELETED, old.level, None)
+
+    for record in engine.scan_paths(changed_files()):
+        yield from flush_deletions()
+        file_path, status, old_level, stat = queued.popleft()
+        # Failed and budget-limited (partial or skipped) files stay as they were, so the next scan retries
+        # them, as the scan cache does (see ScanCache.put_record). A max_bytes prefix is recorded with its limit.
+        if record.error is None and record.status in (None, 'prefix'):
+            prefix = max_bytes if record.status == 'prefix' else None
+            known[file_path] = ManifestEntry(stat.st_size, stat.st_mtime_ns, stat.st_ino, record.sensitivity, prefix)
+            manifest.update(root, file_path, stat, record.sensitivity, prefix)
+        yield FileChange(file_path, status, old_level, record.sensitivity, record)
+    yield from flush_deletions()
+    manifest.commit()
+
+
+def delta_scan(engine, root, manifest: ScanManifest) -> Iterator[FileChange]:
+    """
+    Scans only the files that are new or modified since the last scan of root, and reports deletions.
+
+    The tree is still walked (a cheap os.scandir pass), but unchanged files are never opened.
+
+    Args:
+        engine (ScanEngine): Scans the changed files; its scanner's walker decides which files count.
+        root (str): The directory to scan.
+        manifest (ScanManifest): The state of the previous scan, updated as results arrive.
+
+    Yields:
+        FileChange: One per changed file; deleted files come last.
+    """
+    root = os.path.abspath(root)
+    known = manifest.entries(root)
+    seen = set()
+
+    def walk():
+        for entry in engine.scanner.iter_entries(root):
+            seen.add(entry.path)
+            yield entry
+
+    yield from apply_changes(engine, manifest, root, known, walk())
+    for file_path in sorted(set(known) - seen):  # Deleted, or no longer selected by the walker's filters
+        old = known.pop(file_path)
+        manifest.remove(root, file_path)
+        yield FileChange(file_path, DELETED, old.level, None)
+    manifest.commit()
+
+
+def watch(engine, root, manifest: ScanManifest, stop=None, debounce: float = 0.5) -> Iterator[FileChange]:
+    """
+    Keeps the manifest of root up to date, yielding changes as files are written, moved or deleted.
+
+    Starts with a delta_scan, then follows inotify events (Linux only) instead of walking the tree
+    again. Events are batched until the tree has been quiet for `debounce` seconds. If the kernel
+    event queue overflows, a delta_scan catches up.
+
+    Args:
+        engine (ScanEngine): Scans the changed files.
+        root (str): The directory to watch.
+        manifest (ScanManifest): Updated with every change.
+        stop (threading.Event, optional): Set it to end the watch. Otherwise the generator runs until closed.
+        debounce (float): Seconds without events before a batch is processed.
+
+    Yields:
+        FileChange: One per changed file.
+    """
+    try:
+        from .watcher import InotifyWatcher
+    except ImportError:  # Running with src/ on sys.path (CLI and tests)
+        from watcher import InotifyWatcher
+    root = os.path.abspath(root)
+    walker = engine.scanner.walker
+    with InotifyWatcher(root, skip_dirs=walker.skip_dirs) as watcher:  # Started first, so nothing is missed during the delta scan
+        yield from delta_scan(engine, root, manifest)
+        known = manifest.entries(root)
+        while stop is None or not stop.is_set():
+            batch = watcher.read(timeout=debounce, debounce=debounce)
+            if batch is None:
+                continue
+            if batch.overflow:
+                yield from delta_scan(engine, root, manifest)
+                known = manifest.entries(root)
+                continue
+            candidates = {path for path in batch.files if path in known or walker.accepts(path, root)}
+            for directory in batch.directories:  # Created, moved or deleted directories: check everything below
+                prefix = directory + os.sep
+                candidates.update(path for path in known if path.startswith(prefix))
+                if os.path.isdir(directory):
+                    candidates.update(entry.path for entry in walker.walk(directory) if walker.accepts(entry.path, root))
+            yield from apply_changes(engine, manifest, root, known, sorted(candidates))
@@ -0,0 +1,192 @@
+#Scan instrumentation
+#Collects per-stage timings and counters per file type, and optionally profiles a scan
+import os
+import time
+import threading
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Optional
+
+STAGES = ('walk', 'dedup', 'cache', 'read', 'ocr', 'match', 'total')  # Order of the summary columns
+COUNTERS = ('files', 'bytes_read', 'pages', 'images', 'ocr_calls', 'ocr_cache_hits', 'cache_hits', 'errors',
+            'partial', 'skipped', 'worker_recycles', 'worker_crashes', 'duplicates', 'prefetched')
+
+
+def file_type(file_path) -> str:
+    """
+    Returns the key metrics are grouped by: the lowercase extension without the dot.
+    """
+    return os.path.splitext(os.fspath(file_path))[1][1:].lower()
+
+
+class ScanMetrics:
+    """
+    Thread-safe per-stage durations and counters, grouped by file type.
+
+    Stages are 'walk' (directory enumeration), 'dedup' (hashing files to find copies), 'cache' (result
+    cache lookups), 'read' (opening and extracting text, OCR included), 'ocr' (Tesseract and image
+    preprocessing), 'match' (keyword matching) and 'total' (whole files). Hooks are called with
+    (name, file_type, value) for every timing and counter, e.g. to forward them to a monitoring system.
+
+    Pass NULL_METRICS (the default everywhere) to turn instrumentation off: its methods do nothing
+    and the scanner skips its timing calls entirely.
+    """
+    enabled = True
+
+    def __init__(self, hooks: Optional[list] = None):
+        """
+        Initializes the ScanMetrics class.
+
+        Args:
+            hooks (list, optional): Callables invoked as hook(name, file_type, value) on every update.
+        """
+        self.hooks = list(hooks or ())
+        self._lock = threading.Lock()
+        self.seconds = defaultdict(float)  # (stage, file_type) -> seconds
+        self.counts = defaultdict(int)  # (counter, file_type) -> count
+
+    def add_hook(self, hook: Callable):
+        self.hooks.append(hook)
+
+    def add_time(self, stage, kind, seconds):
+        with self._lock:
+            self.seconds[(stage, kind)] += seconds
+        for hook in self.hooks:
+            hook(stage, kind, seconds)
+
+    def count(self, counter, kind, amount=1):
+        with self._lock:
+            self.counts[(counter, kind)] += amount
+        for hook in self.hooks:
+            hook(counter, kind, amount)
+
+    @contextmanager
+    def time(self, stage, kind):
+        """
+        Times the body of a with-block as one occurrence of a stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, kind, time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        """
+        Returns the collected values as plain dicts, e.g. to send them from a worker process.
+        """
+        with self._lock:
+            return {'seconds': dict(self.seconds), 'counts': dict(self.counts)}
+
+    def merge(self, snapshot: dict):
+        """
+        Adds the values of a snapshot (typically from a worker process) to this object.
+        """
+        with self._lock:
+            for key, seconds in snapshot['seconds'].items():
+                self.seconds[key] += seconds
+            for key, count in snapshot['counts'].items():
+                self.counts[key] += count
+
+    def reset(self):
+        with self._lock:
+            self.seconds.clear()
+            self.counts.clear()
+
+    def summary(self) -> dict:
+        """
+        Returns the values grouped by file type.
+
+        Returns:
+            dict: {file_type: {stage or counter: value}}, with an 'all' entry summing every type.
+        """
+        snapshot = self.snapshot()
+        table = defaultdict(lambda: defaultdict(float))
+        for (stage, kind), seconds in snapshot['seconds'].items():
+            table[kind][stage] += seconds
+            table['all'][stage] += seconds
+        for (counter, kind), count in snapshot['counts'].items():
+            table[kind][counter] += count
+            table['all'][counter] += count
+        return {kind: dict(values) for kind, values in table.items()}
+
+    def format_summary(self) -> str:
+        """
+        Renders the summary as a fixed-width table, one row per file type.
+        """
+        summary = self.summary()
+        if not summary:
+            return "No scan metrics recorded."
+        headers = [f"{stage} s" for stage in STAGES] + list(COUNTERS)
+        lines = [f"{'type':<8}" + ''.join(f"{header:>15}" for header in headers)]
+        kinds = sorted(kind for kind in summary if kind != 'all') + ['all']
+        for kind in kinds:
+            values = summary[kind]
+            cells = [f"{values.get(stage, 0.0):>15.3f}" for stage in STAGES]
+            cells += [f"{int(values.get(counter, 0)):>15}" for counter in COUNTERS]
+            lines.append(f"{(kind or '-'):<8}" + ''.join(cells))
+        return '\n'.join(lines)
+
+
+class _NullMetrics(ScanMetrics):
+    """
+    Disabled instrumentation: every method is a no-op.
+    """
+    enabled = False
+
+    def __init__(self):
+        super().__init__()
+
+    def add_time(self, stage, kind, seconds):
+        pass
+
+    def count(self, counter, kind, amount=1):
+        pass
+
+    def time(self, stage, kind):
+        return nullcontext()
+
+    def merge(self, snapshot):
+        pass
+
+
+NULL_METRICS = _NullMetrics()
+
+
+@contextmanager
+def profile_scan(output_path: Optional[str], profiler: str = 'cprofile'):
+    """
+    Profiles the body of a with-block and writes the result to a file.
+
+    Only the calling thread is profiled: the worker pools of a ScanEngine are not, so profile a
+    sequential scan (FileScanner.iter_scan without an engine) to see where file reading spends its time.
+
+    Args:
+        output_path (str, optional): Where to write the profile. Does nothing when None.
+        profiler (str): 'cprofile' writes pstats data (open with `python -m pstats`), 'pyinstrument'
+            writes an HTML report and requires the pyinstrument package.
+    """
+    if output_path is None:
+        yield
+        return
+    if profiler == 'pyinstrument':
+        from pyinstrument import Profiler  # Optional dependency, only needed for this profiler
+        instrument = Profiler()
+        instrument.start()
+        try:
+            yield
+        finally:
+            instrument.stop()
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(instrument.output_html())
+        return
+    if profiler != 'cprofile':
+        raise ValueError(f"Unknown profiler: {profiler!r}")
+    import cProfile
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(output_path)
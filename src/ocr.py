@@ -0,0 +1,205 @@
+#OCR layer in front of Tesseract
+#Caches OCR output and shrinks images before they reach Tesseract
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+try:
+    from .lazy_import import LazyModule
+except ImportError:  # Running with src/ on sys.path (CLI and tests)
+    from lazy_import import LazyModule
+
+pytesseract = LazyModule('pytesseract')  # Imported on the first OCR call, so text-only scans never load it
+
+DEFAULT_CACHE_SIZE = 1024  # OCR results kept in memory
+DEFAULT_MAX_DIMENSION = 4000  # Longest image side passed to Tesseract, in pixels
+TILE_ASPECT = 2.0  # Images longer than this many times their width (or the reverse) are OCR'd in tiles
+_TILE_OVERLAP = 64  # Pixels shared by neighbouring tiles, so a line cut by one tile is whole in the next
+
+
+class OcrEngine:
+    """
+    Runs Tesseract with an LRU cache of results and optional image preprocessing.
+
+    Results are keyed by a hash of the encoded image bytes when the caller has them (files, images
+    embedded in PDFs), so a repeated logo or letterhead is recognised without even being decoded.
+    Before OCR, images can be converted to grayscale, rescaled to a target DPI and capped to a maximum
+    dimension, which cuts Tesseract time on oversized scans. Long strips (receipts, scrolls of stitched
+    pages) would become unreadable if shrunk to fit, so they are only shrunk to fit across and are then
+    OCR'd in overlapping tiles of at most max_dimension pixels. Counters record calls, cache hits and
+    the time spent, so the savings can be measured with stats().
+    """
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE, grayscale: bool = True,
+                 target_dpi: Optional[int] = None, max_dimension: Optional[int] = DEFAULT_MAX_DIMENSION,
+                 tile: bool = True):
+        """
+        Initializes the OcrEngine class.
+
+        Args:
+            cache_size (int): Maximum number of OCR results kept. Use 0 to disable the cache.
+            grayscale (bool): Convert images to grayscale before OCR.
+            target_dpi (int, optional): Rescale images whose DPI is known to this resolution.
+            max_dimension (int, optional): Downscale images whose longest side is larger than this.
+            tile (bool): OCR long strips in tiles instead of shrinking their long side to max_dimension.
+        """
+        self.cache_size = cache_size
+        self.grayscale = grayscale
+        self.target_dpi = target_dpi
+        self.max_dimension = max_dimension
+        self.tile = tile
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.calls = 0  # Requests for OCR text
+        self.cache_hits = 0  # Requests answered from the cache
+        self.tesseract_calls = 0  # Requests that actually ran Tesseract
+        self.tesseract_seconds = 0.0  # Time spent inside Tesseract
+        self.preprocess_seconds = 0.0  # Time spent preprocessing images
+        self.pixels_saved = 0  # Pixels removed by downscaling
+        self.tile_count = 0  # Tiles OCR'd separately because their image was a long strip
+
+    def image_to_string(self, image, key_bytes: Optional[bytes] = None, timeout: Optional[float] = None) -> str:
+        """
+        Returns the text in an image, from the cache when the same image was seen before.
+
+        Args:
+            image (PIL.Image.Image or callable): The image, or a callable returning it, so that
+                decoding can be skipped on a cache hit.
+            key_bytes (bytes, optional): The encoded image bytes used as the cache key. Defaults to
+                the decoded pixel data.
+            timeout (float, optional): Seconds Tesseract may run in total; it is killed after that.
+
+        Returns:
+            str: The text extracted by Tesseract.
+
+        Raises:
+            TimeoutError: Tesseract ran out of time. Nothing is cached, so a later call with more time retries.
+        """
+        with self._lock:
+            self.calls += 1
+        if self.cache_size <= 0:
+            return self._run(self._load(image), timeout)
+        if key_bytes is None:
+            image = self._load(image)
+            key_bytes = image.mode.encode() + repr(image.size).encode() + image.tobytes()
+        key = hashlib.sha1(key_bytes).digest()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return self._cache[key]
+        text = self._run(self._load(image), timeout)
+        with self._lock:
+            self._cache[key] = text
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)  # Evict the least recently used result
+        return text
+
+    def _load(self, image):
+        return image() if callable(image) else image
+
+    def preprocess(self, image):
+        """
+        Applies the configured grayscale, DPI and size normalization to an image.
+
+        Args:
+            image (PIL.Image.Image): The image to prepare.
+
+        Returns:
+            PIL.Image.Image: The image to pass to Tesseract.
+        """
+        width, height = image.size
+        if self.grayscale and image.mode not in ('L', '1'):
+            image = image.convert('L')
+        scale = 1.0
+        dpi = image.info.get('dpi')
+        if self.target_dpi and dpi and dpi[0]:
+            scale = min(scale, self.target_dpi / float(dpi[0]))  # Only ever shrink high-DPI scans
+        # Long strips are tiled along their length (see tiles()), so only their short side has to fit
+        side = min(width, height) if self._is_strip(width, height) else max(width, height)
+        if self.max_dimension and side * scale > self.max_dimension:
+            scale = self.max_dimension / float(side)
+        if scale < 1.0:
+            new_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            from PIL import Image
+            image = image.resize(new_size, Image.LANCZOS)
+            with self._lock:
+                self.pixels_saved += width * height - new_size[0] * new_size[1]
+        return image
+
+    def _is_strip(self, width, height) -> bool:
+        return self.tile and max(width, height) > TILE_ASPECT * max(min(width, height), 1)
+
+    def tiles(self, image):
+        """
+        Splits a preprocessed long strip into overlapping tiles of at most max_dimension pixels along its length.
+
+        Args:
+            image (PIL.Image.Image): The preprocessed image.
+
+        Returns:
+            list: The image itself when it needs no tiling, otherwise its tiles in reading order.
+        """
+        width, height = image.size
+        if not self.max_dimension or max(width, height) <= self.max_dimension or not self._is_strip(width, height):
+            return [image]
+        length = max(width, height)
+        step = self.max_dimension - _TILE_OVERLAP
+        tiles = []
+        for start in range(0, length - _TILE_OVERLAP, step):
+            end = min(start + self.max_dimension, length)
+            tiles.append(image.crop((0, start, width, end) if height > width else (start, 0, end, height)))
+        return tiles
+
+    def _run(self, image, timeout: Optional[float] = None) -> str:
+        """
+        Preprocesses an image and runs Tesseract on it (tile by tile for long strips), recording the time spent.
+        """
+        start = time.perf_counter()
+        prepared = self.preprocess(image)
+        prepared_at = time.perf_counter()
+        expires = None if timeout is None else time.monotonic() + timeout
+        try:
+            texts = []
+            tiles = self.tiles(prepared)
+            for tile in tiles:
+                remaining = 0  # pytesseract's "no timeout"
+                if expires is not None:
+                    remaining = expires - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"Tesseract timed out after {timeout:g} seconds")
+                try:
+                    texts.append(pytesseract.image_to_string(tile, timeout=remaining))
+                except RuntimeError as e:
+                    if 'timeout' in str(e).lower():  # pytesseract killed the subprocess
+                        raise TimeoutError(f"Tesseract timed out after {timeout:g} seconds") from e
+                    raise
+            if len(tiles) > 1:
+                with self._lock:
+                    self.tile_count += len(tiles)
+            return '\n'.join(texts)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self.tesseract_calls += 1
+                self.preprocess_seconds += prepared_at - start
+                self.tesseract_seconds += finished - prepared_at
+
+    def stats(self) -> dict:
+        """
+        Returns the OCR counters.
+
+        Returns:
+            dict: Calls, cache hits, Tesseract calls, seconds spent, pixels saved by downscaling and tiles OCR'd.
+        """
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'cache_hits': self.cache_hits,
+                'tesseract_calls': self.tesseract_calls,
+                'tesseract_seconds': round(self.tesseract_seconds, 6),
+                'preprocess_seconds': round(self.preprocess_seconds, 6),
+                'pixels_saved': self.pixels_saved,
+                'tiles': self.tile_count,
+            }
@@ -0,0 +1,181 @@
+#Read-ahead I/O
+#Loads the bytes of upcoming files into a bounded pool of memory while earlier files are parsed
+import os
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+DEFAULT_DEPTH = 16  # Files read ahead at most
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # Bytes of prefetched files held in memory at once
+DEFAULT_MAX_FILE_BYTES = 64 * 1024 * 1024  # Larger files are left to the readers, which stream them
+_CHUNK_SIZE = 1024 * 1024  # Bytes per read call
+
+
+class LocalFilesystem:
+    """
+    Reads files with the operating system's calls. Where a Prefetcher or FileScanner gets file bytes from.
+    """
+    def read(self, path, limit: Optional[int] = None) -> bytes:
+        """
+        Returns the content of a file, or its first `limit` bytes.
+        """
+        with open(path, 'rb') as f:
+            return f.read() if limit is None else f.read(limit)
+
+    def size(self, path) -> int:
+        return os.path.getsize(path)
+
+
+class LatencyFilesystem(LocalFilesystem):
+    """
+    A local directory that behaves like a network share, for benchmarks and tests.
+
+    Every open, stat and read request waits `latency` seconds, as an SMB or NFS round trip would, and
+    reads are limited to `bandwidth` bytes per second. Requests are at most chunk_size bytes, like the
+    largest read an SMB client sends.
+    """
+    def __init__(self, latency: float = 0.005, bandwidth: Optional[float] = None, chunk_size: int = _CHUNK_SIZE):
+        """
+        Args:
+            latency (float): Seconds each request waits.
+            bandwidth (float, optional): Bytes per second per read. Defaults to unlimited.
+            chunk_size (int): Bytes per read request.
+        """
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.chunk_size = chunk_size
+
+    def read(self, path, limit: Optional[int] = None) -> bytes:
+        time.sleep(self.latency)  # Open
+        chunks = []
+        size = 0
+        with open(path, 'rb') as f:
+            while limit is None or size < limit:
+                chunk = f.read(self.chunk_size if limit is None else min(self.chunk_size, limit - size))
+                time.sleep(self.latency + (len(chunk) / self.bandwidth if self.bandwidth else 0.0))
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+        return b''.join(chunks)
+
+    def size(self, path) -> int:
+        time.sleep(self.latency)
+        return super().size(path)
+
+
+class PrefetchDeclined(Exception):
+    """
+    Raised by a prefetch whose file turned out too large for the buffers; the reader opens it instead.
+    """
+
+
+class Prefetcher:
+    """
+    Reads upcoming files on a pool of I/O threads, holding at most `depth` files and `max_bytes` in memory.
+
+    The ScanEngine asks for each file as it queues it, before the file reaches a worker; the bytes then
+    arrive while the workers are busy parsing earlier files, and readers parse from memory instead of
+    waiting on the network. When the pool is full, or a file is larger than max_file_bytes, load() declines
+    and the reader opens the file itself, so memory never exceeds the cap and nothing waits for room.
+    """
+    def __init__(self, depth: int = DEFAULT_DEPTH, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_file_bytes: int = DEFAULT_MAX_FILE_BYTES, filesystem=None, io_threads: Optional[int] = None):
+        """
+        Initializes the Prefetcher class.
+
+        Args:
+            depth (int): Files held (loading or loaded, not yet parsed) at once.
+            max_bytes (int): Bytes held at once.
+            max_file_bytes (int): Larger files are not prefetched.
+            filesystem (LocalFilesystem, optional): Where bytes are read from. Defaults to the local filesystem.
+            io_threads (int, optional): Concurrent reads. Defaults to depth, so every slot can be in flight.
+        """
+        self.depth = depth
+        self.max_bytes = max_bytes
+        self.max_file_bytes = min(max_file_bytes, max_bytes)
+        self.filesystem = filesystem or LocalFilesystem()
+        self.io_threads = io_threads or depth
+        self.held_files = 0
+        self.held_bytes = 0
+        self.loaded = 0  # Files read ahead
+        self.declined = 0  # Files left to the readers: too large, or no room
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def load(self, path, size: Optional[int] = None) -> Optional[Future]:
+        """
+        Starts reading a file if it fits.
+
+        Args:
+            path (str): The file.
+            size (int, optional): Its size, when the caller already has it (e.g. from the walker's stat).
+                Otherwise it is looked up on an I/O thread, so a slow stat does not hold up the caller.
+
+        Returns:
+            Future: Resolves to the file's bytes, or None when the file is not prefetched. The future fails
+                with the read error, or with PrefetchDeclined when the file turned out not to fit. Call
+                release(future) once the bytes are no longer needed, whatever the outcome.
+        """
+        with self._lock:
+            if self.held_files >= self.depth or (size is not None and not self._fits(size)):
+                self.declined += 1
+                return None
+            self.held_files += 1
+            if size is not None:
+                self.held_bytes += size
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.io_threads, thread_name_prefix='prefetch')
+        reserved = [size or 0]  # Bytes held for the file, filled in by _read when the size was not known
+        future = self._pool.submit(self._read, path, size, reserved)
+        future.reserved = reserved
+        return future
+
+    def _fits(self, size) -> bool:
+        return size <= self.max_file_bytes and self.held_bytes + size <= self.max_bytes
+
+    def _read(self, path, size, reserved) -> bytes:
+        """
+        Reads a file on an I/O thread, first reserving its bytes if its size was not known.
+        """
+        if size is None:
+            size = self.filesystem.size(path)
+            with self._lock:
+                if not self._fits(size):
+                    self.declined += 1
+                    raise PrefetchDeclined(f"{size} bytes do not fit in the prefetch buffers")
+                self.held_bytes += size
+                reserved[0] = size
+        data = self.filesystem.read(path)
+        with self._lock:
+            self.loaded += 1
+        return data
+
+    def release(self, future: Future):
+        """
+        Returns a file's slot and bytes to the pool.
+        """
+        with self._lock:
+            self.held_files -= 1
+            self.held_bytes -= future.reserved[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'loaded': self.loaded, 'declined': self.declined, 'held_files': self.held_files,
+                    'held_bytes': self.held_bytes}
+
+    def close(self):
+        """
+        Stops the I/O threads, dropping reads that have not started and waiting for the others (and their
+        callbacks) to finish. The prefetcher can be reused.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
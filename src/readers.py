@@ -0,0 +1,431 @@
+#Reader plugins
+#Maps file extensions (or sniffed file signatures) to the functions that extract their text
+import io
+import os
+import re
+import zipfile
+from contextlib import contextmanager
+from typing import Callable, Iterator, NamedTuple, Optional
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tiff', '.bmp')  # Read with OCR
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tgz', '.tbz2', '.txz', '.gz', '.bz2', '.xz')  # Opened by archives.iter_members
+_CHUNK_CHARS = 64 * 1024  # Text is yielded in chunks of about this size by the streaming plugins
+
+
+class MemberFile(io.BytesIO):
+    """
+    A file held in memory (e.g. an archive member), named by its display path such as
+    `archive.zip!inner/report.pdf`. Readers accept one wherever they accept a path.
+    """
+    def __init__(self, data: bytes, name: str):
+        super().__init__(data)
+        self.name = name
+
+
+def source_name(source) -> str:
+    """
+    Returns the path of a file given as a path or as an in-memory MemberFile.
+    """
+    return source.name if isinstance(source, MemberFile) else os.fspath(source)
+
+
+@contextmanager
+def open_source(source):
+    """
+    Opens a path for binary reading, or rewinds an in-memory MemberFile (which is left open).
+    """
+    if isinstance(source, MemberFile):
+        source.seek(0)
+        yield source
+        return
+    with open(source, 'rb') as file:
+        yield file
+
+
+def source_size(file) -> int:
+    """
+    Returns the size of an open binary file or buffer without moving its position.
+    """
+    if isinstance(file, io.BytesIO):
+        return file.getbuffer().nbytes
+    return os.fstat(file.fileno()).st_size
+
+
+class ReaderPlugin(NamedTuple):
+    """
+    A text extractor for one or more file types.
+
+    Plugins are plain functions taking the FileScanner (for its options, OCR engine, metrics and
+    logger) and the file, so they import their dependencies only when a file is actually read. The
+    file is a path or an in-memory MemberFile; open it with open_source.
+    """
+    name: str
+    iter_text: Callable  # (scanner, source) -> Iterator[str]: the text in pieces, see FileScanner.iter_text
+    read: Optional[Callable] = None  # (scanner, source) -> str. Defaults to joining iter_text
+    cpu_bound: bool = False  # Parsing or OCR heavy: the ScanEngine sends these files to its process pool
+    archive: bool = False  # A container: FileScanner.scan_file reports one record per member
+
+    def read_text(self, scanner, file_path) -> str:
+        if self.read is not None:
+            return self.read(scanner, file_path)
+        return ''.join(self.iter_text(scanner, file_path)).strip()
+
+
+class ReaderRegistry:
+    """
+    Looks up the ReaderPlugin for a file by extension, or by its leading bytes when the extension is unknown.
+    """
+    def __init__(self):
+        self._by_extension = {}
+        self._signatures = []  # (leading bytes, extension or callable(file_path) -> extension)
+
+    def register(self, plugin: ReaderPlugin, extensions, signatures=()):
+        """
+        Registers a plugin, replacing any plugin registered earlier for the same extensions.
+
+        Args:
+            plugin (ReaderPlugin): The reader.
+            extensions (iterable): Lowercase extensions including the dot, e.g. ['.html', '.htm'].
+            signatures (iterable): Leading bytes identifying the format, used when sniffing. Each maps to
+                the first of `extensions`.
+        """
+        extensions = [extension.lower() for extension in extensions]
+        for extension in extensions:
+            self._by_extension[extension] = plugin
+        for signature in signatures:
+            self._signatures.append((signature, extensions[0]))
+
+    def add_signature(self, signature: bytes, resolver):
+        """
+        Maps leading bytes to an extension, or to a callable that picks one (e.g. to tell zip-based formats apart).
+        """
+        self._signatures.append((signature, resolver))
+
+    def extensions(self) -> tuple:
+        """
+        Returns every registered extension, e.g. for the DirectoryWalker's extension filter.
+        """
+        return tuple(self._by_extension)
+
+    def get(self, extension) -> Optional[ReaderPlugin]:
+        return self._by_extension.get(extension.lower())
+
+    def sniff(self, file_path) -> Optional[str]:
+        """
+        Guesses the extension of a file from its first bytes.
+
+        Returns:
+            str: The matching registered extension, or None if no signature matches.
+        """
+        try:
+            with open_source(file_path) as file:
+                header = file.read(16)
+        except OSError:
+            return None
+        for signature, resolver in self._signatures:
+            if header.startswith(signature):
+                extension = resolver(file_path) if callable(resolver) else resolver
+                if extension is not None and extension in self._by_extension:
+                    return extension
+        return None
+
+    def for_path(self, file_path, sniff: bool = True) -> Optional[ReaderPlugin]:
+        """
+        Returns the plugin for a file, by extension first and then, if allowed, by sniffing its content.
+        """
+        plugin = self.get(os.path.splitext(source_name(file_path))[1])
+        if plugin is None and sniff:
+            extension = self.sniff(file_path)
+            plugin = self._by_extension.get(extension) if extension else None
+        return plugin
+
+
+REGISTRY = ReaderRegistry()  # The default registry used by every FileScanner
+
+
+def register_reader(extensions, signatures=(), cpu_bound=False, read=None, registry=None):
+    """
+    Decorator registering a function as the reader for some extensions.
+
+    Example:
+        @register_reader(['.rtf'])
+        def iter_rtf(scanner, file_path):
+            yield ...
+
+    Plugins must be registered when their module is imported, so worker processes (which import the
+    modules afresh when they are spawned) see them too.
+    """
+    def decorator(iter_text):
+        plugin = ReaderPlugin(iter_text.__name__, iter_text, read, cpu_bound)
+        (registry or REGISTRY).register(plugin, extensions, signatures)
+        return iter_text
+    return decorator
+
+
+# Built-in formats, implemented by FileScanner (its readers import their dependencies lazily)
+
+def _iter_image(scanner, file_path):
+    yield scanner._read_image(file_path)
+
+
+REGISTRY.register(ReaderPlugin('txt', lambda scanner, path: scanner._iter_txt(path),
+                               lambda scanner, path: scanner._read_txt(path)), ['.txt'])
+REGISTRY.register(ReaderPlugin('pdf', lambda scanner, path: scanner._iter_pdf(path),
+                               lambda scanner, path: scanner._read_pdf(path), cpu_bound=True),
+                  ['.pdf'], signatures=[b'%PDF-'])
+REGISTRY.register(ReaderPlugin('docx', lambda scanner, path: scanner._iter_docx(path),
+                               lambda scanner, path: scanner._read_docx(path)), ['.docx'])
+REGISTRY.register(ReaderPlugin('image', _iter_image, lambda scanner, path: scanner._read_image(path), cpu_bound=True),
+                  IMAGE_EXTENSIONS)
+for _signature, _extension in ((b'\x89PNG\r\n\x1a\n', '.png'), (b'\xff\xd8\xff', '.jpg'), (b'II*\x00', '.tiff'),
+                               (b'MM\x00*', '.tiff'), (b'BM', '.bmp')):
+    REGISTRY.add_signature(_signature, _extension)
+
+
+def _sniff_zip(file_path) -> Optional[str]:
+    """
+    Tells the zip-based Office formats apart by their main part.
+    """
+    try:
+        with open_source(file_path) as file, zipfile.ZipFile(file) as archive:
+            names = set(archive.namelist())
+    except (OSError, zipfile.BadZipFile):
+        return None
+    for part, extension in (('word/document.xml', '.docx'), ('xl/workbook.xml', '.xlsx'),
+                            ('ppt/presentation.xml', '.pptx')):
+        if part in names:
+            return extension
+    return '.zip'
+
+
+REGISTRY.add_signature(b'PK\x03\x04', _sniff_zip)
+REGISTRY.register(ReaderPlugin('archive', lambda scanner, path: scanner._iter_archive_text(path), cpu_bound=True,
+                               archive=True),
+                  ARCHIVE_EXTENSIONS)
+REGISTRY.add_signature(b'\x1f\x8b', '.gz')
+REGISTRY.add_signature(b'BZh', '.bz2')
+REGISTRY.add_signature(b'\xfd7zXZ\x00', '.xz')
+
+
+# Additional formats
+
+def _html_text_parser():
+    from html.parser import HTMLParser
+
+    class _TextParser(HTMLParser):
+        """
+        Collects the visible text of an HTML document, one line per block element.
+        """
+        _SKIP = {'script', 'style', 'head', 'noscript', 'template'}
+        _BLOCKS = {'p', 'div', 'br', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'title', 'table', 'section',
+                   'article', 'blockquote', 'pre'}
+
+        def __init__(self):
+            super().__init__(convert_charrefs=True)
+            self.pieces = []
+            self._skipping = 0
+
+        def handle_starttag(self, tag, attrs):
+            if tag in self._SKIP and tag != 'head':
+                self._skipping += 1
+            elif tag in self._BLOCKS:
+                self.pieces.append('\n')
+
+        def handle_endtag(self, tag):
+            if tag in self._SKIP and tag != 'head':
+                self._skipping = max(0, self._skipping - 1)
+            elif tag in self._BLOCKS:
+                self.pieces.append('\n')
+
+        def handle_data(self, data):
+            if not self._skipping:
+                self.pieces.append(data)
+
+        def take(self) -> str:
+            text = ''.join(self.pieces)
+            self.pieces.clear()
+            return text
+
+    return _TextParser()
+
+
+def html_to_text(html: str) -> str:
+    """
+    Returns the visible text of an HTML string.
+    """
+    parser = _html_text_parser()
+    parser.feed(html)
+    parser.close()
+    return parser.take()
+
+
+@register_reader(['.html', '.htm'], signatures=[b'<!DOCTYPE html', b'<!doctype html', b'<html'])
+def iter_html(scanner, file_path) -> Iterator[str]:
+    """
+    Streams the visible text of an HTML file (UTF-8, invalid bytes replaced), skipping scripts and styles.
+    """
+    import codecs
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    parser = _html_text_parser()
+    with open_source(file_path) as file:
+        while True:
+            data = file.read(scanner.chunk_size)
+            parser.feed(decoder.decode(data, final=not data))
+            text = parser.take()
+            if text:
+                yield text
+            if not data:
+                break
+    parser.close()
+    text = parser.take()
+    if text:
+        yield text
+
+
+@register_reader(['.eml'])
+def iter_eml(scanner, file_path) -> Iterator[str]:
+    """
+    Yields the headers and the text parts of an email (HTML parts converted to text). Attachments are
+    listed by name but not read.
+    """
+    from email import policy
+    from email.parser import BytesParser
+    with open_source(file_path) as file:
+        message = BytesParser(policy=policy.default).parse(file)
+    headers = [f"{name}: {message[name]}" for name in ('Subject', 'From', 'To', 'Cc') if message[name]]
+    yield '\n'.join(headers) + '\n'
+    for part in message.walk():
+        if part.is_multipart():
+            continue
+        if part.get_content_disposition() == 'attachment':
+            if part.get_filename():
+                yield f"\nAttachment: {part.get_filename()}\n"
+            continue
+        content_type = part.get_content_type()
+        if content_type not in ('text/plain', 'text/html'):
+            continue
+        yield ''  # More parts follow
+        try:
+            content = part.get_content()
+        except (LookupError, UnicodeDecodeError) as e:  # Unknown or wrong charset
+            scanner.logger.warning(f"Cannot decode a part of {source_name(file_path)}: {str(e)}")
+            continue
+        yield '\n' + (html_to_text(content) if content_type == 'text/html' else content)
+
+
+def _iter_ooxml_text(stream, text_tag, paragraph_tag, clear_tag) -> Iterator[str]:
+    """
+    Streams the text of an Office Open XML part: the contents of `text_tag` elements, one line per
+    `paragraph_tag`. Finished `clear_tag` elements are discarded to keep memory flat.
+    """
+    from xml.etree import ElementTree
+    pieces = []
+    size = 0
+    for _, element in ElementTree.iterparse(stream):
+        if element.tag == text_tag:
+            pieces.append(element.text or '')
+            size += len(pieces[-1])
+        elif element.tag == paragraph_tag:
+            pieces.append('\n')
+        if element.tag == clear_tag:
+            element.clear()
+            if size >= _CHUNK_CHARS:
+                yield ''.join(pieces)
+                pieces.clear()
+                size = 0
+    if pieces:
+        yield ''.join(pieces)
+
+
+def _numbered_parts(names, pattern):
+    """
+    Returns the zip members matching pattern (with one numeric group), in numeric order.
+    """
+    matches = [(int(found.group(1)), name) for name in names for found in [re.fullmatch(pattern, name)] if found]
+    return [name for _, name in sorted(matches)]
+
+
+_DRAWING = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+_SHEET = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+
+def _checked_zip(scanner, archive):
+    """
+    Wraps a document's zip so its parts are decompressed within the scanner's ArchiveLimits.
+    """
+    try:
+        from .archives import CheckedZip
+    except ImportError:  # Running with src/ on sys.path (CLI and tests)
+        from archives import CheckedZip
+    return CheckedZip(archive, scanner.archive_limits)
+
+
+@register_reader(['.pptx'])
+def iter_pptx(scanner, file_path) -> Iterator[str]:
+    """
+    Streams the text of each slide of a PowerPoint file, in slide order.
+    """
+    with open_source(file_path) as file, zipfile.ZipFile(file) as archive:
+        parts = _checked_zip(scanner, archive)
+        for index, part in enumerate(_numbered_parts(archive.namelist(), r'ppt/slides/slide(\d+)\.xml')):
+            if index:
+                yield ''  # More slides follow
+            with parts.open(part) as stream:
+                yield from _iter_ooxml_text(stream, _DRAWING + 't', _DRAWING + 'p', _DRAWING + 'p')
+
+
+@register_reader(['.xlsx'])
+def iter_xlsx(scanner, file_path) -> Iterator[str]:
+    """
+    Streams the cell values of each worksheet of an Excel file, one line per row with tab-separated cells.
+    """
+    from xml.etree import ElementTree
+    with open_source(file_path) as file, zipfile.ZipFile(file) as archive:
+        parts = _checked_zip(scanner, archive)
+        names = archive.namelist()
+        shared = []  # The workbook's shared string table, referenced by index from the cells
+        if 'xl/sharedStrings.xml' in names:
+            with parts.open('xl/sharedStrings.xml') as stream:
+                for _, element in ElementTree.iterparse(stream):
+                    if element.tag == _SHEET + 'si':
+                        shared.append(''.join(text.text or '' for text in element.iter(_SHEET + 't')))
+                        element.clear()
+        for index, part in enumerate(_numbered_parts(names, r'xl/worksheets/sheet(\d+)\.xml')):
+            if index:
+                yield ''  # More sheets follow
+            with parts.open(part) as stream:
+                yield from _iter_sheet_rows(stream, shared)
+
+
+def _iter_sheet_rows(stream, shared) -> Iterator[str]:
+    from xml.etree import ElementTree
+    pieces = []
+    size = 0
+    for _, element in ElementTree.iterparse(stream):
+        if element.tag != _SHEET + 'row':
+            continue
+        cells = []
+        for cell in element.iter(_SHEET + 'c'):
+            cell_type = cell.get('t')
+            if cell_type == 'inlineStr':
+                cells.append(''.join(text.text or '' for text in cell.iter(_SHEET + 't')))
+                continue
+            value = cell.find(_SHEET + 'v')
+            if value is None or value.text is None:
+                continue
+            if cell_type == 's':
+                index = int(value.text)
+                cells.append(shared[index] if index < len(shared) else '')
+            else:
+                cells.append(value.text)
+        element.clear()
+        if cells:
+            line = '\t'.join(cells) + '\n'
+            pieces.append(line)
+            size += len(line)
+            if size >= _CHUNK_CHARS:
+                yield ''.join(pieces)
+                pieces.clear()
+                size = 0
+    if pieces:
+        yield ''.join(pieces)
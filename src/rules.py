@@ -0,0 +1,228 @@
+#Rule set loading and hot reload
+#Compiles each version of the rules once, caches the compiled form on disk and swaps in new versions atomically
+import os
+import sys
+import json
+import time
+import marshal
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Dict, NamedTuple, Optional
+
+try:
+    from .keyword_matcher import KeywordMatcher
+except ImportError:  # Running with src/ on sys.path (CLI and tests)
+    from keyword_matcher import KeywordMatcher
+
+_CACHE_FORMAT = 3  # Bumped when KeywordMatcher.compiled_state changes shape
+_CACHE_KEEP = 16  # Compiled rule sets kept in the cache directory (most recently written)
+DEFAULT_CHECK_INTERVAL = 1.0  # Seconds between checks of the rules file for changes
+RULES_CACHE_ENV = 'LABEL_AUTOMATION_RULES_CACHE'  # Overrides default_rules_cache_dir (e.g. for tests)
+
+logger = logging.getLogger(__name__)
+
+
+def default_rules_path() -> str:
+    """
+    Returns the path of the bundled config/rules.json.
+    """
+    return os.path.join(os.path.dirname(__file__), '..', 'config', 'rules.json')
+
+
+def default_rules_cache_dir() -> str:
+    """
+    Returns the default location of compiled rule sets: $LABEL_AUTOMATION_RULES_CACHE if set, otherwise a
+    directory in the user's home.
+    """
+    return os.environ.get(RULES_CACHE_ENV) or os.path.join(os.path.expanduser('~'), '.label_automation', 'rules_cache')
+
+
+def rules_version(source: bytes) -> str:
+    """
+    Returns the version of a rules file: the first 16 hex digits of the SHA-256 of its bytes.
+    """
+    return hashlib.sha256(source).hexdigest()[:16]
+
+
+class RuleSet(NamedTuple):
+    """
+    One version of the rules, compiled. Never modified, so a scan can keep using it while newer versions load.
+    """
+    version: str  # Identifies the rules that produced a result
+    rules: Dict[str, object]  # The parsed rules file
+    matcher: KeywordMatcher
+    path: str  # The rules file it was loaded from
+    source: bytes  # The file's bytes, so worker processes can load exactly this version
+
+
+def _cache_file(cache_dir, version) -> str:
+    # marshal's format is only stable within one Python version
+    return os.path.join(cache_dir, f"{version}.v{_CACHE_FORMAT}.{sys.implementation.cache_tag}.marshal")
+
+
+def _load_cached(cache_dir, version) -> Optional[tuple]:
+    try:
+        with open(_cache_file(cache_dir, version), 'rb') as f:
+            rules, state = marshal.load(f)
+        return rules, KeywordMatcher.from_compiled_state(state)
+    except FileNotFoundError:
+        return None
+    except Exception as e:  # A corrupt or stale entry is rebuilt
+        logger.warning(f"Ignoring compiled rules cache entry {version}: {str(e)}")
+        return None
+
+
+def _store_cached(cache_dir, version, rules, matcher):
+    """
+    Writes a compiled rule set to a temporary file and renames it into place, so readers never see a partial file.
+    """
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                marshal.dump((rules, matcher.compiled_state()), f)
+            os.replace(temp_path, _cache_file(cache_dir, version))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        entries = sorted((entry for entry in os.scandir(cache_dir) if entry.name.endswith('.marshal')),
+                         key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in entries[_CACHE_KEEP:]:
+            os.unlink(entry.path)
+    except OSError as e:  # The cache only saves time; a read-only home directory must not stop a scan
+        logger.warning(f"Could not cache compiled rules {version}: {str(e)}")
+
+
+def load_rule_set(path=None, source: Optional[bytes] = None, cache_dir=None) -> RuleSet:
+    """
+    Compiles a rules file, or loads its compiled form from the cache when this version was compiled before.
+
+    Args:
+        path (str, optional): The rules file. Defaults to config/rules.json.
+        source (bytes, optional): The file's bytes, when already read (e.g. passed to a worker process).
+        cache_dir (str, optional): Where compiled rule sets are kept. Defaults to default_rules_cache_dir();
+            pass False to disable the cache.
+
+    Returns:
+        RuleSet: The compiled rules.
+    """
+    path = path or default_rules_path()
+    if source is None:
+        with open(path, 'rb') as f:
+            source = f.read()
+    version = rules_version(source)
+    cache_dir = default_rules_cache_dir() if cache_dir is None else cache_dir
+    cached = _load_cached(cache_dir, version) if cache_dir else None
+    if cached is not None:
+        rules, matcher = cached
+    else:
+        rules = json.loads(source.decode('utf-8'))
+        matcher = KeywordMatcher(rules)  # Compile every keyword once for single-pass matching
+        if cache_dir:
+            _store_cached(cache_dir, version, rules, matcher)
+    return RuleSet(version, rules, matcher, path, source)
+
+
+class RulesManager:
+    """
+    Keeps the current RuleSet of a rules file and reloads it when the file changes.
+
+    The file's size and modification time are checked at most once per `check_interval` seconds; when they
+    change and the content hash differs, the new version is compiled (or loaded from the compiled cache) and
+    replaces the current one in a single assignment. Callers take `current` once per scan and keep that
+    RuleSet, so scans already running finish on the version they started with. A rules file that fails to
+    load keeps the previous version in use.
+    """
+    def __init__(self, path=None, cache_dir=None, check_interval: float = DEFAULT_CHECK_INTERVAL):
+        """
+        Loads the rules.
+
+        Args:
+            path (str, optional): The rules file. Defaults to config/rules.json.
+            cache_dir (str, optional): Where compiled rule sets are kept (see load_rule_set).
+            check_interval (float): Minimum seconds between checks of the file. 0 checks on every access.
+        """
+        self.path = path or default_rules_path()
+        self.cache_dir = cache_dir
+        self.check_interval = check_interval
+        self._lock = threading.Lock()  # One reload at a time
+        self._stat_key = self._stat()
+        self._current = load_rule_set(self.path, cache_dir=cache_dir)
+        self._checked = time.monotonic()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    @property
+    def current(self) -> RuleSet:
+        """
+        The newest RuleSet, reloaded first if the file changed.
+        """
+        if time.monotonic() - self._checked >= self.check_interval:
+            self.reload()
+        return self._current
+
+    @property
+    def version(self) -> str:
+        return self.current.version
+
+    def latest(self) -> RuleSet:
+        """
+        Like `current`, but checks the file now instead of waiting for the check interval (one stat call).
+        """
+        self.reload()
+        return self._current
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Loads the rules file again if it changed.
+
+        Args:
+            force (bool): Re-read the file even if its size and modification time are unchanged.
+
+        Returns:
+            bool: True if a new version was loaded.
+        """
+        with self._lock:
+            self._checked = time.monotonic()
+            stat_key = self._stat()
+            if stat_key is None or (stat_key == self._stat_key and not force):
+                return False
+            try:
+                with open(self.path, 'rb') as f:
+                    source = f.read()
+                if rules_version(source) == self._current.version:  # Touched or rewritten with the same content
+                    self._stat_key = stat_key
+                    return False
+                rule_set = load_rule_set(self.path, source, self.cache_dir)
+            except Exception as e:  # Half-written or invalid JSON: keep scanning with the previous rules
+                logger.error(f"Could not reload rules from {self.path}: {str(e)}")
+                return False
+            self._stat_key = stat_key
+            self._current = rule_set
+        logger.info(f"Loaded rules version {rule_set.version} from {self.path}")
+        return True
+
+
+_managers = {}  # Shared RulesManager per rules file, see get_manager
+_managers_lock = threading.Lock()
+
+
+def get_manager(path=None) -> RulesManager:
+    """
+    Returns the process-wide RulesManager of a rules file, so every analyzer of the same file shares one
+    compiled copy of the rules.
+    """
+    key = os.path.abspath(path or default_rules_path())
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = RulesManager(path)
+        return manager
@@ -0,0 +1,285 @@
+#Persistent cache of scan results
+#Lets rescans skip reading and OCR for files that have not changed
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import NamedTuple, Optional, Tuple
+
+try:
+    from .file_scanner import ScanRecord
+except ImportError:  # Running with src/ on sys.path (CLI and tests)
+    from file_scanner import ScanRecord
+
+DEFAULT_MAX_BYTES = 1024 ** 3  # Cap on the total size of cached text (1 GiB)
+_COMMIT_EVERY = 500  # Writes are committed (and the cap enforced) in batches of this size
+
+
+def default_cache_path() -> str:
+    """
+    Returns the default location of the cache database in the user's home directory.
+    """
+    return os.path.join(os.path.expanduser('~'), '.label_automation', 'scan_cache.sqlite')
+
+
+def hash_file(file_path, chunk_size=1024 * 1024) -> str:
+    """
+    Computes the SHA-256 hash of a file's bytes.
+
+    Args:
+        file_path (str): The path to the file.
+        chunk_size (int): The number of bytes read at a time.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CacheEntry(NamedTuple):
+    """
+    A cached scan result.
+    """
+    content: Optional[str]  # The extracted text
+    sensitivity: Optional[str]  # The level, or None if it was computed with a different rules version
+    truncated: bool = False  # True when content is only a prefix of the file's text
+
+
+class ScanCache:
+    """
+    SQLite cache of extracted text and sensitivity levels, keyed by path and file metadata.
+
+    An entry is valid while the file's (size, mtime_ns, inode) are unchanged, so checking an unchanged
+    file costs a single stat call. With `verify_hash` enabled, a file whose metadata changed but whose
+    bytes did not (e.g. touched or copied back) is recognised by its SHA-256 instead of being re-read.
+    Entries store the rules version that produced the level: when the rules change, the cached text is
+    kept and only the (cheap) analysis needs to run again. They also store the scanner options that shape
+    the text (FileScanner.options_key), and an entry made with other options is a miss.
+    """
+    def __init__(self, db_path=None, max_bytes: int = DEFAULT_MAX_BYTES, max_entries: Optional[int] = None,
+                 verify_hash: bool = False):
+        """
+        Opens (or creates) the cache database.
+
+        Args:
+            db_path (str, optional): The database file. Defaults to default_cache_path().
+            max_bytes (int): Least recently used entries are evicted once the cached text exceeds this size.
+            max_entries (int, optional): Least recently used entries are evicted above this many entries.
+            verify_hash (bool): Store content hashes and use them when file metadata has changed.
+        """
+        self.db_path = db_path or default_cache_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.verify_hash = verify_hash
+        self.hits = 0
+        self.misses = 0
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._pending_writes = 0
+        self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS scan_cache ('
+            ' path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, content_hash TEXT,'
+            ' rules_version TEXT, content TEXT, sensitivity TEXT, content_bytes INTEGER, last_used REAL,'
+            ' truncated INTEGER DEFAULT 0, options TEXT)')
+        columns = {row[1] for row in self._connection.execute('PRAGMA table_info(scan_cache)')}
+        if 'truncated' not in columns:  # Databases created before truncated text was tracked
+            self._connection.execute('ALTER TABLE scan_cache ADD COLUMN truncated INTEGER DEFAULT 0')
+        if 'options' not in columns:  # Databases created before scan options were tracked; their entries miss
+            self._connection.execute('ALTER TABLE scan_cache ADD COLUMN options TEXT')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS scan_cache_last_used ON scan_cache (last_used)')
+        self._connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def lookup(self, file_path, rules_version, stat=None, options=None) -> Optional[CacheEntry]:
+        """
+        Returns the cached result for a file if the file is unchanged and was scanned with the same options.
+
+        Args:
+            file_path (str): The path to the file.
+            rules_version (str): The version of the rules currently in use.
+            stat (os.stat_result, optional): The file's stat, if the caller already has it.
+            options (str, optional): The scanner's options_key.
+
+        Returns:
+            CacheEntry: The cached entry (sensitivity is None if the rules changed), or None on a miss.
+        """
+        try:
+            stat = stat or os.stat(file_path)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT size, mtime_ns, inode, content_hash, rules_version, content, sensitivity, truncated, options'
+                ' FROM scan_cache WHERE path = ?', (file_path,)).fetchone()
+            if row is None or row[8] != options:  # Text extracted with other options (e.g. without deep OCR)
+                self.misses += 1
+                return None
+            size, mtime_ns, inode, content_hash, cached_rules, content, sensitivity, truncated, _ = row
+            if (size, mtime_ns, inode) != (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+                if not (self.verify_hash and content_hash and size == stat.st_size
+                        and self._hash_or_none(file_path) == content_hash):
+                    self.misses += 1
+                    return None
+                # Same bytes under new metadata: refresh the key so the next lookup is a plain stat
+                self._connection.execute(
+                    'UPDATE scan_cache SET mtime_ns = ?, inode = ? WHERE path = ?',
+                    (stat.st_mtime_ns, stat.st_ino, file_path))
+            self._connection.execute('UPDATE scan_cache SET last_used = ? WHERE path = ?', (time.time(), file_path))
+            self._note_write()
+            self.hits += 1
+            return CacheEntry(content, sensitivity if cached_rules == rules_version else None, bool(truncated))
+
+    def store(self, file_path, rules_version, content, sensitivity, stat=None, truncated=False, options=None):
+        """
+        Caches the result of scanning a file.
+
+        Args:
+            file_path (str): The path to the file.
+            rules_version (str): The version of the rules that produced `sensitivity`.
+            content (str): The extracted text.
+            sensitivity (str): The sensitivity level.
+            stat (os.stat_result, optional): The file's stat taken before it was read.
+            truncated (bool): True when content is only a prefix of the file's text.
+            options (str, optional): The options_key of the scanner that extracted the text.
+        """
+        try:
+            stat = stat or os.stat(file_path)
+            content_hash = self._hash_or_none(file_path) if self.verify_hash else None
+        except OSError:
+            return
+        content_bytes = len(content.encode('utf-8')) if content else 0
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO scan_cache (path, size, mtime_ns, inode, content_hash, rules_version,'
+                ' content, sensitivity, content_bytes, last_used, truncated, options)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (file_path, stat.st_size, stat.st_mtime_ns, stat.st_ino, content_hash, rules_version,
+                 content, sensitivity, content_bytes, time.time(), int(truncated), options))
+            self._note_write()
+
+    def get_record(self, file_path, analyzer, stat=None,
+                   options=None) -> Tuple[Optional[ScanRecord], Optional[os.stat_result]]:
+        """
+        Builds a ScanRecord from the cache, re-analyzing the cached text if the rules have changed.
+
+        Args:
+            file_path (str): The path to the file.
+            analyzer (ContentAnalyzer): The analyzer whose rules version must match.
+            stat (os.stat_result, optional): The file's stat, if the caller already has it (e.g. from the walker).
+            options (str, optional): The options_key of the scanner the record is for.
+
+        Returns:
+            tuple: (record or None on a miss, the file's stat or None if it could not be read).
+        """
+        try:
+            stat = stat or os.stat(file_path)
+        except OSError:
+            return None, None
+        entry = self.lookup(file_path, analyzer.rules_version, stat, options)
+        if entry is None:
+            return None, stat
+        sensitivity = entry.sensitivity
+        if sensitivity is None and entry.content:
+            if entry.truncated:
+                return None, stat  # Only a prefix was cached, so the new rules need the whole file
+            sensitivity = analyzer.analyze_file(entry.content)  # Rules changed: reuse the text, redo the match
+            self.store(file_path, analyzer.rules_version, entry.content, sensitivity, stat, options=options)
+        return ScanRecord(file_path, entry.content, sensitivity, cached=True, truncated=entry.truncated,
+                          rules_version=analyzer.rules_version), stat
+
+    def put_record(self, record, rules_version, stat, options=None):
+        """
+        Caches a freshly scanned record. Records without content (unsupported or unreadable files) and
+        partial or skipped records are not cached.
+
+        Args:
+            record (ScanRecord): The record to cache.
+            rules_version (str): The version of the rules that produced the record.
+            stat (os.stat_result): The file's stat taken before it was read.
+            options (str, optional): The options_key of the scanner that produced the record.
+        """
+        if record.content is None or record.error is not None or record.status is not None or stat is None:
+            return  # Results cut short by a ScanBudget are retried, so a larger budget takes effect
+        self.store(record.path, rules_version, record.content, record.sensitivity, stat, record.truncated, options)
+
+    def _hash_or_none(self, file_path) -> Optional[str]:
+        try:
+            return hash_file(file_path)
+        except OSError as e:
+            self.logger.warning(f"Could not hash file {file_path}: {str(e)}")
+            return None
+
+    def _note_write(self):
+        """
+        Counts a write and commits/evicts once a batch is complete. Must be called with the lock held.
+        """
+        self._pending_writes += 1
+        if self._pending_writes >= _COMMIT_EVERY:
+            self._flush()
+
+    def _flush(self):
+        self._evict()
+        self._connection.commit()
+        self._pending_writes = 0
+
+    def _evict(self):
+        """
+        Deletes the least recently used entries until the cache is within its caps.
+        """
+        total_bytes, total_entries = self._connection.execute(
+            'SELECT COALESCE(SUM(content_bytes), 0), COUNT(*) FROM scan_cache').fetchone()
+        excess_entries = total_entries - self.max_entries if self.max_entries is not None else 0
+        excess_bytes = total_bytes - self.max_bytes if self.max_bytes is not None else 0
+        if excess_entries <= 0 and excess_bytes <= 0:
+            return
+        doomed = []
+        for path, content_bytes in self._connection.execute(
+                'SELECT path, content_bytes FROM scan_cache ORDER BY last_used'):
+            if excess_entries <= 0 and excess_bytes <= 0:
+                break
+            doomed.append((path,))
+            excess_entries -= 1
+            excess_bytes -= content_bytes
+        self._connection.executemany('DELETE FROM scan_cache WHERE path = ?', doomed)
+
+    def flush(self):
+        """
+        Commits pending writes and enforces the size caps.
+        """
+        with self._lock:
+            self._flush()
+
+    def clear(self):
+        """
+        Removes every entry from the cache.
+        """
+        with self._lock:
+            self._connection.execute('DELETE FROM scan_cache')
+            self._connection.commit()
+            self._pending_writes = 0
+
+    def close(self):
+        """
+        Flushes pending writes and closes the database.
+        """
+        with self._lock:
+            if self._connection is None:
+                return
+            self._flush()
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,443 @@
+#Parallel scan engine shared by the CLI and the GUI
+#Sends OCR/PDF work to a process pool and light reads to a thread pool
+import os
+import time
+import logging
+import threading
+import dataclasses
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, Optional
+
+try:
+    from .file_scanner import FileScanner, ScanRecord
+    from .content_analyzer import ContentAnalyzer
+    from .metrics import NULL_METRICS, ScanMetrics, file_type
+    from .budget import current_rss
+    from .rules import load_rule_set
+    from .walker import entry_stat
+    from .dedup import copies_of, find_duplicates
+    from .readers import MemberFile
+except ImportError:  # Running with src/ on sys.path (CLI and tests)
+    from file_scanner import FileScanner, ScanRecord
+    from content_analyzer import ContentAnalyzer
+    from metrics import NULL_METRICS, ScanMetrics, file_type
+    from budget import current_rss
+    from rules import load_rule_set
+    from walker import entry_stat
+    from dedup import copies_of, find_duplicates
+    from readers import MemberFile
+
+_worker_scanner = None  # Per-process FileScanner, created by _init_worker
+_worker_analyzer = None  # Per-process ContentAnalyzer, created by _init_worker
+
+
+def _init_worker(rules_path, scanner_options, collect_metrics=False, rules_source=None):
+    """
+    Initializes the scanner and analyzer once in each worker process.
+
+    Args:
+        rules_path (str): The rules file the analyzer should load.
+        scanner_options (dict): Keyword arguments for the worker's FileScanner.
+        collect_metrics (bool): Record metrics in the worker and send them back with each result.
+        rules_source (bytes, optional): The rules the engine is using, so the worker scores with the same
+            version even if the file changes meanwhile (the compiled form usually comes from the rules cache).
+    """
+    global _worker_scanner, _worker_analyzer
+    _worker_scanner = FileScanner(metrics=ScanMetrics() if collect_metrics else None, **scanner_options)
+    _worker_analyzer = ContentAnalyzer(rule_set=load_rule_set(rules_path, rules_source))
+
+
+def _scan_in_worker(file_path, pool_generation=0):
+    """
+    Process pool entry point, using the objects created by _init_worker.
+
+    Args:
+        file_path (str or MemberFile): The file to scan, or its prefetched bytes.
+        pool_generation (int): Identifies the pool the worker belongs to, echoed back when it needs replacing.
+
+    Returns:
+        tuple: (the file's ScanRecord, the metrics it produced or None when metrics are disabled,
+            pool_generation if the worker's RSS is over the budget's max_worker_rss, otherwise None).
+    """
+    record = _worker_scanner.scan_file(file_path, _worker_analyzer)
+    limit = _worker_scanner.budget.max_worker_rss
+    rss = current_rss() if limit is not None else None
+    recycle = pool_generation if rss is not None and rss > limit else None
+    metrics = _worker_scanner.metrics
+    if not metrics.enabled:
+        return record, None, recycle
+    snapshot = metrics.snapshot()
+    metrics.reset()  # Each result carries only its own file's metrics
+    return record, snapshot, recycle
+
+
+class ScanEngine:
+    """
+    Reads and analyzes files in parallel while yielding results in input order.
+
+    PDFs and images (readers registered as cpu_bound) go to a process pool so Tesseract and PDF
+    parsing use every core, while text and DOCX files, which are dominated by I/O, go to a thread pool. At most `max_pending` files are
+    in flight at once, so arbitrarily large inputs are consumed lazily with bounded memory.
+
+    Each scan picks up the newest version of the rules file when it starts and uses it for every file it
+    scans, so editing the rules takes effect on the next scan without a restart while running scans finish
+    on the version they started with. Every record carries the rules_version that produced it.
+
+    With a Prefetcher, the bytes of queued files are read ahead on I/O threads while the workers parse
+    earlier files, and each file is handed to its worker only once its bytes are in memory, so workers
+    spend their time parsing rather than waiting on slow storage.
+    """
+    def __init__(self, rules_path=None, process_workers: Optional[int] = None,
+                 thread_workers: Optional[int] = None, max_pending: Optional[int] = None, cache=None,
+                 max_bytes: Optional[int] = None, deep_ocr: bool = False, walker=None, metrics=None,
+                 archive_limits=None, budget=None, rule_set=None, dedup: bool = False, filesystem=None,
+                 prefetch=None):
+        """
+        Initializes the ScanEngine class.
+
+        Args:
+            rules_path (str, optional): The rules file to use. Defaults to config/rules.json.
+            process_workers (int, optional): Size of the OCR/PDF process pool. Defaults to the CPU count.
+                Use 0 to read those files in the thread pool instead.
+            thread_workers (int, optional): Size of the text/DOCX thread pool. Defaults to 4.
+            max_pending (int, optional): Maximum number of files in flight. Defaults to 4x the total worker count,
+                or the prefetch depth if that is larger, so the prefetcher can read ahead as far as it is allowed.
+            cache (ScanCache, optional): Unchanged files are answered from the cache without being read.
+            max_bytes (int, optional): Stop reading a text file after this many bytes.
+            deep_ocr (bool): OCR every PDF page, not only pages without a usable text layer.
+            walker (DirectoryWalker, optional): Filters used by scan_directory. Defaults to supported file types.
+            metrics (ScanMetrics, optional): Collects per-stage timings and counters from every worker.
+                Defaults to NULL_METRICS (disabled).
+            archive_limits (ArchiveLimits, optional): Nesting, size and compression ratio bounds for archives.
+            budget (ScanBudget, optional): Bytes, pages, pixels and time allowed per file, and the RSS after
+                which a worker process is replaced.
+            rule_set (RuleSet, optional): Scan with this version of the rules and never reload them, e.g. the
+                version a distributed scan was planned with.
+            dedup (bool): Read only one copy of files with identical bytes and copy its result to the others.
+                The whole input is listed before the first file is read (see scan_paths).
+            filesystem (LocalFilesystem, optional): Workers read each file whole through this and parse it from
+                memory (see FileScanner). Must be picklable, since worker processes get a copy.
+            prefetch (Prefetcher, optional): Reads the bytes of queued files ahead, within its memory cap. Files
+                it has no room for are read by the workers as usual. Closed with the engine.
+        """
+        self._scanner_options = {'max_bytes': max_bytes, 'deep_ocr': deep_ocr, 'archive_limits': archive_limits,
+                                 'budget': budget, 'filesystem': filesystem}  # Shared with the worker processes
+        self.metrics = metrics or NULL_METRICS
+        self.scanner = FileScanner(walker=walker, metrics=self.metrics, **self._scanner_options)
+        self.analyzer = ContentAnalyzer(rules_path, rule_set=rule_set)
+        self._pinned_rules = rule_set is not None
+        self.rules_path = self.analyzer.rules_path
+        self.process_workers = (os.cpu_count() or 1) if process_workers is None else process_workers
+        self.thread_workers = thread_workers or 4
+        self.max_pending = max_pending or max(4 * (self.process_workers + self.thread_workers),
+                                              prefetch.depth if prefetch is not None else 0)
+        self.cache = cache
+        self.logger = logging.getLogger(__name__)
+        self._thread_pool = None
+        self._process_pool = None
+        self._pool_generation = 0  # Incremented each time the process pool is replaced
+        self._pool_lock = threading.Lock()  # Prefetch threads also submit files to the pools
+        self.prefetch = prefetch
+        self.dedup = dedup
+        self.duplicate_groups = []  # The DuplicateGroups found by the last scan with dedup
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Shuts down the worker pools. The engine can be reused; pools are recreated on demand.
+        """
+        if self.prefetch is not None:
+            self.prefetch.close()  # First, so no read still in flight hands its file to a pool afterwards
+        with self._pool_lock:
+            if self._thread_pool is not None:
+                self._thread_pool.shutdown(cancel_futures=True)
+                self._thread_pool = None
+            if self._process_pool is not None:
+                self._process_pool.shutdown(cancel_futures=True)
+                self._process_pool = None
+        if self.cache is not None:
+            self.cache.flush()
+
+    def _refresh_rules(self) -> ContentAnalyzer:
+        """
+        Switches to the newest version of the rules file, if it changed since the last scan.
+
+        The process pool is replaced so new workers load the new version; the old pool is shut down
+        without waiting, letting the files already sent to it finish on the old rules. An engine created
+        with a rule_set keeps it.
+        """
+        if self._pinned_rules:
+            return self.analyzer
+        analyzer = self.analyzer.reloaded()
+        if analyzer is not self.analyzer:
+            self.logger.info(f"Rules changed: scanning with version {analyzer.rules_version} "
+                             f"(was {self.analyzer.rules_version})")
+            self.analyzer = analyzer
+            self._replace_process_pool()
+        return analyzer
+
+    def _replace_process_pool(self):
+        """
+        Retires the process pool; a new one is started for the next file. Files already sent to the old
+        pool finish there, and its workers exit once they are done.
+        """
+        with self._pool_lock:
+            self._retire_process_pool()
+
+    def _retire_process_pool(self):
+        """
+        The body of _replace_process_pool, for callers already holding the pool lock.
+        """
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False)
+            self._process_pool = None
+        self._pool_generation += 1
+
+    def _replace_broken_pool(self, generation):
+        """
+        Retires the process pool after one of its workers died, unless it was already replaced meanwhile.
+        """
+        with self._pool_lock:
+            if generation == self._pool_generation:
+                self._retire_process_pool()
+
+    def _submit(self, item, analyzer):
+        """
+        Submits one file to the pool that suits its type, or answers it from the cache.
+
+        Args:
+            item (str or WalkEntry): The file; a WalkEntry's cached stat is reused for the cache lookup.
+            analyzer (ContentAnalyzer): The analyzer of the scan the file belongs to.
+
+        Returns:
+            tuple: (a future resolving to the file's ScanRecord, the file's stat when it must be cached).
+        """
+        file_path = os.fspath(item)
+        stat = None
+        if self.cache is not None:
+            started = time.perf_counter()
+            record, stat = self.cache.get_record(file_path, analyzer, entry_stat(item), self.scanner.options_key)
+            if self.metrics.enabled:
+                kind = file_type(file_path)
+                self.metrics.add_time('cache', kind, time.perf_counter() - started)
+                if record is not None:
+                    self.metrics.count('cache_hits', kind)
+                    self.metrics.count('files', kind)
+            if record is not None:
+                future = Future()
+                future.set_result(record)
+                return future, None
+        plugin = self.scanner.registry.for_path(file_path, sniff=False)
+        cpu_bound = plugin is not None and plugin.cpu_bound and self.process_workers > 0  # PDF parsing and Tesseract OCR
+        if self.prefetch is not None and plugin is not None:
+            known = stat or entry_stat(item)
+            loaded = self.prefetch.load(file_path, known.st_size if known is not None else None)
+            if loaded is not None:
+                self.metrics.count('prefetched', file_type(file_path))
+                future = Future()
+                loaded.add_done_callback(lambda loaded: self._scan_loaded(loaded, file_path, cpu_bound, analyzer,
+                                                                          future))
+                return future, stat
+        return self._submit_scan(file_path, cpu_bound, analyzer), stat
+
+    def _submit_scan(self, source, cpu_bound, analyzer) -> Future:
+        """
+        Sends a file (a path or its prefetched bytes) to the process pool or the thread pool, starting it on first use.
+        """
+        with self._pool_lock:
+            if cpu_bound:
+                try:
+                    future = self._submit_to_process_pool(source, analyzer)
+                except BrokenProcessPool:  # A worker died since the last result was collected
+                    self._retire_process_pool()
+                    future = self._submit_to_process_pool(source, analyzer)
+                future.pool_generation = self._pool_generation  # What _result retries the file with
+                future.analyzer = analyzer
+                return future
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(max_workers=self.thread_workers)
+            return self._thread_pool.submit(self.scanner.scan_file, source, analyzer)
+
+    def _submit_to_process_pool(self, source, analyzer) -> Future:
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers,
+                                                     initializer=_init_worker,
+                                                     initargs=(self.rules_path, self._scanner_options,
+                                                               self.metrics.enabled, analyzer.rule_set.source))
+        return self._process_pool.submit(_scan_in_worker, source, self._pool_generation)
+
+    def _scan_loaded(self, loaded, file_path, cpu_bound, analyzer, future):
+        """
+        Hands a file to a worker once the prefetcher has read it, on the I/O thread that read it.
+
+        The prefetched bytes stay reserved until the worker is done with them. If the read failed, the worker
+        is given the path instead and reports the error as it would without prefetching.
+        """
+        if not future.set_running_or_notify_cancel():  # The scan stopped before the file was read
+            self.prefetch.release(loaded)
+            return
+        held = True
+        try:
+            source = MemberFile(loaded.result(), file_path)
+        except Exception:  # Unreadable, or too large once its size was known
+            self.prefetch.release(loaded)
+            held = False
+            source = file_path
+        try:
+            scan = self._submit_scan(source, cpu_bound, analyzer)
+        except Exception as e:  # The engine was closed meanwhile
+            if held:
+                self.prefetch.release(loaded)
+            future.set_exception(e)
+            return
+
+        def done(scan):
+            if held:
+                self.prefetch.release(loaded)
+            if cpu_bound:
+                future.pool_generation, future.analyzer = scan.pool_generation, scan.analyzer
+            try:
+                future.set_result(scan.result())
+            except BaseException as e:
+                future.set_exception(e)
+        scan.add_done_callback(done)
+
+    def _scan_isolated(self, file_path, analyzer) -> Future:
+        """
+        Scans one file in a worker process of its own, so no other file can take it down. Returns the done future.
+        """
+        future = Future()
+        try:
+            with ProcessPoolExecutor(max_workers=1, initializer=_init_worker,
+                                     initargs=(self.rules_path, self._scanner_options, self.metrics.enabled,
+                                               analyzer.rule_set.source)) as pool:
+                future.set_result(pool.submit(_scan_in_worker, file_path).result())
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _result(self, file_path, future, stat, retry: bool = True) -> ScanRecord:
+        """
+        Waits for a submitted file, caches fresh results and converts worker failures into error records.
+
+        When a worker process dies (e.g. killed by the OS for running out of memory), its pool fails every
+        file it had. The pool is replaced and each of those files is retried once in a worker of its own, so
+        only a file that kills its worker again gets an error record.
+        """
+        try:
+            record = future.result()
+        except BrokenProcessPool as e:
+            if not retry:  # It killed the worker it had to itself
+                self.logger.error(f"Error scanning file {file_path}: the worker process died twice ({str(e)})")
+                self.metrics.count('errors', file_type(file_path))
+                return ScanRecord(file_path, None, None, error=f"worker process died: {str(e)}")
+            self._replace_broken_pool(future.pool_generation)
+            self.logger.warning(f"A worker process died while {file_path} was in flight; retrying it")
+            self.metrics.count('worker_crashes', file_type(file_path))
+            return self._result(file_path, self._scan_isolated(file_path, future.analyzer), stat, retry=False)
+        except Exception as e:
+            self.logger.error(f"Error scanning file {file_path}: {str(e)}")
+            self.metrics.count('errors', file_type(file_path))
+            return ScanRecord(file_path, None, None, error=str(e))
+        if isinstance(record, tuple):  # From a worker process, with the metrics it recorded
+            record, snapshot, recycle = record
+            if snapshot is not None:
+                self.metrics.merge(snapshot)
+            if recycle is not None and recycle == self._pool_generation:  # Not already replaced for another file
+                self.logger.info(f"Replacing the worker processes: RSS grew past "
+                                 f"{self.scanner.budget.max_worker_rss} bytes while scanning {file_path}")
+                self.metrics.count('worker_recycles', file_type(file_path))
+                self._replace_process_pool()
+        if stat is not None:
+            self.cache.put_record(record, record.rules_version, stat, self.scanner.options_key)
+        return record
+
+    def scan_paths(self, paths: Iterable[str]) -> Iterator[ScanRecord]:
+        """
+        Scans the given files in parallel.
+
+        With dedup enabled, the paths are all listed and grouped into copies of identical files first, so
+        memory grows with the number of paths; then only the first copy of each group is read and the
+        other copies get its result, with duplicate_of set. Without dedup, paths are consumed lazily.
+
+        Args:
+            paths (iterable): File paths (or WalkEntry objects) to scan.
+
+        Yields:
+            ScanRecord: One record per path, in the same order as the input.
+        """
+        pending = deque()
+        analyzer = self._refresh_rules()  # One version of the rules for the whole scan
+        copies, originals = {}, {}
+        if self.dedup:
+            paths = list(paths)
+            started = time.perf_counter()
+            self.duplicate_groups = find_duplicates(paths, metrics=self.metrics)
+            self.metrics.add_time('dedup', '', time.perf_counter() - started)
+            copies, originals = copies_of(self.duplicate_groups)
+        shared = {}  # Path of a scanned copy -> [its record, copies still waiting for it]
+        try:
+            for item in paths:
+                if len(pending) >= self.max_pending:
+                    yield self._next(pending, originals, shared)  # Backpressure: wait for the oldest file first
+                file_path = os.fspath(item)
+                if file_path in copies:
+                    pending.append((file_path, None, copies[file_path]))  # Answered by the earlier copy
+                else:
+                    pending.append((file_path, *self._submit(item, analyzer)))
+            while pending:
+                yield self._next(pending, originals, shared)
+        finally:
+            for _, future, _ in pending:  # The consumer stopped early: drop work that has not started
+                if future is not None:
+                    future.cancel()
+
+    def _next(self, pending, originals, shared) -> ScanRecord:
+        """
+        Returns the record of the oldest pending file, copying it from the scanned copy for a duplicate.
+        """
+        file_path, future, extra = pending.popleft()
+        if future is not None:
+            record = self._result(file_path, future, extra)
+            if file_path in originals:
+                shared[file_path] = [record, originals[file_path]]
+            return record
+        original = extra  # The copies of a file always come after it, so its record is already in shared
+        entry = shared[original]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del shared[original]
+        self.metrics.count('duplicates', file_type(file_path))
+        return self._copy_record(entry[0], file_path)
+
+    def _copy_record(self, record, file_path) -> ScanRecord:
+        """
+        Returns the record of an identical file for another path. Nothing was read for it, so it has no timings.
+        """
+        members = None
+        if record.members is not None:  # Archive members are named after the archive
+            members = [dataclasses.replace(member, path=file_path + member.path[len(record.path):],
+                                           duplicate_of=member.path) for member in record.members]
+        return dataclasses.replace(record, path=file_path, duplicate_of=record.path, members=members,
+                                   read_seconds=None, match_seconds=None, progress=None)
+
+    def scan_directory(self, path, estimate_progress=False, skip=None) -> Iterator[ScanRecord]:
+        """
+        Recursively scans a directory in parallel, streaming records as they complete.
+
+        Args:
+            path (str): The path to the directory to scan.
+            estimate_progress (bool): Fill in ScanRecord.progress with an estimate.
+            skip (container, optional): Paths to leave out, e.g. files already done before a resumed scan.
+
+        Yields:
+            ScanRecord: One record per file, in walk order.
+        """
+        return self.scanner.iter_scan(path, engine=self, estimate_progress=estimate_progress, skip=skip)
@@ -0,0 +1,450 @@
+#Result sinks and scan history
+#Writes scan records in batches to SQLite, CSV or Parquet, and answers questions about past runs
+import os
+import csv
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Iterable, List, NamedTuple, Optional, Sequence
+
+try:
+    from .lazy_import import LazyModule
+except ImportError:  # Running with src/ on sys.path (CLI and tests)
+    from lazy_import import LazyModule
+
+pyarrow = LazyModule('pyarrow')  # Only needed for Parquet output
+parquet = LazyModule('pyarrow.parquet')
+
+DEFAULT_BATCH_SIZE = 1000  # Records buffered before a sink writes them
+FIELDS = ('path', 'sensitivity', 'score', 'confidence', 'matches', 'terms', 'error', 'status', 'reason', 'cached',
+          'truncated', 'chars', 'read_ms', 'match_ms', 'rules_version', 'duplicate_of')  # Columns of every sink
+_TYPES = ('string', 'string', 'float64', 'float64', 'int64', 'string', 'string', 'string', 'string', 'bool', 'bool',
+          'int64', 'float64', 'float64', 'string', 'string')  # Parquet type of each field
+_SQL_TYPES = {'string': 'TEXT', 'float64': 'REAL', 'int64': 'INTEGER', 'bool': 'INTEGER'}
+
+
+def default_results_path() -> str:
+    """
+    Returns the default location of the results database in the user's home directory.
+    """
+    return os.path.join(os.path.expanduser('~'), '.label_automation', 'results.sqlite')
+
+
+def record_values(record) -> tuple:
+    """
+    Converts a ScanRecord into the values of FIELDS. Paths are made absolute, so history queries by path work
+    whatever directory a scan was started from. Matched terms are a JSON object of term counts.
+    """
+    analysis = record.analysis
+    path = record.path
+    return (
+        path if os.path.isabs(path) else os.path.abspath(path),
+        record.sensitivity,
+        round(analysis.score, 3) if analysis is not None else None,
+        round(analysis.confidence, 3) if analysis is not None else None,
+        analysis.total_matches if analysis is not None else None,
+        json.dumps(analysis.terms, ensure_ascii=False) if analysis is not None else None,
+        record.error,
+        record.status,
+        record.reason,
+        record.cached,
+        record.truncated,
+        len(record.content) if record.content is not None else None,
+        round(record.read_seconds * 1000, 3) if record.read_seconds is not None else None,
+        round(record.match_seconds * 1000, 3) if record.match_seconds is not None else None,
+        record.rules_version,
+        record.duplicate_of,
+    )
+
+
+class ResultSink:
+    """
+    Buffers records and hands them to _write_batch in batches, so the cost per record is a tuple append.
+
+    Subclasses implement _write_batch and, if they hold resources, _close. Sinks are thread-safe, so the
+    GUI's UI thread and a scan thread can share one.
+    """
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.written = 0  # Records handed to _write_batch so far
+        self.logger = logging.getLogger(__name__)
+        self._rows = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, record):
+        """
+        Adds a ScanRecord; it is written with the next full batch, or by flush().
+        """
+        row = record_values(record)
+        with self._lock:
+            self._rows.append(row)
+            if len(self._rows) >= self.batch_size:
+                self._flush()
+
+    def write_many(self, records: Iterable):
+        for record in records:
+            self.write(record)
+
+    def write_deletion(self, path):
+        """
+        Records that a delta run found a file deleted. Sinks without a history of runs ignore it.
+        """
+
+    def _flush(self):
+        if self._rows:
+            self._write_batch(self._rows)
+            self.written += len(self._rows)
+            self._rows = []
+
+    def flush(self):
+        """
+        Writes the buffered records.
+        """
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """
+        Writes the buffered records and releases the sink.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._flush()
+            self._close()
+            self._closed = True
+
+    def _write_batch(self, rows: List[tuple]):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+
+def _open_database(db_path) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    connection = sqlite3.connect(db_path, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode=WAL')  # Readers (queries, the GUI) never block the writer
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.execute(
+        'CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, started REAL, finished REAL, roots TEXT,'
+        ' files INTEGER, delta INTEGER NOT NULL DEFAULT 0)')
+    if 'delta' not in [row[1] for row in connection.execute('PRAGMA table_info(runs)')]:  # Written before delta runs
+        connection.execute('ALTER TABLE runs ADD COLUMN delta INTEGER NOT NULL DEFAULT 0')
+    connection.execute('CREATE TABLE IF NOT EXISTS deletions (run INTEGER, path TEXT, PRIMARY KEY (path, run))')
+    columns = ', '.join(f"{name} {_SQL_TYPES[kind]}" for name, kind in zip(FIELDS, _TYPES))
+    connection.execute(f"CREATE TABLE IF NOT EXISTS results (run INTEGER, {columns}, PRIMARY KEY (path, run))")
+    connection.execute('CREATE INDEX IF NOT EXISTS results_run ON results (run, sensitivity)')
+    connection.commit()
+    return connection
+
+
+class SqliteSink(ResultSink):
+    """
+    Appends one run of results to a SQLite database that keeps every run, see ResultHistory for queries.
+
+    Each batch is one executemany in one transaction; with WAL and synchronous=NORMAL a commit does not
+    wait for the disk, so writing costs far less than scanning.
+    """
+    def __init__(self, db_path=None, roots: Sequence[str] = (), batch_size: int = DEFAULT_BATCH_SIZE,
+                 delta: bool = False):
+        """
+        Opens (or creates) the database and starts a run.
+
+        Args:
+            db_path (str, optional): The database file. Defaults to default_results_path().
+            roots (sequence): The directories the run scans, so later runs can tell deleted files from unscanned ones.
+            batch_size (int): Records per transaction.
+            delta (bool): The run only writes the files that changed (--delta, --watch), so a file under its
+                roots without a result is unchanged rather than deleted; deletions are recorded with write_deletion.
+        """
+        super().__init__(batch_size)
+        self.db_path = db_path or default_results_path()
+        self._connection = _open_database(self.db_path)
+        self.run = self._connection.execute(
+            'INSERT INTO runs (started, roots, files, delta) VALUES (?, ?, 0, ?)',
+            (time.time(), json.dumps([os.path.abspath(root) for root in roots]), int(delta))).lastrowid
+        self._connection.commit()
+        self._insert = (f"INSERT OR REPLACE INTO results (run, {', '.join(FIELDS)})"
+                        f" VALUES ({', '.join('?' * (len(FIELDS) + 1))})")
+
+    def _write_batch(self, rows):
+        run = (self.run,)
+        self._connection.executemany(self._insert, [run + row for row in rows])
+        self._connection.execute('UPDATE runs SET files = files + ? WHERE id = ?', (len(rows), self.run))
+        self._connection.commit()
+
+    def write_deletion(self, path):
+        with self._lock:
+            self._connection.execute('INSERT OR REPLACE INTO deletions (run, path) VALUES (?, ?)',
+                                     (self.run, os.path.abspath(path)))
+            self._connection.commit()
+
+    def _close(self):
+        self._connection.execute('UPDATE runs SET finished = ? WHERE id = ?', (time.time(), self.run))
+        self._connection.commit()
+        self._connection.close()
+
+
+class CsvSink(ResultSink):
+    """
+    Writes results to a CSV file with a header of FIELDS.
+    """
+    def __init__(self, path, batch_size: int = DEFAULT_BATCH_SIZE):
+        super().__init__(batch_size)
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(FIELDS)
+
+    def _write_batch(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class ParquetSink(ResultSink):
+    """
+    Writes results to a Parquet file, one row group per batch. Needs pyarrow.
+    """
+    def __init__(self, path, batch_size: int = 64 * 1024):
+        """
+        Args:
+            path (str): The Parquet file.
+            batch_size (int): Records per row group; Parquet compresses and scans better with large groups.
+
+        Raises:
+            ImportError: pyarrow is not installed.
+        """
+        super().__init__(batch_size)
+        try:
+            self.schema = pyarrow.schema([(name, getattr(pyarrow, kind)()) for name, kind in zip(FIELDS, _TYPES)])
+        except ImportError as e:
+            raise ImportError("Parquet output needs pyarrow (pip install pyarrow)") from e
+        self.path = path
+        self._writer = parquet.ParquetWriter(path, self.schema)
+
+    def _write_batch(self, rows):
+        columns = [list(column) for column in zip(*rows)]
+        self._writer.write_table(pyarrow.Table.from_arrays(columns, schema=self.schema))
+
+    def _close(self):
+        self._writer.close()
+
+
+def open_sink(path, roots: Sequence[str] = (), delta: bool = False) -> ResultSink:
+    """
+    Returns the sink for a path by its extension: .csv, .parquet, or SQLite for anything else (.sqlite, .db).
+    delta marks a run that only writes changed files (see SqliteSink).
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return CsvSink(path)
+    if extension == '.parquet':
+        return ParquetSink(path)
+    return SqliteSink(path, roots, delta=delta)
+
+
+class Run(NamedTuple):
+    """
+    One scan recorded by a SqliteSink.
+    """
+    id: int
+    started: float  # Unix time
+    finished: Optional[float]  # None while running, or if the scan crashed
+    roots: List[str]
+    files: int  # Records written
+    delta: bool  # Only changed files were written (--delta, --watch)
+
+
+class StoredResult(NamedTuple):
+    """
+    A file's result as recorded in a run.
+    """
+    run: int
+    path: str
+    sensitivity: Optional[str]
+    score: Optional[float]
+    confidence: Optional[float]
+    matches: Optional[int]  # Keyword and pattern matches found
+    terms: Optional[str]  # JSON object of matched terms and their counts
+    error: Optional[str]
+    status: Optional[str]
+    reason: Optional[str]
+    cached: bool
+    truncated: bool
+    chars: Optional[int]
+    read_ms: Optional[float]
+    match_ms: Optional[float]
+    rules_version: Optional[str]
+    duplicate_of: Optional[str]
+
+
+class LevelChange(NamedTuple):
+    """
+    A file whose level differs from its previous run.
+    """
+    path: str
+    old_level: Optional[str]  # None for files the earlier runs never saw
+    new_level: Optional[str]  # None for files deleted since (only for paths under the run's roots)
+    run: int  # The run that found the new level; for a deleted file, the last run that saw it
+
+
+_COLUMNS = 'run, ' + ', '.join(FIELDS)
+
+
+def _stored(row) -> StoredResult:
+    values = list(row)
+    values[10] = bool(values[10])  # cached
+    values[11] = bool(values[11])  # truncated
+    return StoredResult(*values)
+
+
+def _under(path, alias='') -> tuple:
+    """
+    Returns a WHERE clause and its parameters matching `path` and everything below it. Uses a range on the
+    path index instead of LIKE, which SQLite cannot serve from an index.
+    """
+    path = os.path.abspath(path).rstrip(os.sep) or os.sep
+    column = f"{alias}path"
+    prefix = path if path.endswith(os.sep) else path + os.sep
+    return (f"({column} = ? OR ({column} >= ? AND {column} < ?))",
+            (path, prefix, prefix[:-1] + chr(ord(os.sep) + 1)))
+
+
+class ResultHistory:
+    """
+    Queries over every run a SqliteSink recorded. Safe to use while a scan is writing.
+    """
+    def __init__(self, db_path=None):
+        self.db_path = db_path or default_results_path()
+        self._lock = threading.Lock()
+        self._connection = _open_database(self.db_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def runs(self) -> List[Run]:
+        """
+        Returns every run, oldest first.
+        """
+        with self._lock:
+            rows = self._connection.execute('SELECT id, started, finished, roots, files, delta FROM runs'
+                                            ' ORDER BY id').fetchall()
+        return [Run(run_id, started, finished, json.loads(roots), files, bool(delta))
+                for run_id, started, finished, roots, files, delta in rows]
+
+    def latest_run(self) -> Optional[int]:
+        with self._lock:
+            return self._connection.execute('SELECT MAX(id) FROM runs').fetchone()[0]
+
+    def files_at_level(self, level, under=None, run: Optional[int] = None) -> List[StoredResult]:
+        """
+        Returns the files with a sensitivity level, e.g. every "pii" file below a directory.
+
+        Args:
+            level (str): The sensitivity level.
+            under (str, optional): Only files at or below this path.
+            run (int, optional): Only this run. Defaults to each file's most recent result in any run, leaving
+                out files a later delta run recorded as deleted. Files that only vanished between full runs
+                are still included (see level_changes with include_deleted).
+
+        Returns:
+            list: StoredResult per file, ordered by path.
+        """
+        where = ['r.sensitivity = ?']
+        parameters = [level]
+        if under is not None:
+            clause, values = _under(under, 'r.')
+            where.append(clause)
+            parameters.extend(values)
+        if run is not None:
+            where.append('r.run = ?')
+            parameters.append(run)
+        else:
+            where.append('r.run = (SELECT MAX(run) FROM results WHERE path = r.path)')
+            where.append('NOT EXISTS (SELECT 1 FROM deletions d WHERE d.path = r.path AND d.run > r.run)')
+        query = (f"SELECT {', '.join('r.' + column for column in _COLUMNS.split(', '))} FROM results r"
+                 f" WHERE {' AND '.join(where)} ORDER BY r.path")
+        with self._lock:
+            return [_stored(row) for row in self._connection.execute(query, parameters)]
+
+    def file_history(self, path) -> List[StoredResult]:
+        """
+        Returns every recorded result of one file, oldest run first.
+        """
+        with self._lock:
+            rows = self._connection.execute(f"SELECT {_COLUMNS} FROM results WHERE path = ? ORDER BY run",
+                                            (os.path.abspath(path),)).fetchall()
+        return [_stored(row) for row in rows]
+
+    def level_changes(self, run: Optional[int] = None, include_new: bool = False,
+                      include_deleted: bool = False) -> List[LevelChange]:
+        """
+        Returns the files whose level in a run differs from their result in the run before it.
+
+        Each file is compared with its own most recent earlier result, so runs of different roots can be
+        mixed in one database.
+
+        Args:
+            run (int, optional): The run to compare. Defaults to the latest run.
+            include_new (bool): Also return files no earlier run recorded (old_level None).
+            include_deleted (bool): Also return files under the run's roots that earlier runs recorded but
+                this run did not (new_level None). For a delta run, which skips unchanged files, only the
+                deletions it recorded.
+
+        Returns:
+            list: LevelChange per file, ordered by path.
+        """
+        run = run if run is not None else self.latest_run()
+        if run is None:
+            return []
+        query = ('SELECT r.path, p.sensitivity, r.sensitivity, p.run FROM results r'
+                 ' LEFT JOIN results p ON p.path = r.path'
+                 ' AND p.run = (SELECT MAX(run) FROM results WHERE path = r.path AND run < r.run)'
+                 ' WHERE r.run = ? ORDER BY r.path')
+        changes = []
+        with self._lock:
+            for path, old_level, new_level, previous in self._connection.execute(query, (run,)):
+                if previous is None:
+                    if include_new:
+                        changes.append(LevelChange(path, None, new_level, run))
+                elif old_level != new_level:
+                    changes.append(LevelChange(path, old_level, new_level, run))
+            if include_deleted:
+                roots, delta = self._connection.execute('SELECT roots, delta FROM runs WHERE id = ?', (run,)).fetchone()
+                if delta:
+                    rows = self._connection.execute(
+                        'SELECT d.path, p.sensitivity, p.run FROM deletions d JOIN results p ON p.path = d.path'
+                        ' AND p.run = (SELECT MAX(run) FROM results WHERE path = d.path AND run < d.run)'
+                        ' WHERE d.run = ?', (run,)).fetchall()
+                    changes.extend(LevelChange(path, level, None, last_run) for path, level, last_run in rows)
+                for root in ([] if delta else json.loads(roots)):
+                    clause, values = _under(root, 'p.')
+                    rows = self._connection.execute(
+                        f"SELECT p.path, p.sensitivity, p.run FROM results p WHERE {clause} AND p.run < ?"
+                        f" AND p.run = (SELECT MAX(run) FROM results WHERE path = p.path)",
+                        values + (run,)).fetchall()  # Last seen before this run, and not by it
+                    changes.extend(LevelChange(path, level, None, last_run) for path, level, last_run in rows)
+                changes.sort(key=lambda change: change.path)
+        return changes
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
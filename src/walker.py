@@ -0,0 +1,205 @@
+#Fast directory enumeration
+#Walks a tree with os.scandir and filters files before they are opened
+import os
+import fnmatch
+import logging
+from typing import Iterable, Iterator, Optional
+
+DEFAULT_SKIP_DIRS = ('.git', '.hg', '.svn', 'node_modules', '__pycache__', '.venv', 'venv')  # Never descended into
+SYMLINK_POLICIES = ('skip', 'files', 'follow')
+
+
+class WalkEntry:
+    """
+    A file found by the DirectoryWalker.
+
+    Wraps the os.DirEntry so the stat data cached by os.scandir is reused instead of stat-ing again.
+    """
+    __slots__ = ('path', '_entry', '_follow', '_stat')
+
+    def __init__(self, entry: os.DirEntry, follow_symlinks: bool):
+        self.path = entry.path  # The path to the file
+        self._entry = entry
+        self._follow = follow_symlinks
+        self._stat = None
+
+    def stat(self) -> os.stat_result:
+        """
+        Returns the file's stat, computed at most once (free on Windows, where scandir already has it).
+        """
+        if self._stat is None:
+            self._stat = self._entry.stat(follow_symlinks=self._follow)
+        return self._stat
+
+    def __fspath__(self):
+        return self.path
+
+    def __repr__(self):
+        return f"WalkEntry({self.path!r})"
+
+
+class _PathEntry:
+    """
+    The parts of os.DirEntry the filters use, for a plain path.
+    """
+    __slots__ = ('name', 'path')
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+
+    def stat(self, follow_symlinks=True):
+        return os.stat(self.path, follow_symlinks=follow_symlinks)
+
+
+def entry_stat(item) -> Optional[os.stat_result]:
+    """
+    Returns the cached stat of a WalkEntry, or None for a plain path.
+    """
+    return item.stat() if isinstance(item, WalkEntry) else None
+
+
+class DirectoryWalker:
+    """
+    Enumerates files under a directory with os.scandir, applying every filter before a file is opened.
+
+    Directories are pruned as early as possible (skip list, exclude patterns, depth), and files are
+    filtered by extension first since that needs no system call at all. Size filters use the stat
+    data cached on the DirEntry. Files are yielded in a deterministic (sorted) order.
+    """
+    def __init__(self, extensions: Optional[Iterable[str]] = None, include: Optional[Iterable[str]] = None,
+                 exclude: Optional[Iterable[str]] = None, skip_dirs: Iterable[str] = DEFAULT_SKIP_DIRS,
+                 max_depth: Optional[int] = None, min_size: Optional[int] = None,
+                 max_size: Optional[int] = None, symlinks: str = 'files'):
+        """
+        Initializes the DirectoryWalker class.
+
+        Args:
+            extensions (iterable, optional): Lowercase extensions to keep (e.g. '.pdf'). Defaults to all files.
+            include (iterable, optional): Glob patterns; when given, only matching files are kept.
+            exclude (iterable, optional): Glob patterns for files and directories to leave out.
+            skip_dirs (iterable): Directory names that are never descended into.
+            max_depth (int, optional): How many directory levels below the root to descend (0 = root only).
+            min_size (int, optional): Skip files smaller than this many bytes.
+            max_size (int, optional): Skip files larger than this many bytes.
+            symlinks (str): 'skip' ignores symlinks, 'files' follows symlinked files but not directories
+                (like os.walk), 'follow' follows both, guarding against loops.
+
+        Patterns are matched against both the file name and the path relative to the root, using '/'
+        as separator, e.g. '*.log', 'archive/*' or '*/tmp/*'.
+        """
+        if symlinks not in SYMLINK_POLICIES:
+            raise ValueError(f"symlinks must be one of {SYMLINK_POLICIES}, not {symlinks!r}")
+        self.extensions = frozenset(ext.lower() for ext in extensions) if extensions is not None else None
+        self.include = tuple(include or ())
+        self.exclude = tuple(exclude or ())
+        self.skip_dirs = frozenset(skip_dirs)
+        self.max_depth = max_depth
+        self.min_size = min_size
+        self.max_size = max_size
+        self.symlinks = symlinks
+        self.logger = logging.getLogger(__name__)
+
+    def _matches(self, patterns, name, relative_path) -> bool:
+        return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative_path, pattern) for pattern in patterns)
+
+    def _keep_file(self, entry, relative_path: str) -> bool:
+        """
+        Applies the file filters, cheapest first.
+
+        Args:
+            entry: An os.DirEntry, or anything with a `name` and a DirEntry-like stat(follow_symlinks=...).
+            relative_path (str): The path relative to the root, with '/' as separator.
+        """
+        if self.extensions is not None and os.path.splitext(entry.name)[1].lower() not in self.extensions:
+            return False
+        if self.include and not self._matches(self.include, entry.name, relative_path):
+            return False
+        if self.exclude and self._matches(self.exclude, entry.name, relative_path):
+            return False
+        if self.min_size is not None or self.max_size is not None:
+            size = entry.stat(follow_symlinks=self.symlinks != 'skip').st_size
+            if self.min_size is not None and size < self.min_size:
+                return False
+            if self.max_size is not None and size > self.max_size:
+                return False
+        return True
+
+    def _keep_dir(self, entry, relative_path: str) -> bool:
+        if entry.name in self.skip_dirs:
+            return False
+        return not (self.exclude and self._matches(self.exclude, entry.name, relative_path))
+
+    def accepts(self, path, root) -> bool:
+        """
+        Returns True if walk(root) would yield the file at path, e.g. for paths reported by a file watcher.
+
+        Args:
+            path (str): The file, somewhere below root.
+            root (str): The directory the walk starts from.
+        """
+        relative = os.path.relpath(path, root)
+        if relative.startswith(os.pardir):
+            return False
+        parts = relative.split(os.sep)
+        if self.max_depth is not None and len(parts) - 1 > self.max_depth:
+            return False
+        for depth in range(1, len(parts)):
+            if not self._keep_dir(_PathEntry(parts[depth - 1], ''), '/'.join(parts[:depth])):
+                return False
+        try:
+            if self.symlinks == 'skip' and os.path.islink(path):
+                return False
+            if not os.path.isfile(path):
+                return False
+            return self._keep_file(_PathEntry(parts[-1], path), '/'.join(parts))
+        except OSError:
+            return False
+
+    def walk(self, root) -> Iterator[WalkEntry]:
+        """
+        Lazily yields the files under root that pass every filter.
+
+        Args:
+            root (str): The directory to walk.
+
+        Yields:
+            WalkEntry: One entry per kept file; files of a directory come before its subdirectories.
+        """
+        follow = self.symlinks != 'skip'
+        visited = set()  # (device, inode) of directories entered, to break symlink loops
+        if self.symlinks == 'follow':
+            try:
+                root_stat = os.stat(root)
+                visited.add((root_stat.st_dev, root_stat.st_ino))
+            except OSError:
+                pass
+        stack = [(root, '', 0)]
+        while stack:
+            directory, relative_dir, depth = stack.pop()
+            try:
+                with os.scandir(directory) as iterator:
+                    entries = sorted(iterator, key=lambda entry: entry.name)
+            except OSError as e:
+                self.logger.warning(f"Cannot list directory {directory}: {str(e)}")
+                continue
+            subdirectories = []
+            for entry in entries:
+                relative_path = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                try:
+                    is_symlink = entry.is_symlink()
+                    if is_symlink and self.symlinks == 'skip':
+                        continue
+                    if entry.is_dir(follow_symlinks=self.symlinks == 'follow'):
+                        if (self.max_depth is None or depth < self.max_depth) and self._keep_dir(entry, relative_path):
+                            if self.symlinks == 'follow':
+                                target = entry.stat()
+                                if (target.st_dev, target.st_ino) in visited:
+                                    continue  # Already walked: a symlink loop or a second link to the same tree
+                                visited.add((target.st_dev, target.st_ino))
+                            subdirectories.append((entry.path, relative_path, depth + 1))
+                    elif entry.is_file(follow_symlinks=follow) and self._keep_file(entry, relative_path):
+                        yield WalkEntry(entry, follow)
+                except OSError as e:
+                    self.logger.warning(f"Cannot inspect {entry.path}: {str(e)}")
+            stack.extend(reversed(subdirectories))  # Pop in sorted order
@@ -0,0 +1,175 @@
+#File system watcher
+#Follows changes below a directory with Linux inotify, without walking the tree
+import os
+import sys
+import errno
+import ctypes
+import ctypes.util
+import select
+import struct
+import logging
+from typing import NamedTuple, Optional
+
+try:
+    from .walker import DEFAULT_SKIP_DIRS
+except ImportError:  # Running with src/ on sys.path (CLI and tests)
+    from walker import DEFAULT_SKIP_DIRS
+
+# inotify(7) constants
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK if hasattr(os, 'O_NONBLOCK') else 0
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_ONLYDIR)
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+
+class WatchBatch(NamedTuple):
+    """
+    The changes reported by one InotifyWatcher.read call.
+    """
+    files: frozenset  # Files written, moved or deleted
+    directories: frozenset  # Directories created, moved or deleted (everything below them may have changed)
+    overflow: bool  # The kernel dropped events; the caller must rescan
+
+
+class InotifyWatcher:
+    """
+    Watches a directory tree with inotify (Linux only).
+
+    Every directory gets a watch; directories created later are added as they appear. Files are
+    reported when they are closed after writing (not on every write), moved or deleted.
+    """
+    def __init__(self, root, skip_dirs=DEFAULT_SKIP_DIRS):
+        """
+        Initializes the InotifyWatcher class and watches every directory below root.
+
+        Args:
+            root (str): The directory to watch.
+            skip_dirs (iterable): Directory names that are not watched.
+
+        Raises:
+            NotImplementedError: When inotify is not available (not Linux).
+            OSError: When inotify cannot be initialised.
+        """
+        if not sys.platform.startswith('linux'):
+            raise NotImplementedError("Watch mode needs inotify, which is only available on Linux")
+        self.root = os.path.abspath(root)
+        self.skip_dirs = frozenset(skip_dirs)
+        self.logger = logging.getLogger(__name__)
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self._paths = {}  # Watch descriptor -> directory
+        self._add_tree(self.root)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self._fd is not None and self._fd >= 0:
+            os.close(self._fd)
+            self._fd = None
+
+    def _add_watch(self, directory):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOSPC:
+                self.logger.warning(f"Cannot watch {directory}: inotify watch limit reached (fs.inotify.max_user_watches)")
+            elif error not in (errno.ENOENT, errno.ENOTDIR):  # Gone already
+                self.logger.warning(f"Cannot watch {directory}: {os.strerror(error)}")
+            return
+        self._paths[wd] = directory  # A moved directory keeps its descriptor, so this also updates its path
+
+    def _add_tree(self, directory):
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            self._add_watch(current)
+            try:
+                with os.scandir(current) as iterator:
+                    stack.extend(entry.path for entry in iterator
+                                 if entry.name not in self.skip_dirs and entry.is_dir(follow_symlinks=False))
+            except OSError:
+                pass
+
+    def _read_events(self):
+        """
+        Reads the events currently queued by the kernel.
+        """
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+            offset += _EVENT.size + length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def read(self, timeout: Optional[float] = None, debounce: float = 0.5) -> Optional[WatchBatch]:
+        """
+        Waits for changes and returns them once the tree has been quiet for `debounce` seconds.
+
+        Args:
+            timeout (float, optional): Seconds to wait for the first event. Defaults to waiting forever.
+            debounce (float): Quiet period that ends a batch, so a burst of writes is processed once.
+
+        Returns:
+            WatchBatch: The changes, or None if nothing happened before the timeout.
+        """
+        files, directories = set(), set()
+        overflow = False
+        wait = timeout
+        while True:
+            ready, _, _ = select.select([self._fd], [], [], wait)
+            if not ready:
+                break
+            for wd, mask, name in self._read_events():
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                if mask & IN_IGNORED:
+                    self._paths.pop(wd, None)  # The watched directory is gone
+                    continue
+                directory = self._paths.get(wd)
+                if directory is None:
+                    continue
+                if mask & IN_DELETE_SELF:
+                    directories.add(directory)
+                    continue
+                path = os.path.join(directory, name) if name else directory
+                if mask & IN_ISDIR:
+                    if name in self.skip_dirs:
+                        continue
+                    directories.add(path)
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        self._add_tree(path)  # Files created before the watch existed are found by walking it
+                elif mask & IN_CREATE:
+                    continue  # Wait for IN_CLOSE_WRITE, the file is still being written
+                else:
+                    files.add(path)
+            wait = debounce
+        if not (files or directories or overflow):
+            return None
+        return WatchBatch(frozenset(files), frozenset(directories), overflow)
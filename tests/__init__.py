@@ -0,0 +1,10 @@
+# Keep the compiled rules that analyzers cache out of the user's home directory while testing
+import os
+import atexit
+import shutil
+import tempfile
+
+if 'LABEL_AUTOMATION_RULES_CACHE' not in os.environ:
+    _rules_cache = tempfile.mkdtemp(prefix='label_automation_rules_')
+    os.environ['LABEL_AUTOMATION_RULES_CACHE'] = _rules_cache
+    atexit.register(shutil.rmtree, _rules_cache, ignore_errors=True)
@@ -0,0 +1,130 @@
+# Add src directory to sys.path so we can import the archives module
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from archives import ArchiveLimits, iter_members  # Import the archive traversal from the src directory
+from content_analyzer import ContentAnalyzer  # Scores the members
+from file_scanner import FileScanner  # Scans archives like any other file
+from scan_engine import ScanEngine  # Archives scanned in parallel
+
+import gzip  # To build compressed members
+import io  # To build archives in memory
+import json  # To create a temporary rules file
+import tarfile  # To build tar archives
+import tempfile  # For a throwaway directory tree
+import unittest  # Import unittest framework for testing
+import zipfile  # To build zip archives
+
+
+def zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def tar_gz_bytes(members):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+class TestArchives(unittest.TestCase):  # Define a test case class for archive scanning
+    def setUp(self):  # Setup runs before each test
+        self.temp_dir = tempfile.TemporaryDirectory()  # Temporary directory removed after each test
+        self.addCleanup(self.temp_dir.cleanup)
+        self.root = os.path.join(self.temp_dir.name, 'docs')
+        os.makedirs(self.root)
+        rules_path = os.path.join(self.temp_dir.name, 'rules.json')
+        with open(rules_path, 'w', encoding='utf-8') as f:
+            json.dump({"confidential": ["confidential"], "public": ["public"]}, f)
+        self.analyzer = ContentAnalyzer(rules_path)
+        self.rules_path = rules_path
+        self.scanner = FileScanner()
+
+    def write(self, name, data):
+        path = os.path.join(self.root, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_nested_members(self):  # Members are read from memory, nested archives included
+        inner = tar_gz_bytes({'deep/secret.txt': b'This is confidential.'})
+        path = self.write('bundle.zip', zip_bytes({'notes.txt': b'A public note.', 'inner.tar.gz': inner,
+                                                   'script.js': b'confidential', 'folder/': b''}))
+        record = self.scanner.scan_file(path, self.analyzer)
+        levels = {member.path: member.sensitivity for member in record.members}
+        self.assertEqual(levels, {path + '!notes.txt': 'public',
+                                  path + '!inner.tar.gz!deep/secret.txt': 'confidential'})  # .js has no reader
+        self.assertEqual(record.sensitivity, 'confidential')  # The archive takes its highest member level
+        self.assertIsNone(record.content)
+        self.assertEqual(os.listdir(self.root), ['bundle.zip'])  # Nothing was extracted to disk
+
+    def test_single_compressed_file(self):  # report.txt.gz is an archive with one member
+        path = self.write('report.txt.gz', gzip.compress(b'public figures'))
+        record = self.scanner.scan_file(path, self.analyzer)
+        self.assertEqual([(m.path, m.sensitivity) for m in record.members], [(path + '!report.txt', 'public')])
+
+    def test_zip_bomb(self):  # Members expanding far beyond their compressed size are skipped unread
+        data = zip_bytes({'zeros.txt': b'\0' * (4 * 1024 * 1024), 'ok.txt': b'public'})
+        limits = ArchiveLimits(ratio_floor=1024)
+        members = list(iter_members(self.write('bomb.zip', data), limits))
+        self.assertIsNone(members[0].file)
+        self.assertIn('zip bomb', members[0].error)
+        self.assertEqual(members[1].file.read(), b'public')
+
+    def test_lying_header(self):  # A member whose header understates its size is never unpacked past it
+        data = bytearray(zip_bytes({'big.txt': b'a' * 100_000}))
+        data[22:26] = (10).to_bytes(4, 'little')  # Uncompressed size in the local header
+        central = data.rfind(b'PK\x01\x02')
+        data[central + 24:central + 28] = (10).to_bytes(4, 'little')  # And in the central directory
+        limits = ArchiveLimits(ratio_floor=10, max_ratio=1000)
+        members = list(iter_members(self.write('liar.zip', bytes(data)), limits))
+        self.assertIsNone(members[0].file)  # Reading stops at the declared size and the CRC check fails
+        self.assertIn('CRC', members[0].error)
+
+    def test_limits(self):  # Depth, member size and total size limits
+        nested = zip_bytes({'level2.zip': zip_bytes({'deep.txt': b'public'})})
+        path = self.write('nested.zip', nested)
+        members = list(iter_members(path, ArchiveLimits(max_depth=1)))  # Only the outer archive is opened
+        self.assertEqual([m.path for m in members], [path + '!level2.zip'])
+        self.assertIn('nested deeper', members[0].error)
+        path = self.write('sizes.zip', zip_bytes({'a.txt': b'x' * 100, 'b.txt': b'y' * 100, 'c.txt': b'z' * 300}))
+        members = list(iter_members(path, ArchiveLimits(max_member_bytes=250, max_total_bytes=150)))
+        self.assertIsNotNone(members[0].file)
+        self.assertIn('archive limit', members[1].error)  # Only 50 bytes of the budget were left
+        self.assertIn('member limit', members[2].error)
+
+    def test_corrupt_archive(self):  # An unreadable archive is reported, not raised
+        path = self.write('broken.zip', b'PK\x03\x04 not really a zip')
+        record = self.scanner.scan_file(path, self.analyzer)
+        self.assertIsNotNone(record.error)
+        self.assertEqual(record.members, [])
+
+    def test_iter_scan(self):  # Directory scans report archive members before the archive, with or without an engine
+        path = self.write('bundle.zip', zip_bytes({'a.txt': b'public', 'b.txt': b'confidential'}))
+        self.write('plain.txt', b'public')
+        expected = [path + '!a.txt', path + '!b.txt', path, os.path.join(self.root, 'plain.txt')]
+        records = list(self.scanner.iter_scan(self.root, self.analyzer))
+        self.assertEqual(sorted(r.path for r in records), sorted(expected))
+        self.assertLess(records.index(next(r for r in records if r.path == path + '!b.txt')),
+                        records.index(next(r for r in records if r.path == path)))
+        engine = ScanEngine(self.rules_path, process_workers=0)
+        try:
+            paths = [record.path for record in engine.scan_directory(self.root)]
+        finally:
+            engine.close()
+        self.assertEqual(paths, [record.path for record in records])
+
+    def test_read_file(self):  # read_file returns the text of every member
+        path = self.write('bundle.zip', zip_bytes({'a.txt': b'first', 'b.txt': b'second'}))
+        self.assertEqual(self.scanner.read_file(path), 'first\nsecond')
+
+
+if __name__ == '__main__':
+    unittest.main()
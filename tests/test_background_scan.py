@@ -0,0 +1,71 @@
+# Add src directory to sys.path so we can import BackgroundScan
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from background_scan import BackgroundScan  # Import the BackgroundScan class from the src directory
+from scan_engine import ScanEngine  # The engine that does the scanning
+
+import time  # For polling like the GUI timer does
+import tempfile  # For a throwaway directory tree
+import unittest  # Import unittest framework for testing
+
+
+def drain_all(scan, timeout=10):  # Poll the scan like the GUI's root.after timer until it finishes
+    records = []
+    deadline = time.monotonic() + timeout
+    while not scan.finished and time.monotonic() < deadline:
+        records.extend(scan.drain(10))
+        time.sleep(0.01)
+    return records
+
+
+class TestBackgroundScan(unittest.TestCase):  # Define a test case class for BackgroundScan
+    def setUp(self):  # Setup runs before each test
+        self.temp_dir = tempfile.TemporaryDirectory()  # Temporary directory removed after each test
+        for index in range(30):
+            with open(os.path.join(self.temp_dir.name, f'file_{index:02d}.txt'), 'w', encoding='utf-8') as f:
+                f.write('public' if index % 2 else 'confidential')
+        self.engine = ScanEngine(process_workers=0)
+
+    def tearDown(self):  # Teardown runs after each test
+        self.engine.close()
+        self.temp_dir.cleanup()
+
+    def test_records_arrive_through_the_queue(self):  # Every file is delivered to the polling side
+        scan = BackgroundScan(self.engine, self.temp_dir.name)
+        scan.start()
+        records = drain_all(scan)
+        self.assertTrue(scan.finished)
+        self.assertEqual(len(records), 30)
+        self.assertEqual(scan.scanned, 30)
+        self.assertGreaterEqual(scan.progress, 0.99)
+        self.assertGreater(scan.files_per_second(), 0)
+
+    def test_pause_and_cancel(self):  # A paused scan makes no progress and can be cancelled
+        scan = BackgroundScan(self.engine, self.temp_dir.name, queue_size=5)
+        scan.pause()
+        scan.start()
+        time.sleep(0.2)
+        self.assertEqual(scan.scanned, 0)  # Nothing was produced while paused
+        scan.cancel()
+        records = drain_all(scan)
+        scan.join(timeout=5)
+        self.assertTrue(scan.finished)
+        self.assertTrue(scan.cancelled)
+        self.assertLess(len(records), 30)
+
+    def test_full_queue_keeps_records(self):  # A scan that ends while the UI is behind waits instead of dropping records
+        scan = BackgroundScan(self.engine, self.temp_dir.name, queue_size=30)
+        scan.start()
+        deadline = time.monotonic() + 10
+        while scan.scanned < 30 and time.monotonic() < deadline:  # Every record fits, but the sentinel does not
+            time.sleep(0.01)
+        time.sleep(0.3)  # Longer than a put timeout, so the sentinel would have pushed a record out
+        self.assertFalse(scan.finished)
+        records = drain_all(scan)
+        self.assertTrue(scan.finished)
+        self.assertEqual(sorted(os.path.basename(record.path) for record in records),
+                         [f'file_{index:02d}.txt' for index in range(30)])
+
+if __name__ == '__main__':  # Run the tests if this file is executed directly
+    unittest.main()  # Start the unittest test runner
@@ -0,0 +1,160 @@
+# Add src directory to sys.path so we can import the budget module
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from budget import ScanBudget, current_rss  # Import the per-file budgets from the src directory
+from content_analyzer import ContentAnalyzer  # Scores what was read within the budget
+from file_scanner import FileScanner  # Enforces the budgets
+from metrics import ScanMetrics  # Counts worker recycles
+from readers import ReaderPlugin, ReaderRegistry  # For a deliberately slow reader
+from scan_engine import ScanEngine  # Replaces workers over the RSS limit
+
+import io  # To encode sample images
+import json  # To create a temporary rules file
+import signal  # To kill a worker process mid-scan
+import multiprocessing  # Worker processes inherit the patched reader only when forked
+import tempfile  # For throwaway files
+import time  # For the slow reader
+import unittest  # Import unittest framework for testing
+from unittest import mock  # To stand in for Tesseract
+from fpdf import FPDF  # For creating sample PDF files
+from PIL import Image  # For creating sample images
+
+
+class TestBudget(unittest.TestCase):  # Define a test case class for per-file budgets
+    def setUp(self):  # Setup runs before each test
+        self.temp_dir = tempfile.TemporaryDirectory()  # Temporary directory removed after each test
+        self.addCleanup(self.temp_dir.cleanup)
+        self.rules_path = self.path('rules.json')
+        with open(self.rules_path, 'w', encoding='utf-8') as f:
+            json.dump({"confidential": ["confidential"], "public": ["public"]}, f)
+        self.analyzer = ContentAnalyzer(self.rules_path)
+
+    def path(self, name):
+        return os.path.join(self.temp_dir.name, name)
+
+    def write_pdf(self, name, pages):
+        pdf = FPDF()
+        pdf.set_font('Arial', size=12)
+        for text in pages:
+            pdf.add_page()
+            pdf.cell(200, 10, text, ln=True)
+        pdf.output(self.path(name))
+        return self.path(name)
+
+    def write_image(self, name, size, image_format):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, color=(255, 255, 255)).save(buffer, format=image_format)
+        with open(self.path(name), 'wb') as f:
+            f.write(buffer.getvalue())
+        return self.path(name)
+
+    def test_file_bytes(self):  # Text files are read up to the limit, other large files are skipped
+        with open(self.path('big.txt'), 'w', encoding='utf-8') as f:
+            f.write('public ' + 'x' * 1000 + ' confidential')
+        pdf = self.write_pdf('report.pdf', ['confidential'])
+        scanner = FileScanner(budget=ScanBudget(max_file_bytes=100))
+        record = scanner.scan_file(self.path('big.txt'), self.analyzer)
+        self.assertEqual((record.status, record.sensitivity), ('partial', 'public'))  # The end was never read
+        self.assertEqual(record.reason, "read the first 100 bytes")
+        self.assertTrue(record.truncated)
+        record = scanner.scan_file(pdf, self.analyzer)
+        self.assertEqual((record.status, record.sensitivity, record.content), ('skipped', None, None))
+        self.assertIn('byte file budget', record.reason)
+        self.assertIsNone(scanner.read_file(pdf))
+
+    def test_max_pages(self):  # Only the first pages of a long PDF are read
+        pdf = self.write_pdf('long.pdf', ['public page'] * 3 + ['confidential page'] * 2)
+        scanner = FileScanner(budget=ScanBudget(max_pages=3))
+        record = scanner.scan_file(pdf, self.analyzer)
+        self.assertEqual((record.status, record.reason), ('partial', 'read 3 of 5 pages'))
+        self.assertEqual(record.sensitivity, 'public')
+        self.assertNotIn('confidential', scanner.read_file(pdf))
+        self.assertIsNone(FileScanner().scan_file(pdf, self.analyzer).status)  # No budget, no limit
+
+    def test_timeout(self):  # A slow file stops at the next piece once its time is up
+        registry = ReaderRegistry()
+
+        def iter_slow(scanner, file_path):
+            for _ in range(50):
+                time.sleep(0.02)
+                yield 'public '
+
+        registry.register(ReaderPlugin('slow', iter_slow), ['.slow'])
+        with open(self.path('a.slow'), 'w') as f:
+            f.write('')
+        scanner = FileScanner(registry=registry, budget=ScanBudget(timeout=0.1))
+        started = time.monotonic()
+        record = scanner.scan_file(self.path('a.slow'), self.analyzer)
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual((record.status, record.reason), ('partial', 'timed out after 0.1 seconds'))
+        self.assertEqual(record.sensitivity, 'public')
+
+    def test_tesseract_timeout(self):  # Tesseract gets the time left and is killed when it runs out
+        image = self.write_image('scan.png', (50, 20), 'PNG')
+        scanner = FileScanner(budget=ScanBudget(timeout=5))
+        with mock.patch('ocr.pytesseract.image_to_string', side_effect=RuntimeError('Tesseract process timeout')) as tesseract:
+            record = scanner.scan_file(image, self.analyzer)
+        self.assertLessEqual(tesseract.call_args.kwargs['timeout'], 5)
+        self.assertEqual(record.status, 'skipped')
+        self.assertIn('Tesseract', record.reason)
+        self.assertEqual(scanner.ocr.stats()['tesseract_calls'], 1)
+
+    def test_image_pixels(self):  # Large images are downsampled; images too large to decode are skipped unread
+        png = self.write_image('big.png', (400, 400), 'PNG')  # 3.2x the budget: decoded, then reduced
+        jpeg = self.write_image('big.jpg', (400, 400), 'JPEG')
+        huge = self.write_image('huge.png', (1000, 1000), 'PNG')  # 20x the budget
+        metrics = ScanMetrics()
+        scanner = FileScanner(budget=ScanBudget(max_image_pixels=50_000), metrics=metrics)
+        with mock.patch('ocr.pytesseract.image_to_string', return_value='public') as tesseract:
+            record = scanner.scan_file(huge, self.analyzer)
+            self.assertEqual(record.status, 'skipped')
+            self.assertIn('pixel budget', record.reason)
+            self.assertEqual(tesseract.call_count, 0)  # Never decoded
+            self.assertEqual(metrics.summary()['all'].get('bytes_read', 0), 0)  # Rejected from the header alone
+            for path in (png, jpeg):
+                record = scanner.scan_file(path, self.analyzer)
+                self.assertIsNone(record.status)
+                self.assertEqual(record.sensitivity, 'public')
+                width, height = tesseract.call_args.args[0].size
+                self.assertLessEqual(width * height, 50_000)
+        self.assertEqual(tesseract.call_count, 2)
+
+    def test_worker_recycling(self):  # Workers over the RSS limit are replaced, and every file is still scanned
+        self.assertGreater(current_rss(), 0)
+        paths = [self.write_pdf(f'report{index}.pdf', ['public report']) for index in range(4)]
+        metrics = ScanMetrics()
+        with ScanEngine(self.rules_path, process_workers=1, max_pending=2, metrics=metrics,
+                        budget=ScanBudget(max_worker_rss=1)) as engine:
+            records = list(engine.scan_paths(paths))
+        self.assertEqual([record.sensitivity for record in records], ['public'] * 4)
+        self.assertGreaterEqual(metrics.summary()['all'].get('worker_recycles', 0), 2)
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == 'fork', "workers must inherit the patched reader")
+    def test_worker_death(self):  # A killed worker does not abort the scan; its files are retried once
+        paths = [self.write_pdf(f'report{index}.pdf', ['public report']) for index in range(8)]
+        paths.insert(3, self.write_pdf('crash_once.pdf', ['public report']))
+        paths.insert(6, self.write_pdf('crash_always.pdf', ['public report']))
+        read_pdf = FileScanner._iter_pdf
+
+        def killing_reader(scanner, file_path):  # Dies like a worker killed by the OS for running out of memory
+            name = os.path.basename(file_path)
+            marker = self.path(name + '.died')
+            if name.startswith('crash') and not (name == 'crash_once.pdf' and os.path.exists(marker)):
+                open(marker, 'w').close()
+                os.kill(os.getpid(), signal.SIGKILL)
+            return read_pdf(scanner, file_path)
+        metrics = ScanMetrics()
+        with mock.patch.object(FileScanner, '_iter_pdf', killing_reader), \
+                ScanEngine(self.rules_path, process_workers=2, max_pending=4, metrics=metrics) as engine:
+            records = list(engine.scan_paths(paths))
+        self.assertEqual([record.path for record in records], paths)
+        errors = [os.path.basename(record.path) for record in records if record.error is not None]
+        self.assertEqual(errors, ['crash_always.pdf'])
+        self.assertIn('worker process died', records[6].error)
+        self.assertEqual([record.sensitivity for record in records if record.error is None], ['public'] * 9)
+        self.assertGreaterEqual(metrics.summary()['all']['worker_crashes'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -39,6 +39,55 @@ class TestContentAnalyzer(unittest.TestCase):  # Define a test case class for Co
         result = self.analyzer.analyze_file(content)  # Analyze the content
         self.assertEqual(result, "public")  # Assert the result is 'public'
 
+    def test_find_matches(self):  # Test that every keyword is reported with its level and offset
+        content = "Credit card details are CONFIDENTIAL."  # Sample content
+        matches = self.analyzer.find_matches(content)  # Collect all keyword matches
+        self.assertEqual([(m.keyword, m.level, m.start) for m in matches],
+                         [("credit card", "pii", 0), ("confidential", "confidential", 24)])  # Assert levels and offsets
+
+    def test_analyze_many(self):  # Batches are scored in order, in this process or in workers
+        contents = ["Confidential memo", "SSN: 123", "Public notice", "Nothing here"] * 10  # Sample contents
+        expected = ["confidential", "pii", "public", "unknown"] * 10  # Expected levels
+        self.assertEqual(list(self.analyzer.analyze_many(contents)), expected)  # Scored in this process
+        self.assertEqual(list(self.analyzer.analyze_many(iter(contents), workers=2, batch_size=3)), expected)  # Scored in workers
+
+    def test_count_many(self):  # Per-level keyword counts for each document
+        contents = ["Public and for everyone, credit card", "nothing"]  # Sample contents
+        counts = list(self.analyzer.count_many(contents, workers=1))  # Counted in a worker process
+        self.assertEqual(counts, [{"confidential": 0, "pii": 1, "public": 2},
+                                  {"confidential": 0, "pii": 0, "public": 0}])  # Assert the counts
+
+    def test_analyze(self):  # Counts, scores, terms and snippets from one pass
+        content = "Intro.   The SSN is listed here. " + "x " * 100 + "Also CONFIDENTIAL, and ssn again."
+        result = self.analyzer.analyze(content, snippet_chars=10)  # Explain the level
+        self.assertEqual(result.level, "confidential")
+        self.assertEqual(result.counts, {"confidential": 1, "pii": 2, "public": 0})
+        self.assertEqual(result.terms, {"ssn": 2, "confidential": 1})
+        self.assertEqual(result.score, 1.0)
+        self.assertAlmostEqual(result.confidence, 1 / 3)
+        self.assertEqual(result.matches[0].snippet, "ro. The SSN is listed")  # Original case, whitespace collapsed
+        self.assertEqual(content[result.matches[1].start:result.matches[1].end], "CONFIDENTIAL")
+        self.assertEqual(len(self.analyzer.analyze(content, max_matches=1).matches), 1)
+        self.assertEqual(self.analyzer.analyze(content, max_matches=1).total_matches, 3)  # Counts cover every match
+
+    def test_stream_result(self):  # Chunked analysis explains the result like analyze
+        content = "The ssn and the credit card are for everyone"
+        stream = self.analyzer.stream(snippet_chars=5)
+        for start in range(0, len(content), 4):
+            stream.feed(content[start:start + 4])
+        expected = self.analyzer.analyze(content, snippet_chars=5)
+        result = stream.result()
+        self.assertEqual((result.level, result.counts, result.terms), (expected.level, expected.counts, expected.terms))
+        self.assertEqual([(m.term, m.start) for m in result.matches], [(m.term, m.start) for m in expected.matches])
+        self.assertTrue(all(m.term in m.snippet.lower() for m in result.matches))  # Context may stop at a chunk end
+
+    def test_default_rules_patterns(self):  # The shipped rules find SSNs and valid card numbers without keywords
+        analyzer = ContentAnalyzer()
+        self.assertEqual(analyzer.determine_sensitivity("ref 123-45-6789"), "pii")
+        self.assertEqual(analyzer.determine_sensitivity("order 4111 1111 1111 1111"), "pii")
+        self.assertEqual(analyzer.determine_sensitivity("order 4111 1111 1111 1112"), "unknown")
+        self.assertEqual(analyzer.determine_sensitivity("adobe reader"), "unknown")  # 'dob' is whole-word only
+
     def test_unknown_detection(self):  # Test detection of unknown content
         content = "This is a generic document with no sensitive keywords."  # Sample content
         result = self.analyzer.analyze_file(content)  # Analyze the content
@@ -0,0 +1,83 @@
+# Add src directory to sys.path so we can import the duplicate finder
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from dedup import find_duplicates  # Import the duplicate finder from the src directory
+from scan_engine import ScanEngine  # Scans with dedup enabled
+from metrics import ScanMetrics  # Counts the copies that were not read
+from main import main  # The CLI writes the duplicates report
+
+import json  # To create a temporary rules file and read the report
+import tempfile  # For a throwaway directory tree
+import unittest  # Import unittest framework for testing
+
+
+class TestDedup(unittest.TestCase):  # Define a test case class for duplicate detection
+    def setUp(self):  # Setup runs before each test
+        self.temp_dir = tempfile.TemporaryDirectory()  # Temporary directory removed after each test
+        self.root = self.temp_dir.name
+        self.rules_path = os.path.join(self.root, 'rules.json')
+        with open(self.rules_path, 'w', encoding='utf-8') as f:
+            json.dump({"confidential": ["confidential"], "public": ["public"]}, f)
+        self.docs = os.path.join(self.root, 'docs')
+        os.makedirs(os.path.join(self.docs, 'copies'))
+
+    def tearDown(self):  # Teardown runs after each test
+        self.temp_dir.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.docs, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_groups_identical_bytes(self):  # Size, partial hash and full hash must all match
+        big = b'confidential ' * 20000  # Larger than both partial hash ends
+        original = self.write('a.txt', big)
+        copy = self.write('copies/a.txt', big)
+        middle = self.write('b.txt', big[:100000] + b'X' + big[100001:])  # Same size, head and tail
+        same_size = self.write('c.txt', b'public ' + b'x' * (len(big) - 7))
+        small = self.write('d.txt', b'public')
+        small_copy = self.write('copies/d.txt', b'public')
+        link = os.path.join(self.docs, 'copies', 'link.txt')
+        os.link(small, link)  # A hard link is a copy hashed only once
+        groups = find_duplicates([original, middle, same_size, small, copy, small_copy, link, original])
+        self.assertEqual([group.paths for group in groups], [[original, copy], [small, small_copy, link]])
+        self.assertEqual(groups[0].wasted_bytes, len(big))
+        self.assertEqual(groups[1].size, 6)
+
+    def test_engine_reads_one_copy(self):  # Copies get the result of the first copy, in input order
+        paths = [self.write('a.txt', b'This is confidential.'), self.write('b.txt', b'This is public.'),
+                 self.write('copies/a.txt', b'This is confidential.'),
+                 self.write('copies/a2.txt', b'This is confidential.')]
+        metrics = ScanMetrics()
+        with ScanEngine(self.rules_path, process_workers=0, max_pending=1, metrics=metrics, dedup=True) as engine:
+            records = list(engine.scan_paths(paths))
+            groups = engine.duplicate_groups
+        self.assertEqual([record.path for record in records], paths)
+        self.assertEqual([record.sensitivity for record in records], ['confidential', 'public', 'confidential', 'confidential'])
+        self.assertEqual([record.duplicate_of for record in records], [None, None, paths[0], paths[0]])
+        self.assertIsNone(records[2].read_seconds)  # Never read
+        self.assertEqual(groups[0].paths, [paths[0], paths[2], paths[3]])
+        self.assertEqual(metrics.summary()['all']['duplicates'], 2)
+
+    def test_duplicates_report(self):  # The CLI lists duplicate groups, largest waste first
+        self.write('a.txt', b'This is confidential.')
+        self.write('copies/a.txt', b'This is confidential.')
+        self.write('b.txt', b'public ' * 100)
+        self.write('copies/b.txt', b'public ' * 100)
+        report = os.path.join(self.root, 'duplicates.jsonl')
+        output = os.path.join(self.root, 'out.jsonl')
+        self.assertEqual(main([self.docs, '--rules', self.rules_path, '--no-cache', '--process-workers', '0',
+                               '--format', 'jsonl', '--output', output, '--duplicates', report]), 0)
+        with open(report, 'r', encoding='utf-8') as f:
+            groups = [json.loads(line) for line in f]
+        self.assertEqual([group['size'] for group in groups], [700, 21])
+        self.assertEqual(groups[0]['paths'], [os.path.join(self.docs, 'b.txt'), os.path.join(self.docs, 'copies', 'b.txt')])
+        with open(output, 'r', encoding='utf-8') as f:
+            duplicates = [json.loads(line)['duplicate_of'] for line in f]
+        self.assertEqual(sorted(filter(None, duplicates)), [os.path.join(self.docs, 'a.txt'), os.path.join(self.docs, 'b.txt')])
+
+
+if __name__ == '__main__':
+    unittest.main()
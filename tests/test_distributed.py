@@ -0,0 +1,121 @@
+# Add src directory to sys.path so we can import the distributed scan classes
+import sys
+import os
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, SRC)
+from distributed import RESULT_FIELDS, ShardQueue, ShardWorker, shard_key  # Import the queue and worker from the src directory
+from main import main  # The CLI runs the coordinator
+
+import json  # To create a temporary rules file and read JSONL output
+import time  # To let a lease expire
+import tempfile  # For a throwaway directory tree
+import subprocess  # Workers run as separate processes, like on separate hosts
+import unittest  # Import unittest framework for testing
+import zipfile  # Archives are scanned by the workers too
+from scan_engine import ScanEngine  # A local scan to compare against
+
+
+class TestDistributed(unittest.TestCase):  # Define a test case class for distributed scans
+    def setUp(self):  # Setup runs before each test
+        self.temp_dir = tempfile.TemporaryDirectory()  # Temporary directory removed after each test
+        self.root = self.temp_dir.name
+        self.rules_path = os.path.join(self.root, 'rules.json')
+        with open(self.rules_path, 'w', encoding='utf-8') as f:
+            json.dump({"confidential": ["confidential"], "public": ["public"]}, f)
+        self.docs = os.path.join(self.root, 'docs')
+        self.expected = {}
+        for index in range(60):  # Files spread over three top-level directories and the root
+            folder = os.path.join(self.docs, f'dept_{index % 4}') if index % 4 else self.docs
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, f'file_{index:02d}.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("This is confidential." if index % 2 else "This is public.")
+            self.expected[path] = "confidential" if index % 2 else "public"
+        self.queue_path = os.path.join(self.root, 'queue.sqlite')
+
+    def tearDown(self):  # Teardown runs after each test
+        self.temp_dir.cleanup()
+
+    def test_plan_shards(self):  # Hash and subtree sharding cover every file once
+        self.assertEqual(shard_key('a/b/c.txt', 'subtree'), 'a')
+        self.assertEqual(shard_key('c.txt', 'subtree'), '.')
+        self.assertEqual(shard_key('a/b/c.txt', 'hash', 8), shard_key('a/b/c.txt', 'hash', 8))  # Same on every host
+        with ShardQueue(self.queue_path) as queue:
+            self.assertTrue(queue.plan([self.docs], self.rules_path, shard_by='subtree'))
+            self.assertFalse(queue.plan([self.docs], self.rules_path))  # A restarted coordinator keeps the plan
+            with self.assertRaises(ValueError):
+                queue.plan([self.root], self.rules_path)
+            progress = queue.progress()
+        self.assertEqual(progress['pending'], 4)  # dept_1..3 and the root's own files
+        self.assertEqual(progress['files'], 60)
+
+    def test_worker_scans_every_shard(self):  # One worker drains the queue; results are merged in walk order
+        with ShardQueue(self.queue_path) as queue:
+            queue.plan([self.docs], self.rules_path, shards=8)
+            with ShardWorker(queue, process_workers=0) as worker:
+                self.assertEqual(worker.run(wait=False), 60)
+            results = list(queue.results())
+            self.assertTrue(queue.finished)
+        self.assertEqual({fields['path']: fields['sensitivity'] for fields in results}, self.expected)
+        self.assertTrue(all(fields['error'] is None for fields in results))
+
+    def test_archive_members(self):  # Files inside archives are reported, as a local scan reports them
+        archive = os.path.join(self.docs, 'dept_1', 'bundle.zip')
+        with zipfile.ZipFile(archive, 'w') as f:
+            f.writestr('notes.txt', "This is public.")
+            f.writestr('nested/plan.txt', "This is confidential.")
+        with ScanEngine(self.rules_path, process_workers=0) as engine:
+            expected = [(record.path, record.sensitivity) for record in engine.scan_directory(self.docs)]
+        with ShardQueue(self.queue_path) as queue:
+            queue.plan([self.docs], self.rules_path, shard_by='subtree')
+            with ShardWorker(queue, process_workers=0) as worker:
+                worker.run(wait=False)
+            results = [(fields['path'], fields['sensitivity']) for fields in queue.results()]
+        self.assertEqual(sorted(results), sorted(expected))
+        self.assertIn((f"{archive}!nested/plan.txt", "confidential"), results)
+        index = results.index((archive, "confidential"))
+        self.assertEqual([path for path, _ in results[index - 2:index]], [f"{archive}!notes.txt", f"{archive}!nested/plan.txt"])
+
+    def test_dead_worker_shard_is_reassigned(self):  # A shard whose lease expires goes to another worker
+        with ShardQueue(self.queue_path, lease_seconds=0.3) as queue:
+            queue.plan([self.docs], self.rules_path, shard_by='subtree')
+            dead = queue.claim('dead-worker')  # Claims a shard, then never renews it
+            files = queue.pending_files(dead)
+            with ShardWorker(queue, 'live-worker', poll_interval=0.05, process_workers=0) as worker:
+                self.assertEqual(worker.run(), 60)  # Waits for the lease to expire, then takes the shard over
+            self.assertFalse(queue.store_results(dead, 'dead-worker', [(files[0][0],) + (None,) * len(RESULT_FIELDS)]))
+            self.assertEqual(queue.progress()['done'], 4)
+            self.assertEqual(len(list(queue.results())), 60)
+
+    def test_shard_fails_after_max_attempts(self):  # A shard that keeps killing its workers is given up
+        with ShardQueue(self.queue_path, lease_seconds=0.01, max_attempts=2) as queue:
+            queue.plan([self.docs], self.rules_path, shards=1)
+            self.assertEqual(queue.claim('crashing-worker').attempts, 1)
+            time.sleep(0.05)
+            self.assertEqual(queue.claim('crashing-worker').attempts, 2)  # Reassigned after the lease expired
+            time.sleep(0.05)
+            self.assertIsNone(queue.claim('crashing-worker'))  # A third claim would exceed max_attempts
+            self.assertEqual(queue.progress()['failed'], 1)
+            self.assertTrue(queue.finished)
+            errors = {fields['error'] for fields in queue.results()}
+        self.assertEqual(errors, {'shard failed'})
+
+    def test_worker_processes_with_local_coordinator(self):  # Several worker processes against the CLI coordinator
+        output = os.path.join(self.root, 'out.jsonl')
+        command = [sys.executable, os.path.join(SRC, 'main.py'), '--worker', self.queue_path, '--no-cache',
+                   '--process-workers', '0']
+        workers = [subprocess.Popen(command) for _ in range(3)]  # Started first: they wait for the plan
+        try:
+            self.assertEqual(main([self.docs, '--coordinator', self.queue_path, '--rules', self.rules_path,
+                                   '--shards', '6', '--format', 'jsonl', '--output', output]), 0)
+        finally:
+            codes = [worker.wait(timeout=60) for worker in workers]
+        self.assertEqual(codes, [0, 0, 0])
+        with open(output, 'r', encoding='utf-8') as f:
+            results = [json.loads(line) for line in f]
+        self.assertEqual(len(results), 60)  # Merged: every file exactly once
+        self.assertEqual({fields['path']: fields['sensitivity'] for fields in results}, self.expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
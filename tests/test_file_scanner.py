@@ -4,6 +4,7 @@ import os
 import shutil
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 from file_scanner import FileScanner  # Import the FileScanner class from the src directory
+from content_analyzer import ContentAnalyzer  # Analyzer with the default rules
 
 import unittest  # Import unittest framework for testing
 from PIL import Image  # For creating a sample image file
@@ -101,6 +102,58 @@ class TestFileScanner(unittest.TestCase):  # Define a test case class for FileSc
         expected = self.docx_expected
         self.assertIn(expected, content)  # Assert the content includes the expected text
 
+    def test_read_docx_tables_headers_footers(self):  # Test that text outside body paragraphs is read too
+        path = os.path.join(self.test_dir, 'layout.docx')  # A document with a table, a header and a footer
+        doc = docx.Document()
+        doc.add_paragraph('Body text')
+        table = doc.add_table(rows=1, cols=2)
+        table.cell(0, 0).text = 'Cell one'
+        table.cell(0, 1).text = 'Cell two'
+        doc.sections[0].header.paragraphs[0].text = 'Header text'
+        doc.sections[0].footer.paragraphs[0].text = 'Footer text'
+        doc.save(path)
+        try:
+            content = self.scanner.read_file(path)
+        finally:
+            os.remove(path)  # Keep the shared test directory clean
+        for expected in ('Body text', 'Cell one', 'Cell two', 'Header text', 'Footer text'):
+            self.assertIn(expected, content)  # python-docx's doc.paragraphs only had the first one
+        self.assertLess(content.index('Body text'), content.index('Header text'))  # The body comes first
+
+    def test_docx_text_box_read_once(self):  # Text boxes are written twice (mc:Choice and mc:Fallback) but read once
+        path = os.path.join(self.test_dir, 'textbox.docx')
+        doc = docx.Document()
+        doc.add_paragraph('Body text')
+        box = ('<mc:AlternateContent xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" '
+               'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+               '<mc:Choice Requires="wps"><w:drawing><w:txbxContent><w:p><w:r><w:t>Box secret</w:t></w:r></w:p>'
+               '</w:txbxContent></w:drawing></mc:Choice><mc:Fallback><w:pict><w:txbxContent><w:p><w:r>'
+               '<w:t>Box secret</w:t></w:r></w:p></w:txbxContent></w:pict></mc:Fallback></mc:AlternateContent>')
+        from docx.oxml import parse_xml
+        doc.paragraphs[0].runs[0]._r.append(parse_xml(box))
+        doc.save(path)
+        try:
+            content = self.scanner.read_file(path)
+        finally:
+            os.remove(path)  # Keep the shared test directory clean
+        self.assertEqual(content.count('Box secret'), 1)
+        self.assertIn('Body text', content)
+
+    def test_docx_stops_after_decisive_match(self):  # Test that the rest of a DOCX is not parsed
+        path = os.path.join(self.test_dir, 'long.docx')  # A long document with the decisive keyword up front
+        doc = docx.Document()
+        doc.add_paragraph('This document is confidential.')
+        for _ in range(3000):
+            doc.add_paragraph('filler text ' * 10)
+        doc.save(path)
+        try:
+            record = FileScanner().scan_file(path, ContentAnalyzer())
+        finally:
+            os.remove(path)  # Keep the shared test directory clean
+        self.assertEqual(record.sensitivity, 'confidential')
+        self.assertTrue(record.truncated)  # Parsing stopped before the end of the document
+        self.assertLess(len(record.content), 3000 * 120)
+
     def test_read_pdf(self):  # Test reading a PDF file
         content = self.scanner.read_file(self.pdf_path)  # Read the PDF file
         expected = self.pdf_expected
@@ -124,5 +177,83 @@ class TestFileScanner(unittest.TestCase):  # Define a test case class for FileSc
         print(f"PDF OCR percent match: {percent_match:.2f}% (Expected: '{expected}', Got: '{content.strip()}')")
         self.assertGreater(percent_match, 70, f"PDF OCR percent match too low: {percent_match:.2f}%")  # Accept if >70%
 
+    def test_iter_scan(self):  # Test streaming records for a whole directory
+        records = list(self.scanner.iter_scan(self.test_dir, estimate_progress=True))  # Scan the test directory
+        by_name = {os.path.basename(record.path): record for record in records}  # Index records by file name
+        self.assertEqual(by_name['sample.txt'].sensitivity, 'pii')  # 'credit card' is a PII keyword
+        self.assertEqual(by_name['sample.pdf'].sensitivity, 'confidential')  # 'do not distribute' is confidential
+        self.assertEqual(by_name['sample.docx'].sensitivity, 'public')  # 'public' is a public keyword
+        self.assertGreaterEqual(records[-1].progress, 0.99)  # The last record (nearly) completes the estimate
+
+    def test_iter_scan_is_lazy(self):  # Test that records are produced before the walk finishes
+        records = self.scanner.iter_scan(self.test_dir)  # Create the generator
+        first = next(records)  # Take a single record
+        self.assertTrue(os.path.isfile(first.path))  # Assert it points at a real file
+        records.close()  # Stop the scan early
+
+    def test_streamed_txt_matches_across_chunks(self):  # Test that keywords split between chunks are found
+        scanner = FileScanner(chunk_size=4)  # Tiny chunks so 'credit card' is split
+        record = scanner.scan_file(self.txt_path, ContentAnalyzer())  # Stream and analyze the text file
+        self.assertEqual(record.content, self.txt_expected)  # The text is reassembled exactly
+        self.assertEqual(record.sensitivity, 'pii')  # 'credit card' matched across chunk boundaries
+        self.assertFalse(record.truncated)  # The whole file was read
+
+    def test_read_error_after_first_chunk(self):  # A file that fails partway through gets an error, not a level
+        path = os.path.join(self.test_dir, 'broken.txt')
+        with open(path, 'wb') as f:
+            f.write(b'public notice ' + b'x' * 20 + b' caf\xe9 confidential')  # Not UTF-8 past the first chunks
+        try:
+            scanner = FileScanner(chunk_size=16)
+            record = scanner.scan_file(path, ContentAnalyzer())
+            self.assertIsNone(scanner.read_file(path))  # Reading it whole fails too
+        finally:
+            os.remove(path)
+        self.assertIsNotNone(record.error)
+        self.assertIsNone(record.sensitivity)  # 'public' from the first chunk is not reported
+        self.assertIsNone(record.content)
+
+    def test_max_bytes_limits_txt(self):  # Test that reading stops after max_bytes
+        scanner = FileScanner(max_bytes=9)  # Only read 'This is a'
+        self.assertEqual(scanner.read_file(self.txt_path), 'This is a')  # Assert only the prefix was read
+
+    def test_early_exit_on_decisive_match(self):  # Test that reading stops once the top level matches
+        path = os.path.join(self.test_dir, 'large.txt')  # A large file with a decisive keyword up front
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('confidential ' + 'filler text ' * 50000)
+        try:
+            scanner = FileScanner(chunk_size=1024)  # Read 1 KiB at a time
+            record = scanner.scan_file(path, ContentAnalyzer())
+        finally:
+            os.remove(path)  # Keep the shared test directory clean
+        self.assertEqual(record.sensitivity, 'confidential')  # The top level was found
+        self.assertTrue(record.truncated)  # The rest of the file was never read
+        self.assertLessEqual(len(record.content), 1024)  # Only the first chunk was kept
+
+    def test_pdf_ocr_only_for_pages_without_text(self):  # Test that OCR is skipped when a text layer exists
+        from unittest import mock  # To count Tesseract calls without Tesseract installed
+        with mock.patch('ocr.pytesseract.image_to_string', return_value='CONFIDENTIAL scan') as ocr:
+            self.assertIn(self.pdf_expected, self.scanner.read_file(self.pdf_path))  # Text layer only
+            self.assertEqual(ocr.call_count, 0)  # No OCR for a page with text
+            self.assertIn('CONFIDENTIAL scan', self.scanner.read_file(self.pdf_img_path))  # Image-only page
+            self.assertEqual(ocr.call_count, 1)  # The embedded image was OCR'd once
+
+    def test_pdf_pages_stop_after_decisive_match(self):  # Test that later pages are never processed
+        path = os.path.join(self.test_dir, 'pages.pdf')  # A three page PDF with the decisive keyword on page one
+        pdf = FPDF()
+        pdf.set_font('Arial', size=12)
+        for text in ('This page is confidential material.', 'This page is public.', 'Also public.'):
+            pdf.add_page()
+            pdf.cell(200, 10, text, ln=True)
+        pdf.output(path)
+        try:
+            pages = list(self.scanner._iter_pdf(path))  # Every page when iterated fully
+            record = self.scanner.scan_file(path, ContentAnalyzer())  # Stops after the first page
+        finally:
+            os.remove(path)  # Keep the shared test directory clean
+        self.assertEqual(len([page for page in pages if page]), 3)  # One text piece per page
+        self.assertEqual(record.sensitivity, 'confidential')
+        self.assertTrue(record.truncated)  # Pages two and three were skipped
+        self.assertNotIn('public', record.content)
+
 if __name__ == '__main__':  # Run the tests if this file is executed directly
     unittest.main()  # Start the unittest test runner
\ No newline at end of file
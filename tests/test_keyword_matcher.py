@@ -0,0 +1,169 @@
+# Add src directory to sys.path so we can import KeywordMatcher
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from keyword_matcher import KeywordMatcher, luhn_valid  # Import the KeywordMatcher class from the src directory
+
+import random  # For generating random documents
+import unittest  # Import unittest framework for testing
+
+
+def naive_level(rules, content):  # Reference implementation: the original per-keyword loop
+    content_lower = content.lower()
+    for level, keywords in rules.items():
+        for keyword in keywords:
+            if keyword in content_lower:
+                return level
+    return "unknown"
+
+
+class TestKeywordMatcher(unittest.TestCase):  # Define a test case class for KeywordMatcher
+    def setUp(self):  # Setup runs before each test
+        self.rules = {
+            "confidential": ["confidential", "internal use only", "private"],
+            "pii": ["ssn", "social security number", "private address"],
+            "public": ["public", "for everyone"]
+        }  # Define sample rules
+        self.matcher = KeywordMatcher(self.rules, trie_threshold=0)  # Force the compiled trie pattern
+        self.small_matcher = KeywordMatcher(self.rules)  # Small rule set, uses per-keyword search
+
+    def test_reports_keyword_level_and_offset(self):  # Every match carries its level and offset
+        matches = self.matcher.find_all("the ssn is public")
+        self.assertEqual([(m.keyword, m.level, m.start) for m in matches],
+                         [("ssn", "pii", 4), ("public", "public", 11)])
+
+    def test_reports_overlapping_keywords(self):  # Keywords sharing a start offset are all reported
+        matches = self.matcher.find_all("a private address")
+        self.assertEqual({(m.keyword, m.level) for m in matches},
+                         {("private", "confidential"), ("private address", "pii")})
+
+    def test_precedence_follows_rule_order(self):  # Earlier levels win even when they appear later in the text
+        self.assertEqual(self.matcher.best_level("public ssn then confidential"), "confidential")
+        self.assertEqual(self.matcher.best_level("nothing here"), "unknown")
+
+    def test_small_rule_set_reports_same_matches(self):  # Both strategies report identical matches
+        text = "a private address, the ssn is public for everyone"
+        self.assertEqual(self.small_matcher.find_all(text), self.matcher.find_all(text))
+
+    def test_count_levels(self):  # Both strategies count overlapping occurrences like find_all
+        text = "a private address, the ssn is public, ssn again"
+        expected = {"confidential": 1, "pii": 3, "public": 1}
+        self.assertEqual(self.matcher.count_levels(text), expected)
+        self.assertEqual(self.small_matcher.count_levels(text), expected)
+
+    def test_empty_keyword_matches_everything(self):  # Like `'' in text`, an empty keyword always matches
+        rules = {"confidential": ["secret"], "public": [""]}
+        for threshold in (0, 400):
+            matcher = KeywordMatcher(rules, trie_threshold=threshold)
+            self.assertEqual(matcher.best_level("nothing"), "public")
+            self.assertEqual(matcher.best_level("a secret"), "confidential")
+
+    def test_empty_rules(self):  # A matcher without keywords never matches
+        matcher = KeywordMatcher({"public": []})
+        self.assertEqual(matcher.find_all("public"), [])
+        self.assertEqual(matcher.best_level("public"), "unknown")
+
+    def test_matches_naive_loop_on_random_text(self):  # Same result as the per-keyword loop
+        rng = random.Random(1234)
+        vocabulary = ["ssn", "pub", "public", "priv", "private", "address", "for", "everyone", "x", " "]
+        for _ in range(200):
+            text = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(0, 12)))
+            self.assertEqual(self.matcher.best_level(text), naive_level(self.rules, text), text)
+            self.assertEqual(self.small_matcher.best_level(text), naive_level(self.rules, text), text)
+
+    def test_stream_finds_keywords_across_chunks(self):  # Chunked input reports the same matches once
+        text = "my social security number and a private address are public"
+        for matcher in (self.matcher, self.small_matcher):
+            for chunk_size in (1, 2, 5, 7, 100):
+                stream = matcher.stream()
+                found = []
+                for start in range(0, len(text), chunk_size):
+                    found.extend(stream.feed(text[start:start + chunk_size]))
+                self.assertEqual(sorted(found), sorted(matcher.find_all(text)), chunk_size)
+                self.assertEqual(stream.level, matcher.best_level(text))
+                self.assertTrue(stream.decided)  # 'private' is a top-level keyword
+
+    def test_weights_and_thresholds(self):  # A level with a threshold needs enough weighted evidence
+        rules = {"pii": {"threshold": 3, "keywords": [{"term": "passport", "weight": 2}, "address"]},
+                 "public": ["public"]}
+        matcher = KeywordMatcher(rules)
+        self.assertEqual(matcher.best_level("passport, public"), "public")  # Score 2 is below the threshold
+        self.assertEqual(matcher.best_level("passport and address, public"), "pii")  # 2 + 1 reaches it
+        stream = matcher.stream()
+        stream.feed("passport ")
+        self.assertFalse(stream.decided)
+        stream.feed("address")
+        self.assertTrue(stream.decided)
+        self.assertEqual(stream.scores, {"pii": 3.0, "public": 0.0})
+
+    def test_whole_word_keywords(self):  # Whole-word keywords ignore matches inside longer words
+        rules = {"pii": [{"term": "dob", "word": True}], "public": ["public"]}
+        for threshold in (0, 400):
+            matcher = KeywordMatcher(rules, trie_threshold=threshold)
+            self.assertEqual(matcher.best_level("adobe reader, public"), "public")
+            self.assertEqual(matcher.best_level("dob: 1990"), "pii")
+            self.assertEqual([m.start for m in matcher.find_all("dob,dob_x xdob dob")], [0, 15])
+
+    def test_whole_word_split_across_chunks(self):  # A word cut by a chunk boundary is checked whole
+        rules = {"pii": [{"term": "dob", "word": True}], "public": ["public"]}
+        for threshold in (0, 400):
+            matcher = KeywordMatcher(rules, trie_threshold=threshold)
+            stream = matcher.stream()
+            self.assertEqual(stream.feed("my dob") + stream.feed("ermann") + stream.finish(), [])
+            self.assertEqual(stream.level, matcher.best_level("my dobermann"))  # 'unknown', as in one piece
+            stream = matcher.stream()
+            found = stream.feed("my dob") + stream.feed(": 1990") + stream.finish()
+            self.assertEqual([(m.keyword, m.start) for m in found], [("dob", 3)])
+            stream = matcher.stream()
+            self.assertEqual(len(stream.feed("dob") + stream.finish()), 1)  # The end of the stream is a boundary
+
+    def test_pattern_rules(self):  # Regex rules, with Luhn validation for card numbers
+        rules = {"pii": {"keywords": ["ssn"], "patterns": [
+            {"name": "ssn number", "regex": r"\d(?<!\w\d)\d{2}-\d{2}-\d{4}\b"},
+            {"name": "card", "regex": r"\d(?<!\w\d)(?:[ -]?\d){12,18}\b", "validator": "luhn", "weight": 2}]}}
+        matcher = KeywordMatcher(rules)
+        text = "ssn 123-45-6789, cards 4111 1111 1111 1111 and 4111 1111 1111 1112, id 9123-45-6789"
+        matches = matcher.find_all(text)
+        self.assertEqual([(m.keyword, m.start, m.end) for m in matches],
+                         [("ssn", 0, 3), ("ssn number", 4, 15), ("card", 23, 42)])  # Bad checksum, longer number
+        self.assertEqual(matcher.count_levels(text), {"pii": 3})
+        self.assertTrue(luhn_valid("4111-1111-1111-1111"))
+        self.assertFalse(luhn_valid("4111111111111112"))
+        for chunk_size in (1, 3, 10):  # Patterns crossing chunk boundaries are found once
+            stream = matcher.stream()
+            found = []
+            for start in range(0, len(text), chunk_size):
+                found.extend(stream.feed(text[start:start + chunk_size]))
+            found.extend(stream.finish())  # Patterns near the end are held back until the stream ends
+            self.assertEqual(sorted(found), sorted(matches), chunk_size)
+            self.assertEqual(stream.scores["pii"], 4.0)
+        with self.assertRaises(ValueError):  # Unknown validators are rejected when the rules load
+            KeywordMatcher({"pii": {"patterns": [{"name": "x", "regex": "x", "validator": "crc"}]}})
+
+    def test_card_number_split_across_chunks(self):  # A valid prefix of a longer card number is not counted
+        rules = {"pii": {"patterns": [
+            {"name": "card", "regex": r"\d(?<!\w\d)(?:[ -]?\d){12,18}\b", "validator": "luhn"}]}}
+        matcher = KeywordMatcher(rules)
+        text = "card 4539 1488 0343 6467 008 on file"  # 19 digits that pass Luhn, as do the first 16
+        self.assertTrue(luhn_valid("4539148803436467"))
+        self.assertEqual([(m.start, m.end) for m in matcher.find_all(text)], [(5, 28)])
+        for split in range(6, 28):
+            stream = matcher.stream()
+            found = stream.feed(text[:split]) + stream.feed(text[split:]) + stream.finish()
+            self.assertEqual([(m.start, m.end) for m in found], [(5, 28)], split)
+            self.assertEqual(stream.counts, {"pii": 1})
+
+    def test_compiled_state_round_trip(self):  # A matcher rebuilt from its compiled state reports the same matches
+        import marshal  # The rules cache stores the state with marshal
+        rules = dict(self.rules, pii={"keywords": ["ssn", {"term": "dob", "word": True}, "private address"],
+                                      "patterns": [{"name": "ssn number", "regex": r"\d{3}-\d{2}-\d{4}"}]})
+        text = "a private address, dob 123-45-6789, the ssn is public; dobby"
+        for threshold in (0, 400):
+            matcher = KeywordMatcher(rules, trie_threshold=threshold)
+            loaded = KeywordMatcher.from_compiled_state(marshal.loads(marshal.dumps(matcher.compiled_state())))
+            self.assertEqual(loaded.find_all(text), matcher.find_all(text))
+            self.assertEqual(loaded.best_level(text), matcher.best_level(text))
+
+
+if __name__ == '__main__':  # Run the tests if this file is executed directly
+    unittest.main()  # Start the unittest test runner
@@ -0,0 +1,128 @@
+# Add src directory to sys.path so we can import the CLI
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from main import main  # Import the CLI entry point from the src directory
+from checkpoint import ScanCheckpoint  # Progress file used to resume scans
+
+import csv  # To read the CSV output back
+import json  # To create a temporary rules file and read JSONL output
+import tempfile  # For a throwaway directory tree
+import unittest  # Import unittest framework for testing
+import zipfile  # To scan an archive across a resumed run
+from contextlib import redirect_stderr  # parser.error prints the usage
+from io import StringIO  # Where the usage goes
+from unittest import mock  # To run --watch as if inotify were missing
+
+
+class TestMain(unittest.TestCase):  # Define a test case class for the command line interface
+    def setUp(self):  # Setup runs before each test
+        self.temp_dir = tempfile.TemporaryDirectory()  # Temporary directory removed after each test
+        self.root = self.temp_dir.name
+        self.rules_path = os.path.join(self.root, 'rules.json')
+        with open(self.rules_path, 'w', encoding='utf-8') as f:
+            json.dump({"confidential": ["confidential"], "public": ["public"]}, f)
+        self.roots = [os.path.join(self.root, 'a'), os.path.join(self.root, 'b')]  # Two roots scanned in one run
+        self.paths = []
+        for index, folder in enumerate(self.roots * 3):
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, f'file_{index}.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("This is confidential." if index % 2 else "This is public.")
+            self.paths.append(path)
+        self.output = os.path.join(self.root, 'out')
+        self.common = ['--rules', self.rules_path, '--no-cache', '--process-workers', '0', '--output', self.output]
+
+    def tearDown(self):  # Teardown runs after each test
+        self.temp_dir.cleanup()
+
+    def read_jsonl(self):
+        with open(self.output, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_jsonl_output(self):  # One JSON object per file, with timings
+        self.assertEqual(main(self.roots + self.common + ['--format', 'jsonl']), 0)
+        records = self.read_jsonl()
+        self.assertEqual(sorted(record['path'] for record in records), sorted(self.paths))
+        for record in records:
+            expected = "confidential" if "confidential" in open(record['path']).read() else "public"
+            self.assertEqual(record['sensitivity'], expected)
+            self.assertGreaterEqual(record['read_ms'], 0)  # Timing fields are filled in
+            self.assertGreaterEqual(record['match_ms'], 0)
+            self.assertIn(f"{expected}:1", record['terms'])  # The matched terms explain the level
+            self.assertEqual(record['score'], 1.0)
+
+    def test_csv_output(self):  # A header row followed by one row per file
+        self.assertEqual(main(self.roots + self.common + ['--format', 'csv', '--content']), 0)
+        with open(self.output, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), len(self.paths))
+        self.assertIn('read_ms', rows[0])
+        self.assertTrue(all(row['content'].startswith("This is") for row in rows))
+
+    def test_resume_from_checkpoint(self):  # Files finished before a crash are not scanned again
+        checkpoint_path = os.path.join(self.root, 'scan.checkpoint')
+        done = sorted(self.paths)[:2]
+        with open(self.output, 'w', encoding='utf-8') as f:  # Output written by the crashed run
+            for path in done:
+                f.write(json.dumps({'path': path, 'sensitivity': 'public'}) + '\n')
+        with ScanCheckpoint(checkpoint_path) as checkpoint:
+            for path in done:
+                checkpoint.mark(path)
+        with open(checkpoint_path, 'a', encoding='utf-8') as f:
+            f.write(self.paths[-1][:5])  # A line cut off by the crash is ignored
+        self.assertEqual(main(self.roots + self.common + ['--format', 'jsonl', '--checkpoint', checkpoint_path]), 0)
+        paths = [record['path'] for record in self.read_jsonl()]
+        self.assertEqual(sorted(paths), sorted(self.paths))  # Appended, every file exactly once
+        self.assertFalse(os.path.exists(checkpoint_path))  # Removed once the scan completed
+
+    def test_resume_inside_archive(self):  # Archive members written before a crash are not written again
+        checkpoint_path = os.path.join(self.root, 'scan.checkpoint')
+        archive = os.path.join(self.roots[0], 'bundle.zip')
+        with zipfile.ZipFile(archive, 'w') as f:
+            f.writestr('first.txt', "This is public.")
+            f.writestr('second.txt', "This is confidential.")
+        first = f"{archive}!first.txt"
+        with open(self.output, 'w', encoding='utf-8') as f:  # The crash came after the first member was written
+            f.write(json.dumps({'path': first, 'sensitivity': 'public'}) + '\n')
+        with ScanCheckpoint(checkpoint_path) as checkpoint:
+            checkpoint.mark(first)
+        self.assertEqual(main(self.roots + self.common + ['--format', 'jsonl', '--checkpoint', checkpoint_path]), 0)
+        paths = [record['path'] for record in self.read_jsonl()]
+        self.assertEqual(sorted(paths), sorted(self.paths + [archive, first, f"{archive}!second.txt"]))
+
+    def test_ignored_options_rejected(self):  # Options a mode would ignore are usage errors
+        for options, ignored in ((['--delta', '--checkpoint', 'scan.checkpoint'], '--checkpoint'),
+                                 (['--watch', '--dedup'], '--dedup'),
+                                 (['--delta', '--duplicates', 'groups.jsonl'], '--duplicates'),
+                                 (['--delta', '--profile', 'scan.prof'], '--profile'),
+                                 (['--coordinator', 'queue.sqlite', '--metrics'], '--metrics'),
+                                 (['--coordinator', 'queue.sqlite', '--sink', 'results.sqlite'], '--sink'),
+                                 (['--coordinator', 'queue.sqlite', '--content'], '--content'),
+                                 (['--coordinator', 'queue.sqlite', '--dedup'], '--dedup'),
+                                 (['--coordinator', 'queue.sqlite', '--checkpoint', 'scan.checkpoint'], '--checkpoint'),
+                                 (['--coordinator', 'queue.sqlite', '--profile', 'scan.prof'], '--profile')):
+            with self.assertRaises(SystemExit) as raised, redirect_stderr(StringIO()) as stderr:
+                main(self.roots + self.common + options)
+            self.assertEqual(raised.exception.code, 2)
+            self.assertIn(f"{ignored} cannot be used with", stderr.getvalue())
+        for options in (['--rules', self.rules_path], ['--format', 'jsonl'], ['--output', self.output],
+                        ['--sink', 'results.sqlite'], ['--metrics']):  # Workers take the rules from the queue and write only to it
+            with self.assertRaises(SystemExit) as raised, redirect_stderr(StringIO()) as stderr:
+                main(['--worker', 'queue.sqlite'] + options)
+            self.assertEqual(raised.exception.code, 2)
+            self.assertIn(f"{options[0]} cannot be used with --worker", stderr.getvalue())
+
+    def test_watch_without_inotify(self):  # A system without inotify gets a one-line error, not a traceback
+        with mock.patch('watcher.InotifyWatcher.__init__', side_effect=NotImplementedError("no inotify")), \
+                redirect_stderr(StringIO()) as stderr:
+            code = main([self.roots[0], '--watch', '--manifest', os.path.join(self.root, 'manifest.sqlite')] + self.common)
+        self.assertEqual(code, 2)
+        self.assertEqual(stderr.getvalue(), "Error: no inotify\n")
+
+    def test_invalid_root(self):  # A missing directory is reported with a non-zero exit code
+        self.assertEqual(main([os.path.join(self.root, 'missing')] + self.common), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
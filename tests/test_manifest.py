@@ -0,0 +1,113 @@
+# Add src directory to sys.path so we can import the manifest module
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from manifest import DELETED, MODIFIED, NEW, ScanManifest, delta_scan, watch  # Import the manifest from the src directory
+from scan_engine import ScanEngine  # Scans the changed files
+from walker import DirectoryWalker  # To check single paths against the walk filters
+from budget import ScanBudget  # Budget-limited results are not recorded
+
+import json  # To create a temporary rules file
+import time  # To wait for watch events
+import tempfile  # For a throwaway directory tree
+import threading  # The watch runs on its own thread
+import unittest  # Import unittest framework for testing
+
+
+class TestManifest(unittest.TestCase):  # Define a test case class for delta scans
+    def setUp(self):  # Setup runs before each test
+        self.temp_dir = tempfile.TemporaryDirectory()  # Temporary directory removed after each test
+        self.root = self.temp_dir.name
+        self.rules_path = os.path.join(self.root, 'rules.json')
+        with open(self.rules_path, 'w', encoding='utf-8') as f:
+            json.dump({"confidential": ["confidential"], "public": ["public"]}, f)
+        self.docs_dir = os.path.join(self.root, 'docs')
+        os.makedirs(os.path.join(self.docs_dir, 'nested'))
+        self.keep = self.write('keep.txt', "This is public.")
+        self.edit = self.write('nested/edit.txt', "This is public.")
+        self.gone = self.write('gone.txt', "This is confidential.")
+        self.manifest = ScanManifest(os.path.join(self.root, 'manifest.sqlite'))
+        self.engine = ScanEngine(self.rules_path, process_workers=0)
+
+    def tearDown(self):  # Teardown runs after each test
+        self.engine.close()
+        self.manifest.close()
+        self.temp_dir.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.docs_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_delta_scan(self):  # Only new, modified and deleted files are reported
+        first = list(delta_scan(self.engine, self.docs_dir, self.manifest))
+        self.assertEqual(sorted(change.path for change in first), sorted([self.keep, self.edit, self.gone]))
+        self.assertTrue(all(change.status == NEW for change in first))
+        self.assertEqual(list(delta_scan(self.engine, self.docs_dir, self.manifest)), [])  # Nothing changed
+        self.write('nested/edit.txt', "Now it is confidential!")
+        os.remove(self.gone)
+        added = self.write('added.txt', "Nothing to see.")
+        changes = {change.path: change for change in delta_scan(self.engine, self.docs_dir, self.manifest)}
+        self.assertEqual(set(changes), {self.edit, self.gone, added})
+        self.assertEqual((changes[self.edit].status, changes[self.edit].old_level, changes[self.edit].new_level),
+                         (MODIFIED, "public", "confidential"))  # The change report shows the new level
+        self.assertEqual((changes[self.gone].status, changes[self.gone].old_level), (DELETED, "confidential"))
+        self.assertEqual((changes[added].status, changes[added].new_level), (NEW, "unknown"))
+        self.assertTrue(changes[self.edit].level_changed)
+
+    def test_partial_results_retried(self):  # Files cut short by a budget are scanned again by the next delta
+        self.write('long.txt', "This is public. " * 100)
+        with ScanEngine(self.rules_path, process_workers=0, budget=ScanBudget(max_file_bytes=100)) as engine:
+            first = {os.path.basename(change.path): change.record.status for change in
+                     delta_scan(engine, self.docs_dir, self.manifest)}
+            self.assertEqual(first['long.txt'], 'partial')
+            second = [os.path.basename(change.path) for change in delta_scan(engine, self.docs_dir, self.manifest)]
+        self.assertEqual(second, ['long.txt'])
+        third = [os.path.basename(change.path) for change in delta_scan(self.engine, self.docs_dir, self.manifest)]
+        self.assertEqual(third, ['long.txt'])  # Read in full without the budget, and recorded
+        self.assertEqual(list(delta_scan(self.engine, self.docs_dir, self.manifest)), [])
+
+    def test_max_bytes_prefix_recorded(self):  # A file cut at --max-bytes is recorded, with the limit it was cut at
+        self.write('long.txt', "This is public. " * 100)
+        with ScanEngine(self.rules_path, process_workers=0, max_bytes=100) as engine:
+            first = {os.path.basename(change.path): change.record.status for change in
+                     delta_scan(engine, self.docs_dir, self.manifest)}
+            self.assertEqual(first['long.txt'], 'prefix')
+            self.assertEqual(list(delta_scan(engine, self.docs_dir, self.manifest)), [])  # Not reported again
+        with ScanEngine(self.rules_path, process_workers=0, max_bytes=200) as engine:
+            second = [os.path.basename(change.path) for change in delta_scan(engine, self.docs_dir, self.manifest)]
+        self.assertEqual(second, ['long.txt'])  # A different limit reads it again
+        third = [os.path.basename(change.path) for change in delta_scan(self.engine, self.docs_dir, self.manifest)]
+        self.assertEqual(third, ['long.txt'])  # And so does reading it whole
+        self.assertEqual(list(delta_scan(self.engine, self.docs_dir, self.manifest)), [])
+
+    def test_walker_accepts(self):  # Single paths are checked with the same filters as a walk
+        walker = DirectoryWalker(extensions=['.txt'], exclude=['nested/*'])
+        self.assertTrue(walker.accepts(self.keep, self.docs_dir))
+        self.assertFalse(walker.accepts(self.edit, self.docs_dir))  # Excluded directory
+        self.assertFalse(walker.accepts(self.rules_path, self.docs_dir))  # Outside the root
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), "inotify is Linux only")
+    def test_watch(self):  # Changes are picked up without walking the tree again
+        stop = threading.Event()
+        changes = []
+        thread = threading.Thread(target=lambda: changes.extend(
+            watch(self.engine, self.docs_dir, self.manifest, stop=stop, debounce=0.1)))
+        thread.start()
+        deadline = time.monotonic() + 10
+        while len(changes) < 3 and time.monotonic() < deadline:  # The initial delta scan reports the three files
+            time.sleep(0.05)
+        os.makedirs(os.path.join(self.docs_dir, 'later'))
+        created = self.write('later/new.txt', "confidential")
+        os.remove(self.keep)
+        while len(changes) < 5 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        stop.set()
+        thread.join(5)
+        later = {change.path: change.status for change in changes[3:]}
+        self.assertEqual(later, {created: NEW, self.keep: DELETED})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# Add src directory to sys.path so we can import the metrics module
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from metrics import NULL_METRICS, ScanMetrics, profile_scan  # Import the instrumentation from the src directory
+from file_scanner import FileScanner  # The scanner being instrumented
+from content_analyzer import ContentAnalyzer  # Scores the content
+from scan_engine import ScanEngine  # Collects metrics from its workers
+
+import json  # To create a temporary rules file
+import pstats  # To read the profile back
+import tempfile  # For a throwaway directory tree
+import unittest  # Import unittest framework for testing
+from fpdf import FPDF  # For creating a sample PDF file
+
+
+class TestScanMetrics(unittest.TestCase):  # Define a test case class for ScanMetrics
+    def setUp(self):  # Setup runs before each test
+        self.temp_dir = tempfile.TemporaryDirectory()  # Temporary directory removed after each test
+        self.root = self.temp_dir.name
+        self.rules_path = os.path.join(self.root, 'rules.json')
+        with open(self.rules_path, 'w', encoding='utf-8') as f:
+            json.dump({"confidential": ["confidential"], "public": ["public"]}, f)
+        self.docs_dir = os.path.join(self.root, 'docs')
+        os.makedirs(self.docs_dir)
+        for index in range(3):  # Three small text files
+            with open(os.path.join(self.docs_dir, f'file_{index}.txt'), 'w', encoding='utf-8') as f:
+                f.write("This file is public.")
+        pdf = FPDF()  # And a two page PDF
+        pdf.set_font('Arial', size=12)
+        for text in ('First page of the report.', 'Second page, confidential.'):
+            pdf.add_page()
+            pdf.cell(200, 10, text, ln=True)
+        pdf.output(os.path.join(self.docs_dir, 'report.pdf'))
+
+    def tearDown(self):  # Teardown runs after each test
+        self.temp_dir.cleanup()
+
+    def test_counters_and_stages(self):  # A sequential scan fills in every stage it goes through
+        metrics = ScanMetrics()
+        scanner = FileScanner(metrics=metrics)
+        records = list(scanner.iter_scan(self.docs_dir, analyzer=ContentAnalyzer(self.rules_path)))
+        self.assertEqual(len(records), 4)
+        summary = metrics.summary()
+        self.assertEqual(summary['txt']['files'], 3)  # Files are counted per type
+        self.assertEqual(summary['pdf']['files'], 1)
+        self.assertEqual(summary['pdf']['pages'], 2)  # Both pages were needed: the keyword is on the last one
+        self.assertEqual(summary['txt']['bytes_read'], 3 * len("This file is public."))
+        self.assertEqual(summary['all']['files'], 4)  # The 'all' row sums every type
+        for stage in ('walk', 'read', 'match', 'total'):
+            self.assertGreater(summary['all'][stage], 0)
+        self.assertIn('pdf', metrics.format_summary())  # One row per type in the table
+
+    def test_hooks_and_merge(self):  # Hooks see every update and snapshots can be merged
+        events = []
+        metrics = ScanMetrics(hooks=[lambda name, kind, value: events.append((name, kind, value))])
+        metrics.count('files', 'txt')
+        metrics.add_time('read', 'txt', 0.5)
+        self.assertEqual(events, [('files', 'txt', 1), ('read', 'txt', 0.5)])
+        other = ScanMetrics()
+        other.merge(metrics.snapshot())
+        other.merge(metrics.snapshot())
+        self.assertEqual(other.summary()['txt'], {'files': 2, 'read': 1.0})
+
+    def test_engine_collects_worker_metrics(self):  # Metrics recorded in worker processes reach the engine
+        metrics = ScanMetrics()
+        with ScanEngine(self.rules_path, process_workers=1, metrics=metrics) as engine:
+            records = list(engine.scan_directory(self.docs_dir))
+        self.assertEqual(len(records), 4)
+        summary = metrics.summary()
+        self.assertEqual(summary['pdf']['files'], 1)  # Scanned in the process pool
+        self.assertEqual(summary['pdf']['pages'], 2)
+        self.assertEqual(summary['txt']['files'], 3)  # Scanned in the thread pool
+
+    def test_disabled_metrics_record_nothing(self):  # NULL_METRICS is the default and stays empty
+        scanner = FileScanner()
+        self.assertIs(scanner.metrics, NULL_METRICS)
+        list(scanner.iter_scan(self.docs_dir, analyzer=ContentAnalyzer(self.rules_path)))
+        self.assertEqual(NULL_METRICS.summary(), {})
+
+    def test_profile_scan(self):  # A cProfile dump is written for the profiled block
+        profile_path = os.path.join(self.root, 'scan.prof')
+        with profile_scan(profile_path):
+            list(FileScanner().iter_scan(self.docs_dir, analyzer=ContentAnalyzer(self.rules_path)))
+        stats = pstats.Stats(profile_path)  # Loads only if the dump is valid
+        self.assertTrue(any(name == 'scan_file' for _, _, name in stats.stats))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+# Add src directory to sys.path so we can import OcrEngine
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from ocr import OcrEngine  # Import the OcrEngine class from the src directory
+
+import unittest  # Import unittest framework for testing
+from unittest import mock  # To stand in for Tesseract
+from PIL import Image  # For creating sample images
+
+
+class TestOcrEngine(unittest.TestCase):  # Define a test case class for OcrEngine
+    def setUp(self):  # Setup runs before each test
+        patcher = mock.patch('ocr.pytesseract.image_to_string', return_value='CONFIDENTIAL')  # Fake Tesseract
+        self.tesseract = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_image_is_ocrd_once(self):  # The same bytes are answered from the cache
+        engine = OcrEngine()
+        image = Image.new('RGB', (50, 20), color=(255, 255, 255))
+        for _ in range(3):
+            self.assertEqual(engine.image_to_string(image), 'CONFIDENTIAL')
+        self.assertEqual(self.tesseract.call_count, 1)
+        self.assertEqual(engine.stats()['cache_hits'], 2)
+
+    def test_key_bytes_skip_decoding(self):  # With key bytes, a cache hit never loads the image
+        engine = OcrEngine()
+        loader = mock.Mock(return_value=Image.new('RGB', (10, 10)))
+        engine.image_to_string(loader, key_bytes=b'logo')
+        engine.image_to_string(loader, key_bytes=b'logo')
+        self.assertEqual(loader.call_count, 1)
+
+    def test_lru_eviction(self):  # The least recently used result is evicted first
+        engine = OcrEngine(cache_size=2)
+        for key in (b'a', b'b', b'a', b'c', b'a'):  # 'b' is evicted when 'c' arrives
+            engine.image_to_string(Image.new('L', (5, 5)), key_bytes=key)
+        engine.image_to_string(Image.new('L', (5, 5)), key_bytes=b'b')
+        self.assertEqual(self.tesseract.call_count, 4)  # a, b, c, then b again
+
+    def test_preprocessing_downscales_and_converts(self):  # Large color images are shrunk to grayscale
+        engine = OcrEngine(max_dimension=100, target_dpi=150)
+        image = Image.new('RGB', (400, 200))
+        image.info['dpi'] = (300, 300)
+        prepared = engine.preprocess(image)
+        self.assertEqual(prepared.mode, 'L')
+        self.assertEqual(prepared.size, (100, 50))  # Capped by max_dimension, which is stricter than the DPI
+        self.assertEqual(OcrEngine(max_dimension=None, target_dpi=150).preprocess(image).size, (200, 100))
+        self.assertGreater(engine.stats()['pixels_saved'], 0)
+
+    def test_long_strips_are_tiled(self):  # A tall receipt is OCR'd in overlapping tiles instead of shrunk
+        engine = OcrEngine(max_dimension=500, cache_size=0)
+        strip = Image.new('L', (400, 2000))
+        self.assertEqual(engine.preprocess(strip).size, (400, 2000))  # Narrow enough, so kept at full size
+        tiles = engine.tiles(strip)
+        self.assertEqual([tile.size for tile in tiles], [(400, 500)] * 4 + [(400, 256)])
+        self.tesseract.side_effect = ['first', 'second', 'third', 'fourth', 'fifth']
+        self.assertEqual(engine.image_to_string(strip), 'first\nsecond\nthird\nfourth\nfifth')
+        self.assertEqual(engine.stats()['tiles'], 5)
+        self.assertEqual(len(OcrEngine(max_dimension=500, tile=False).tiles(strip)), 1)
+
+if __name__ == '__main__':  # Run the tests if this file is executed directly
+    unittest.main()  # Start the unittest test runner
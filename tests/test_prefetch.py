@@ -0,0 +1,112 @@
+# Add src directory to sys.path so we can import the prefetcher
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from prefetch import LatencyFilesystem, Prefetcher  # Import the prefetcher from the src directory
+from scan_engine import ScanEngine  # Scans with read-ahead
+from main import main  # The CLI enables read-ahead with --prefetch
+
+import json  # To create a temporary rules file and read JSONL output
+import tempfile  # For a throwaway directory tree
+import threading  # The filesystem is read from several I/O threads
+import unittest  # Import unittest framework for testing
+from fpdf import FPDF  # To create a PDF parsed in a worker process
+
+
+class CountingFilesystem(LatencyFilesystem):  # Records what was read, and the most bytes the prefetcher held
+    def __init__(self, prefetcher=None):
+        super().__init__(latency=0.001)
+        self.prefetcher = prefetcher
+        self.reads = []
+        self.bytes_read = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def read(self, path, limit=None):
+        data = super().read(path, limit)
+        with self.lock:
+            self.reads.append(os.path.basename(path))
+            self.bytes_read += len(data)
+            if self.prefetcher is not None:
+                self.peak = max(self.peak, self.prefetcher.held_bytes)
+        return data
+
+
+class TestPrefetch(unittest.TestCase):  # Define a test case class for read-ahead I/O
+    def setUp(self):  # Setup runs before each test
+        self.temp_dir = tempfile.TemporaryDirectory()  # Temporary directory removed after each test
+        self.root = self.temp_dir.name
+        self.rules_path = os.path.join(self.root, 'rules.json')
+        with open(self.rules_path, 'w', encoding='utf-8') as f:
+            json.dump({"confidential": ["confidential"], "public": ["public"]}, f)
+        self.docs = os.path.join(self.root, 'docs')
+        os.makedirs(self.docs)
+        self.paths = []
+        for index in range(20):
+            self.paths.append(os.path.join(self.docs, f'file_{index:02d}.txt'))
+            with open(self.paths[-1], 'w', encoding='utf-8') as f:
+                f.write(("This is confidential. " if index % 3 == 0 else "This is public. ") * (index + 1) * 50)
+
+    def tearDown(self):  # Teardown runs after each test
+        self.temp_dir.cleanup()
+
+    def scan(self, paths, **options):
+        with ScanEngine(self.rules_path, process_workers=0, thread_workers=2, **options) as engine:
+            return [(os.path.basename(record.path), record.sensitivity) for record in engine.scan_paths(paths)]
+
+    def test_parses_prefetched_bytes(self):  # Every file is read once, ahead, and the results do not change
+        expected = self.scan(self.paths)
+        filesystem = CountingFilesystem()
+        prefetch = Prefetcher(depth=8, filesystem=filesystem)
+        self.assertEqual(self.scan(self.paths, filesystem=filesystem, prefetch=prefetch), expected)
+        self.assertEqual(sorted(filesystem.reads), sorted(name for name, _ in expected))  # Never read twice
+        self.assertEqual(prefetch.stats(), {'loaded': 20, 'declined': 0, 'held_files': 0, 'held_bytes': 0})
+
+    def test_memory_cap(self):  # Files that do not fit are read by the workers, and the cap holds
+        expected = self.scan(self.paths)
+        largest = max(os.path.getsize(path) for path in self.paths)
+        prefetch = Prefetcher(depth=8, max_bytes=2 * largest, max_file_bytes=largest // 2)
+        filesystem = CountingFilesystem(prefetch)
+        prefetch.filesystem = filesystem
+        self.assertEqual(self.scan(self.paths, filesystem=filesystem, prefetch=prefetch), expected)
+        self.assertGreater(prefetch.declined, 0)
+        self.assertEqual(prefetch.loaded + prefetch.declined, 20)
+        self.assertLessEqual(filesystem.peak, 2 * largest)
+        self.assertEqual(len(filesystem.reads), 20)  # Declined files were read through the filesystem by the workers
+        self.assertEqual(prefetch.held_bytes, 0)
+
+    def test_max_bytes(self):  # Without read-ahead, text files are read through the filesystem only up to max_bytes
+        filesystem = CountingFilesystem()
+        with ScanEngine(self.rules_path, process_workers=0, max_bytes=100, filesystem=filesystem) as engine:
+            records = list(engine.scan_paths(self.paths))
+        self.assertEqual([record.status for record in records], ['prefix'] * 20)
+        self.assertEqual(records[0].sensitivity, 'confidential')
+        self.assertLessEqual(filesystem.bytes_read, 20 * 101)  # One byte more than the limit tells the rest was left
+
+    def test_worker_processes_and_errors(self):  # Prefetched bytes reach worker processes; a missing file is an error
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_font('Helvetica', size=12)
+        pdf.cell(0, 10, "This is confidential.")
+        pdf_path = os.path.join(self.docs, 'report.pdf')
+        pdf.output(pdf_path)
+        missing = os.path.join(self.docs, 'missing.txt')
+        prefetch = Prefetcher(depth=4)
+        with ScanEngine(self.rules_path, process_workers=1, prefetch=prefetch) as engine:
+            records = list(engine.scan_paths([pdf_path, missing, self.paths[1]]))
+        self.assertEqual([record.sensitivity for record in records], ['confidential', None, 'public'])
+        self.assertEqual(records[0].path, pdf_path)
+        self.assertEqual(prefetch.held_files, 0)
+
+    def test_cli(self):  # --prefetch scans with read-ahead
+        output = os.path.join(self.root, 'out.jsonl')
+        self.assertEqual(main([self.docs, '--rules', self.rules_path, '--no-cache', '--process-workers', '0',
+                               '--format', 'jsonl', '--output', output, '--prefetch', '4', '--prefetch-mb', '1']), 0)
+        with open(output, 'r', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 20)
+        self.assertEqual(sum(record['sensitivity'] == 'confidential' for record in records), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+# Add src directory to sys.path so we can import the readers module
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from readers import REGISTRY, ReaderPlugin, ReaderRegistry, register_reader  # Import the reader plugins from the src directory
+from file_scanner import FileScanner  # Reads files through the registry
+from archives import ArchiveLimits  # Office files are held to the archive limits
+
+import subprocess  # To import the scanner in a fresh interpreter
+import tempfile  # For throwaway files
+import unittest  # Import unittest framework for testing
+import zipfile  # To build minimal Office files
+
+
+class TestReaders(unittest.TestCase):  # Define a test case class for the reader registry
+    def setUp(self):  # Setup runs before each test
+        self.temp_dir = tempfile.TemporaryDirectory()  # Temporary directory removed after each test
+        self.addCleanup(self.temp_dir.cleanup)
+        self.scanner = FileScanner()
+
+    def path(self, name):
+        return os.path.join(self.temp_dir.name, name)
+
+    def write(self, name, data):
+        with open(self.path(name), 'wb') as f:
+            f.write(data)
+        return self.path(name)
+
+    def write_zip(self, name, parts):
+        with zipfile.ZipFile(self.path(name), 'w') as archive:
+            for part, xml in parts.items():
+                archive.writestr(part, xml)
+        return self.path(name)
+
+    def test_lookup(self):  # Plugins are found by extension, case-insensitively
+        self.assertEqual(REGISTRY.for_path('a/b.PDF').name, 'pdf')
+        self.assertTrue(REGISTRY.for_path('scan.png').cpu_bound)  # OCR goes to the process pool
+        self.assertFalse(REGISTRY.for_path('notes.txt').cpu_bound)
+        self.assertIsNone(REGISTRY.for_path('missing.xyz'))  # Unknown and unreadable
+        for extension in ('.txt', '.pdf', '.docx', '.png', '.html', '.eml', '.xlsx', '.pptx'):
+            self.assertIn(extension, self.scanner.supported_extensions)
+
+    def test_sniff(self):  # Files without a known extension are recognised by their content
+        pdf = self.write('report.bin', b'%PDF-1.7\n...')
+        self.assertEqual(REGISTRY.sniff(pdf), '.pdf')
+        docx = self.write_zip('attachment.dat', {'word/document.xml': '<w:document/>'})
+        self.assertEqual(REGISTRY.sniff(docx), '.docx')  # Zip members tell the Office formats apart
+        xlsx = self.write_zip('book', {'xl/workbook.xml': '<workbook/>'})
+        self.assertEqual(REGISTRY.sniff(xlsx), '.xlsx')
+        self.assertIsNone(REGISTRY.sniff(self.write('random.bin', b'\x00\x01\x02')))
+
+    def test_custom_plugin(self):  # New formats are added without touching FileScanner
+        registry = ReaderRegistry()
+
+        @register_reader(['.rot13'], registry=registry)
+        def iter_rot13(scanner, file_path):
+            import codecs
+            with open(file_path, encoding='utf-8') as f:
+                yield codecs.decode(f.read(), 'rot13')
+
+        scanner = FileScanner(registry=registry)
+        path = self.write('secret.rot13', b'pbasvqragvny')
+        self.assertEqual(scanner.read_file(path), 'confidential')
+        self.assertEqual(scanner.supported_extensions, ('.rot13',))
+        self.assertIsNone(scanner.read_file(self.write('notes.txt', b'text')))  # Not in this registry
+        registry.register(ReaderPlugin('upper', lambda scanner, path: iter(['ABC'])), ['.up'])
+        self.assertEqual(scanner.read_file(self.write('x.up', b'')), 'ABC')
+
+    def test_html(self):  # Visible text only, scripts and styles skipped
+        path = self.write('page.html', b'<html><head><title>Report</title><style>p {color: red}</style></head>'
+                                       b'<body><p>This is <b>confidential</b> &amp; internal</p>'
+                                       b'<script>var secret = 1;</script></body></html>')
+        content = self.scanner.read_file(path)
+        self.assertIn('This is confidential & internal', content)
+        self.assertIn('Report', content)
+        self.assertNotIn('secret', content)
+        self.assertNotIn('color', content)
+
+    def test_eml(self):  # Headers and text parts, HTML parts converted to text
+        path = self.write('mail.eml', b'Subject: Quarterly numbers\r\nFrom: a@example.com\r\nTo: b@example.com\r\n'
+                                      b'MIME-Version: 1.0\r\nContent-Type: multipart/alternative; boundary="XX"\r\n\r\n'
+                                      b'--XX\r\nContent-Type: text/plain\r\n\r\nPlain public body\r\n'
+                                      b'--XX\r\nContent-Type: text/html\r\n\r\n<p>Html <i>confidential</i> body</p>\r\n'
+                                      b'--XX--\r\n')
+        content = self.scanner.read_file(path)
+        self.assertIn('Subject: Quarterly numbers', content)
+        self.assertIn('Plain public body', content)
+        self.assertIn('Html confidential body', content)
+
+    def test_xlsx(self):  # Shared and inline strings and numbers, one line per row
+        ns = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+        path = self.write_zip('book.xlsx', {
+            'xl/workbook.xml': f'<workbook {ns}/>',
+            'xl/sharedStrings.xml': f'<sst {ns}><si><t>Name</t></si><si><r><t>confi</t></r><r><t>dential</t></r></si></sst>',
+            'xl/worksheets/sheet1.xml': f'<worksheet {ns}><sheetData>'
+                                        f'<row><c t="s"><v>0</v></c><c><v>42</v></c></row>'
+                                        f'<row><c t="s"><v>1</v></c><c t="inlineStr"><is><t>inline</t></is></c></row>'
+                                        f'</sheetData></worksheet>',
+            'xl/worksheets/sheet2.xml': f'<worksheet {ns}><sheetData><row><c t="b"><v>1</v></c></row></sheetData></worksheet>',
+        })
+        self.assertEqual(self.scanner.read_file(path), 'Name\t42\nconfidential\tinline\n1')
+
+    def test_pptx(self):  # Slide text in slide order, not name order
+        ns = 'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"'
+        path = self.write_zip('deck.pptx', {
+            'ppt/presentation.xml': '<presentation/>',
+            'ppt/slides/slide10.xml': f'<sld {ns}><a:p><a:r><a:t>Last</a:t></a:r></a:p></sld>',
+            'ppt/slides/slide2.xml': f'<sld {ns}><a:p><a:r><a:t>Second </a:t></a:r><a:r><a:t>slide</a:t></a:r></a:p></sld>',
+            'ppt/slides/slide1.xml': f'<sld {ns}><a:p><a:r><a:t>Title</a:t></a:r></a:p></sld>',
+        })
+        self.assertEqual(self.scanner.read_file(path), 'Title\nSecond slide\nLast')
+
+    def test_zip_bombs(self):  # Office files are decompressed within the same limits as archives
+        ns = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+        padding = ' ' * (4 * 1024 * 1024)  # Compresses over 1000 times
+        for name, part, xml in (('book.xlsx', 'xl/worksheets/sheet1.xml', f'<worksheet {ns}>{padding}</worksheet>'),
+                                ('deck.pptx', 'ppt/slides/slide1.xml', f'<sld>{padding}</sld>')):
+            with zipfile.ZipFile(self.path(name), 'w', zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr(part, xml)
+            self.assertIsNone(self.scanner.read_file(self.path(name)))
+            self.assertIsNotNone(FileScanner(archive_limits=ArchiveLimits(max_ratio=10_000)).read_file(self.path(name)))
+
+    def test_lazy_imports(self):  # Importing the scanner loads no PDF, image or OCR library
+        src = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+        script = (f"import sys; sys.path.insert(0, {src!r}); import scan_engine; "
+                  f"print(','.join(m for m in ('pypdf', 'PIL', 'pytesseract', 'docx') if m in sys.modules))")
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
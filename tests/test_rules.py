@@ -0,0 +1,105 @@
+# Add src directory to sys.path so we can import the rules module
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from rules import RulesManager, load_rule_set  # Import the rules manager from the src directory
+from content_analyzer import ContentAnalyzer  # Analyzers share the compiled rules
+from scan_engine import ScanEngine  # Engines pick up new rules between scans
+
+import json  # To write rules files
+import marshal  # To read a cache entry
+import tempfile  # For throwaway rules and cache directories
+import unittest  # Import unittest framework for testing
+
+
+class TestRules(unittest.TestCase):  # Define a test case class for rule loading and hot reload
+    def setUp(self):  # Setup runs before each test
+        self.temp_dir = tempfile.TemporaryDirectory()  # Temporary directory removed after each test
+        self.addCleanup(self.temp_dir.cleanup)
+        self.cache_dir = os.path.join(self.temp_dir.name, 'cache')
+        self.rules_path = os.path.join(self.temp_dir.name, 'rules.json')
+        self.write_rules({"confidential": ["confidential"], "public": ["public"]})
+
+    def write_rules(self, rules):
+        with open(self.rules_path, 'w', encoding='utf-8') as f:
+            json.dump(rules, f)
+        stat = os.stat(self.rules_path)
+        os.utime(self.rules_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))  # A new mtime even on coarse clocks
+
+    def test_compiled_cache(self):  # A version compiled once is loaded from the cache afterwards
+        rules = {"confidential": [f"secret{index} term" for index in range(500)] + ["secret1"], "public": ["public"]}
+        self.write_rules(rules)
+        fresh = load_rule_set(self.rules_path, cache_dir=self.cache_dir)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)  # Written atomically, no temporary file left
+        cached = load_rule_set(self.rules_path, cache_dir=self.cache_dir)
+        text = "public secret12 term and secret499 term"
+        self.assertEqual(cached.version, fresh.version)
+        self.assertEqual(cached.rules, rules)
+        self.assertEqual(cached.matcher.find_all(text), fresh.matcher.find_all(text))
+        entry = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        with open(entry, 'wb') as f:
+            f.write(b'garbage')
+        self.assertEqual(load_rule_set(self.rules_path, cache_dir=self.cache_dir).matcher.find_all(text),
+                         fresh.matcher.find_all(text))  # A corrupt entry is rebuilt
+
+    def test_cache_holds_plain_data(self):  # Entries hold the pattern source, never regex engine internals
+        rules = {"confidential": [f"secret{index} term" for index in range(500)], "public": ["public"]}
+        self.write_rules(rules)
+        load_rule_set(self.rules_path, cache_dir=self.cache_dir)
+        entry = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        with open(entry, 'rb') as f:
+            cached_rules, state = marshal.load(f)
+        self.assertEqual(cached_rules, rules)
+        self.assertNotIn('pattern_code', state)
+        self.assertIsInstance(state['pattern_source'], str)  # Compiled with re.compile when loaded
+
+    def test_hot_reload(self):  # New versions replace the current one; earlier snapshots keep working
+        manager = RulesManager(self.rules_path, cache_dir=self.cache_dir, check_interval=0)
+        old = manager.current
+        self.assertEqual(old.matcher.best_level("public"), "public")
+        self.assertIs(manager.current, old)  # Unchanged file, nothing reloaded
+        self.write_rules({"confidential": ["public"]})
+        new = manager.current
+        self.assertNotEqual(new.version, old.version)
+        self.assertEqual(new.matcher.best_level("public"), "confidential")
+        self.assertEqual(old.matcher.best_level("public"), "public")  # A scan holding the old version is unaffected
+        with open(self.rules_path, 'w', encoding='utf-8') as f:
+            f.write('{"confidential": [')  # Half-written file
+        self.assertFalse(manager.reload())
+        self.assertIs(manager.current, new)  # Scanning continues with the last good version
+
+    def test_check_interval(self):  # The file is not checked again until the interval has passed
+        manager = RulesManager(self.rules_path, cache_dir=self.cache_dir, check_interval=3600)
+        version = manager.version
+        self.write_rules({"confidential": ["x"]})
+        self.assertEqual(manager.version, version)
+        self.assertNotEqual(manager.latest().version, version)  # Unless asked to check now
+
+    def test_analyzers_share_rules(self):  # Analyzers of one file reuse the compiled matcher until it changes
+        first = ContentAnalyzer(self.rules_path)
+        second = ContentAnalyzer(self.rules_path)
+        self.assertIs(first.matcher, second.matcher)
+        self.assertIs(first.reloaded(), first)
+        self.write_rules({"confidential": ["public"]})
+        reloaded = first.reloaded()
+        self.assertNotEqual(reloaded.rules_version, first.rules_version)
+        self.assertEqual(reloaded.analyze_file("public"), "confidential")
+        self.assertEqual(first.analyze_file("public"), "public")  # The old analyzer keeps its version
+
+    def test_engine_uses_new_rules_on_next_scan(self):  # Records carry the rules version that produced them
+        docs = os.path.join(self.temp_dir.name, 'docs')
+        os.makedirs(docs)
+        with open(os.path.join(docs, 'a.txt'), 'w', encoding='utf-8') as f:
+            f.write("public notes")
+        with ScanEngine(self.rules_path, process_workers=0) as engine:
+            first = list(engine.scan_directory(docs))
+            self.write_rules({"confidential": ["notes"], "public": ["public"]})
+            second = list(engine.scan_directory(docs))
+        self.assertEqual(first[0].sensitivity, "public")
+        self.assertEqual(second[0].sensitivity, "confidential")
+        self.assertEqual(second[0].rules_version, engine.analyzer.rules_version)
+        self.assertNotEqual(first[0].rules_version, second[0].rules_version)
+
+
+if __name__ == '__main__':
+    unittest.main()
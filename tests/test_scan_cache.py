@@ -0,0 +1,93 @@
+# Add src directory to sys.path so we can import ScanCache
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from scan_cache import ScanCache  # Import the ScanCache class from the src directory
+from content_analyzer import ContentAnalyzer  # The analyzer provides the rules version
+from file_scanner import FileScanner  # Used to scan through the cache
+
+import json  # To create temporary rules files
+import tempfile  # For a throwaway directory
+import unittest  # Import unittest framework for testing
+from unittest import mock  # To detect whether files are read again
+
+
+class TestScanCache(unittest.TestCase):  # Define a test case class for ScanCache
+    def setUp(self):  # Setup runs before each test
+        self.temp_dir = tempfile.TemporaryDirectory()  # Temporary directory removed after each test
+        self.root = self.temp_dir.name
+        self.rules_path = os.path.join(self.root, 'rules.json')
+        self.write_rules({"confidential": ["confidential"], "public": ["public"]})
+        self.txt_path = os.path.join(self.root, 'note.txt')
+        with open(self.txt_path, 'w', encoding='utf-8') as f:
+            f.write('This note is public but also confidential.')
+        self.cache = ScanCache(os.path.join(self.root, 'cache.sqlite'))
+        self.scanner = FileScanner()
+
+    def tearDown(self):  # Teardown runs after each test
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    def write_rules(self, rules):  # Helper that (re)writes the rules file
+        with open(self.rules_path, 'w', encoding='utf-8') as f:
+            json.dump(rules, f)
+
+    def test_unchanged_file_is_not_read_again(self):  # A second scan is answered from the cache
+        analyzer = ContentAnalyzer(self.rules_path)
+        first = self.scanner.scan_file(self.txt_path, analyzer, self.cache)
+        self.assertFalse(first.cached)
+        with mock.patch.object(self.scanner, 'iter_text') as read_file:  # Fail loudly if the file is read
+            second = self.scanner.scan_file(self.txt_path, analyzer, self.cache)
+        read_file.assert_not_called()
+        self.assertTrue(second.cached)
+        self.assertEqual((second.content, second.sensitivity), (first.content, "confidential"))
+
+    def test_modified_file_is_rescanned(self):  # Changing the file invalidates its entry
+        analyzer = ContentAnalyzer(self.rules_path)
+        self.scanner.scan_file(self.txt_path, analyzer, self.cache)
+        with open(self.txt_path, 'w', encoding='utf-8') as f:
+            f.write('Now it is only public, with a longer text.')
+        record = self.scanner.scan_file(self.txt_path, analyzer, self.cache)
+        self.assertFalse(record.cached)
+        self.assertEqual(record.sensitivity, "public")
+
+    def test_scan_options_are_part_of_the_key(self):  # Text extracted with other options is not reused
+        analyzer = ContentAnalyzer(self.rules_path)
+        self.scanner.scan_file(self.txt_path, analyzer, self.cache)
+        record = FileScanner(deep_ocr=True).scan_file(self.txt_path, analyzer, self.cache)
+        self.assertFalse(record.cached)  # A --deep-ocr scan reads the file itself
+        record = FileScanner(deep_ocr=True).scan_file(self.txt_path, analyzer, self.cache)
+        self.assertTrue(record.cached)  # ...and its result is reused by the next one
+        self.assertFalse(self.scanner.scan_file(self.txt_path, analyzer, self.cache).cached)
+
+    def test_rules_change_reanalyzes_cached_text(self):  # New rules reuse the text but redo the match
+        self.scanner.scan_file(self.txt_path, ContentAnalyzer(self.rules_path), self.cache)
+        self.write_rules({"public": ["public"], "confidential": ["confidential"]})  # Swap precedence
+        analyzer = ContentAnalyzer(self.rules_path)
+        with mock.patch.object(self.scanner, 'iter_text') as read_file:
+            record = self.scanner.scan_file(self.txt_path, analyzer, self.cache)
+        read_file.assert_not_called()
+        self.assertEqual(record.sensitivity, "public")
+
+    def test_hash_fallback_survives_touch(self):  # Same bytes with new metadata are still a hit
+        cache = ScanCache(os.path.join(self.root, 'hashed.sqlite'), verify_hash=True)
+        cache.store(self.txt_path, 'v1', 'text', 'public')
+        stat = os.stat(self.txt_path)
+        os.utime(self.txt_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))  # Touch the file
+        self.assertEqual(cache.lookup(self.txt_path, 'v1')[:2], ('text', 'public'))
+        cache.close()
+
+    def test_eviction_respects_entry_cap(self):  # Least recently used entries are evicted
+        cache = ScanCache(os.path.join(self.root, 'small.sqlite'), max_entries=2)
+        for index in range(3):
+            path = os.path.join(self.root, f'file_{index}.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(str(index))
+            cache.store(path, 'v1', str(index), 'public')
+        cache.flush()  # Enforce the caps
+        self.assertIsNone(cache.lookup(os.path.join(self.root, 'file_0.txt'), 'v1'))
+        self.assertIsNotNone(cache.lookup(os.path.join(self.root, 'file_2.txt'), 'v1'))
+        cache.close()
+
+if __name__ == '__main__':  # Run the tests if this file is executed directly
+    unittest.main()  # Start the unittest test runner
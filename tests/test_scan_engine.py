@@ -0,0 +1,68 @@
+# Add src directory to sys.path so we can import ScanEngine
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from scan_engine import ScanEngine  # Import the ScanEngine class from the src directory
+from scan_cache import ScanCache  # Persistent result cache
+
+import json  # To create a temporary rules file
+import tempfile  # For a throwaway directory tree
+import unittest  # Import unittest framework for testing
+from fpdf import FPDF  # For creating a sample PDF file
+
+
+class TestScanEngine(unittest.TestCase):  # Define a test case class for ScanEngine
+    def setUp(self):  # Setup runs before each test
+        self.temp_dir = tempfile.TemporaryDirectory()  # Temporary directory removed after each test
+        self.root = self.temp_dir.name
+        self.rules_path = os.path.join(self.root, 'rules.json')
+        with open(self.rules_path, 'w', encoding='utf-8') as f:
+            json.dump({"confidential": ["confidential"], "pii": ["ssn"], "public": ["public"]}, f)
+        self.docs_dir = os.path.join(self.root, 'docs')
+        os.makedirs(os.path.join(self.docs_dir, 'nested'))
+        self.paths = []
+        words = ["confidential", "ssn", "public", "nothing"]
+        for index in range(40):  # Text files alternate between the four kinds of content
+            folder = self.docs_dir if index % 2 else os.path.join(self.docs_dir, 'nested')
+            path = os.path.join(folder, f'file_{index:02d}.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(f"This file is {words[index % 4]}.")
+            self.paths.append(path)
+        self.pdf_path = os.path.join(self.docs_dir, 'report.pdf')  # A PDF goes through the process pool
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_font('Arial', size=12)
+        pdf.cell(200, 10, 'The SSN is listed below.', ln=True)
+        pdf.output(self.pdf_path)
+
+    def tearDown(self):  # Teardown runs after each test
+        self.temp_dir.cleanup()
+
+    def test_results_keep_input_order(self):  # Results come back in the order the paths were given
+        paths = list(reversed(self.paths)) + [self.pdf_path]
+        with ScanEngine(self.rules_path, process_workers=2, thread_workers=4, max_pending=3) as engine:
+            records = list(engine.scan_paths(paths))
+        self.assertEqual([record.path for record in records], paths)
+        expected = {"confidential": "confidential", "ssn": "pii", "public": "public", "nothing": "unknown"}
+        for record in records[:-1]:
+            word = record.content.split()[-1].rstrip('.')
+            self.assertEqual(record.sensitivity, expected[word])
+        self.assertEqual(records[-1].sensitivity, "pii")  # The PDF was parsed in a worker process
+
+    def test_scan_directory_without_process_pool(self):  # process_workers=0 keeps everything in threads
+        with ScanEngine(self.rules_path, process_workers=0) as engine:
+            records = list(engine.scan_directory(self.docs_dir))
+        self.assertEqual(sorted(record.path for record in records), sorted(self.paths + [self.pdf_path]))
+        self.assertTrue(all(record.error is None for record in records))
+
+    def test_rescan_uses_cache(self):  # A second scan of an unchanged tree is answered from the cache
+        with ScanCache(os.path.join(self.root, 'cache.sqlite')) as cache:
+            with ScanEngine(self.rules_path, process_workers=1, cache=cache) as engine:
+                first = list(engine.scan_directory(self.docs_dir))
+                second = list(engine.scan_directory(self.docs_dir))
+        self.assertFalse(any(record.cached for record in first))
+        self.assertTrue(all(record.cached for record in second))
+        self.assertEqual([r.sensitivity for r in first], [r.sensitivity for r in second])
+
+if __name__ == '__main__':  # Run the tests if this file is executed directly
+    unittest.main()  # Start the unittest test runner
@@ -0,0 +1,123 @@
+# Add src directory to sys.path so we can import the result sinks
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from sinks import FIELDS, CsvSink, ParquetSink, ResultHistory, SqliteSink  # Import the sinks from the src directory
+from file_scanner import ScanRecord  # Records written to the sinks
+from main import main  # The CLI writes to sinks with --sink
+
+import csv  # To read the CSV sink back
+import json  # To create a temporary rules file
+import importlib.util  # To skip the Parquet test without pyarrow
+import tempfile  # For a throwaway directory tree
+import unittest  # Import unittest framework for testing
+
+
+class TestSinks(unittest.TestCase):  # Define a test case class for the result sinks
+    def setUp(self):  # Setup runs before each test
+        self.temp_dir = tempfile.TemporaryDirectory()  # Temporary directory removed after each test
+        self.root = self.temp_dir.name
+        self.rules_path = os.path.join(self.root, 'rules.json')
+        with open(self.rules_path, 'w', encoding='utf-8') as f:
+            json.dump({"pii": ["ssn"], "confidential": ["confidential"], "public": ["public"]}, f)
+        self.docs = os.path.join(self.root, 'docs')
+        os.makedirs(os.path.join(self.docs, 'hr'))
+        self.files = {'hr/staff.txt': "The SSN list.", 'hr/policy.txt': "A public policy.",
+                      'plan.txt': "A confidential plan.", 'old.txt': "Public notes."}
+        for name, text in self.files.items():
+            self.write(name, text)
+        self.db_path = os.path.join(self.root, 'results.sqlite')
+
+    def tearDown(self):  # Teardown runs after each test
+        self.temp_dir.cleanup()
+
+    def write(self, name, text):
+        with open(os.path.join(self.docs, name), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def scan(self):
+        output = os.path.join(self.root, 'out.jsonl')
+        self.assertEqual(main([self.docs, '--rules', self.rules_path, '--no-cache', '--process-workers', '0',
+                               '--format', 'jsonl', '--output', output, '--sink', self.db_path]), 0)
+
+    def test_history_queries(self):  # Runs are kept, and can be queried by level, path and change
+        self.scan()
+        self.write('hr/policy.txt', "Now with an SSN.")  # public -> pii
+        os.remove(os.path.join(self.docs, 'old.txt'))
+        self.write('new.txt', "A confidential addition.")
+        self.scan()
+        with ResultHistory(self.db_path) as history:
+            runs = history.runs()
+            self.assertEqual([run.files for run in runs], [4, 4])
+            self.assertEqual(runs[1].roots, [self.docs])
+            pii = history.files_at_level('pii', under=os.path.join(self.docs, 'hr'))
+            self.assertEqual([result.path for result in pii], [os.path.join(self.docs, 'hr', name)
+                                                               for name in ('policy.txt', 'staff.txt')])
+            self.assertEqual(pii[0].matches, 1)
+            self.assertEqual(json.loads(pii[0].terms), {'ssn': 1})
+            self.assertEqual(len(history.files_at_level('public', run=runs[0].id)), 2)
+            public = history.files_at_level('public')  # policy.txt changed level; old.txt is reported as last seen
+            self.assertEqual([result.path for result in public], [os.path.join(self.docs, 'old.txt')])
+            self.assertEqual([(change.path, change.old_level, change.new_level) for change in history.level_changes()],
+                             [(os.path.join(self.docs, 'hr', 'policy.txt'), 'public', 'pii')])
+            changes = history.level_changes(include_new=True, include_deleted=True)
+            self.assertEqual([(os.path.basename(change.path), change.old_level, change.new_level) for change in changes],
+                             [('policy.txt', 'public', 'pii'), ('new.txt', None, 'confidential'), ('old.txt', 'public', None)])
+            self.assertEqual([result.sensitivity for result in history.file_history(os.path.join(self.docs, 'hr', 'policy.txt'))],
+                             ['public', 'pii'])
+
+    def test_delta_runs(self):  # A delta run writes only changes; unchanged files are not taken for deleted ones
+        manifest = os.path.join(self.root, 'manifest.sqlite')
+        arguments = [self.docs, '--rules', self.rules_path, '--no-cache', '--process-workers', '0', '--delta',
+                     '--manifest', manifest, '--format', 'jsonl', '--output', os.path.join(self.root, 'out.jsonl'),
+                     '--sink', self.db_path]
+        self.assertEqual(main(arguments), 0)  # Everything is new
+        self.write('hr/policy.txt', "Now with an SSN.")
+        os.remove(os.path.join(self.docs, 'old.txt'))
+        self.assertEqual(main(arguments), 0)
+        with ResultHistory(self.db_path) as history:
+            runs = history.runs()
+            self.assertEqual([(run.files, run.delta) for run in runs], [(4, True), (1, True)])
+            changes = history.level_changes(include_new=True, include_deleted=True)
+            public = [os.path.basename(result.path) for result in history.files_at_level('public')]
+            first_public = [os.path.basename(result.path) for result in history.files_at_level('public', run=runs[0].id)]
+        self.assertEqual([(os.path.basename(change.path), change.old_level, change.new_level, change.run)
+                          for change in changes],
+                         [('policy.txt', 'public', 'pii', runs[1].id), ('old.txt', 'public', None, runs[0].id)])
+        self.assertNotIn('old.txt', public)  # Deleted by the second run
+        self.assertIn('old.txt', first_public)  # But still part of the first run
+
+    def test_batches(self):  # Records are written in batches, and everything is written on close
+        with SqliteSink(self.db_path, [self.docs], batch_size=3) as sink:
+            for index in range(7):
+                sink.write(ScanRecord(os.path.join(self.docs, f'{index}.txt'), 'text', 'public'))
+            self.assertEqual(sink.written, 6)  # Two full batches; one record still buffered
+        self.assertEqual(sink.written, 7)
+        with ResultHistory(self.db_path) as history:
+            self.assertEqual(history.runs()[0].files, 7)
+            self.assertIsNotNone(history.runs()[0].finished)
+
+    def test_csv_sink(self):  # The CSV sink writes a header and one row per record
+        path = os.path.join(self.root, 'results.csv')
+        with CsvSink(path) as sink:
+            sink.write(ScanRecord(os.path.join(self.docs, 'a.txt'), 'text', 'public', read_seconds=0.002))
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(tuple(rows[0]), FIELDS)
+        self.assertEqual((rows[0]['sensitivity'], rows[0]['read_ms'], rows[0]['chars']), ('public', '2.0', '4'))
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), "pyarrow is not installed")
+    def test_parquet_sink(self):  # The Parquet sink writes every field with its type
+        import pyarrow.parquet
+        path = os.path.join(self.root, 'results.parquet')
+        with ParquetSink(path, batch_size=2) as sink:
+            for index in range(3):
+                sink.write(ScanRecord(os.path.join(self.docs, f'{index}.txt'), 'text', 'public', cached=True))
+        table = pyarrow.parquet.read_table(path)
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(table.column_names, list(FIELDS))
+        self.assertEqual(table.column('cached').to_pylist(), [True] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
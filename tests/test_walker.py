@@ -0,0 +1,64 @@
+# Add src directory to sys.path so we can import DirectoryWalker
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from walker import DirectoryWalker  # Import the DirectoryWalker class from the src directory
+
+import tempfile  # For a throwaway directory tree
+import unittest  # Import unittest framework for testing
+from unittest import mock  # To check that unsupported files are never opened
+
+
+class TestDirectoryWalker(unittest.TestCase):  # Define a test case class for DirectoryWalker
+    def setUp(self):  # Setup runs before each test
+        self.temp_dir = tempfile.TemporaryDirectory()  # Temporary directory removed after each test
+        self.root = self.temp_dir.name
+        files = {
+            'a.txt': 'x', 'b.pdf': 'xx', 'c.exe': 'xxx', 'big.txt': 'x' * 100,
+            'sub/d.txt': 'x', 'sub/deeper/e.txt': 'x', 'sub/tmp/f.txt': 'x',
+            '.git/config.txt': 'x', 'node_modules/pkg/g.txt': 'x',
+        }  # Relative path -> content
+        for relative_path, content in files.items():
+            path = os.path.join(self.root, *relative_path.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+
+    def tearDown(self):  # Teardown runs after each test
+        self.temp_dir.cleanup()
+
+    def relative(self, walker):  # Helper returning the walked files relative to the root
+        return [os.path.relpath(entry.path, self.root).replace(os.sep, '/') for entry in walker.walk(self.root)]
+
+    def test_default_skips_vcs_and_dependency_dirs(self):  # .git and node_modules are never entered
+        self.assertEqual(self.relative(DirectoryWalker()),
+                         ['a.txt', 'b.pdf', 'big.txt', 'c.exe', 'sub/d.txt', 'sub/deeper/e.txt', 'sub/tmp/f.txt'])
+
+    def test_extension_prefilter(self):  # Unsupported extensions are dropped without a stat call
+        with mock.patch('os.DirEntry.stat', side_effect=AssertionError('stat called')):
+            result = self.relative(DirectoryWalker(extensions=['.pdf']))
+        self.assertEqual(result, ['b.pdf'])
+
+    def test_include_exclude_and_depth(self):  # Glob patterns and depth limits prune the walk
+        self.assertEqual(self.relative(DirectoryWalker(include=['sub/*'])),
+                         ['sub/d.txt', 'sub/deeper/e.txt', 'sub/tmp/f.txt'])
+        self.assertEqual(self.relative(DirectoryWalker(exclude=['tmp', '*.exe', 'big.*'], max_depth=1)),
+                         ['a.txt', 'b.pdf', 'sub/d.txt'])
+
+    def test_size_limits(self):  # Files outside the size range are skipped
+        self.assertEqual(self.relative(DirectoryWalker(min_size=2, max_size=50)), ['b.pdf', 'c.exe'])
+
+    @unittest.skipUnless(hasattr(os, 'symlink'), 'symlinks not supported')
+    def test_symlink_policies(self):  # Links are skipped, followed for files only, or followed with loop protection
+        os.symlink(self.root, os.path.join(self.root, 'sub', 'loop'))  # A directory link back to the root
+        os.symlink(os.path.join(self.root, 'a.txt'), os.path.join(self.root, 'link.txt'))  # A file link
+        walked = self.relative(DirectoryWalker(symlinks='files', extensions=['.txt']))
+        self.assertIn('link.txt', walked)
+        self.assertFalse(any(path.startswith('sub/loop') for path in walked))
+        self.assertNotIn('link.txt', self.relative(DirectoryWalker(symlinks='skip')))
+        followed = self.relative(DirectoryWalker(symlinks='follow', extensions=['.txt']))
+        self.assertEqual(len(followed), len(set(followed)))  # The loop back to the root is not walked again
+        self.assertFalse(any(path.startswith('sub/loop') for path in followed))
+
+if __name__ == '__main__':  # Run the tests if this file is executed directly
+    unittest.main()  # Start the unittest test runner